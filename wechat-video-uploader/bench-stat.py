@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# bench-stat.py
+# publish-stat.py 和 skip-upload.py 的性能测试
+# 生成模拟视频目录（见 bench_tree.py），逐个阶段计时，输出耗时、吞吐量和峰值内存，
+# 结果保存为 JSON，可以用 --compare 和之前版本的结果对比，如：
+# python bench-stat.py --rows 1000000 --output bench-new.json --compare bench-old.json
+
+import os
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import importlib.util
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout
+
+from bench_tree import generate_tree
+from ledger_common import ledger_files
+from video_tree import discover_directories
+from stat_table import ReleaseTable
+from stat_index import open_index, update_index, IndexTable
+from stat_export import export_workbook, iter_detail_rows
+from stat_plot import render_charts
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(file_name, module_name):
+    """
+    按文件路径导入带连字符的脚本（publish-stat.py、skip-upload.py）
+    """
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def git_revision():
+    """
+    当前代码的 git 提交，不在 git 仓库中时返回 None
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=SCRIPT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(run, setup=None, repeat=3, memory=True):
+    """
+    执行 repeat 次计时，memory 为真时再执行一次 tracemalloc 统计峰值内存（单独执行，避免内存跟踪影响计时）
+    setup 在每次执行前调用，不计入耗时；各阶段的输出不打印
+    返回 (最后一次的返回值, 每次的耗时列表, 峰值内存字节数或 None)
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        with redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = run()
+            times.append(time.perf_counter() - started)
+
+    if not memory:
+        return result, times, None
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        with redirect_stdout(io.StringIO()):
+            run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, times, peak
+
+
+def run_benchmarks(base_dir, work_dir, tree, repeat=3, jobs=1, stages=None, memory=True, writes=True):
+    """
+    依次执行 publish-stat 和 skip-upload 的各个阶段，返回 {阶段名: 结果}
+    stages 不为空时只测试其中的阶段，后续阶段依赖的结果仍会执行一次但不记录
+    writes 为假时跳过会写入发布记录的 skip_upload 阶段
+    """
+    publish_stat = load_script("publish-stat.py", "publish_stat")
+    skip_upload = load_script("skip-upload.py", "skip_upload")
+    ledger_rows = tree["ledger_rows"]
+    results = {}
+
+    def stage(name, run, rows, setup=None, needed=False):
+        wanted = stages is None or name in stages
+        if not wanted:
+            if not needed:
+                return None
+            if setup:
+                setup()
+            with redirect_stdout(io.StringIO()):
+                return run()
+
+        result, times, peak = measure(run, setup, repeat, memory)
+        best = min(times)
+        peak_mb = peak / 1024 / 1024 if peak is not None else None
+        results[name] = {
+            "seconds": best,
+            "runs": times,
+            "rows": rows,
+            "rows_per_second": rows / best if best > 0 else None,
+            "peak_memory_mb": peak_mb,
+        }
+        memory_text = f"{peak_mb:>10.1f} MB" if peak_mb is not None else ""
+        print(f"{name:<22}{best:>10.4f} 秒{rows / best if best > 0 else 0:>16,.0f} 行/秒{memory_text}")
+        return result
+
+    print(f"{'阶段':<20}{'耗时':>12}{'吞吐量':>16}{'峰值内存':>10}")
+
+    directories = stage("discover", lambda: discover_directories(base_dir), tree["directories"], needed=True)
+    all_data = stage("analyze", lambda: publish_stat.collect_all_data(directories, None, jobs), ledger_rows,
+                     needed=True)
+
+    cache_dir = os.path.join(work_dir, "cache")
+    stage("analyze_cache_cold", lambda: publish_stat.collect_all_data(directories, cache_dir, jobs),
+          ledger_rows, setup=lambda: shutil.rmtree(cache_dir, ignore_errors=True))
+    # 只测试热缓存时先建立一次缓存
+    stage("analyze_cache_warm", lambda: publish_stat.collect_all_data(directories, cache_dir, jobs), ledger_rows,
+          setup=lambda: os.path.isdir(cache_dir) or publish_stat.collect_all_data(directories, cache_dir, jobs))
+
+    table = stage("table", lambda: ReleaseTable.from_all_data(all_data), ledger_rows, needed=True)
+    table_rows = len(table.count)
+    summary_rows = stage("summary_stats", lambda: publish_stat.generate_summary_rows(table), table_rows,
+                         needed=True)
+    daily_stats = stage("daily_stats", lambda: publish_stat.generate_daily_stats(table), table_rows,
+                        needed=True)
+    hourly_stats = stage("hourly_stats", lambda: publish_stat.generate_hourly_stats(table), table_rows,
+                         needed=True)
+    date_hour_stats = stage("date_hour_stats", lambda: publish_stat.generate_date_hour_stats(table), table_rows,
+                            needed=True)
+    stage("format_summary", lambda: publish_stat.format_summary_table(summary_rows), len(summary_rows))
+
+    index_path = os.path.join(work_dir, "index.sqlite3")
+
+    def query_index():
+        conn = open_index(index_path)
+        try:
+            index_table = IndexTable(conn, update_index(conn, directories, jobs))
+            return (index_table.summary_rows(), index_table.daily_stats(),
+                    index_table.hourly_stats(), index_table.date_hour_stats())
+        finally:
+            conn.close()
+
+    def remove_index():
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(index_path + suffix):
+                os.remove(index_path + suffix)
+
+    stage("index_cold", query_index, ledger_rows, setup=remove_index)
+    stage("index_warm", query_index, ledger_rows, setup=lambda: os.path.exists(index_path) or query_index())
+
+    sheets = publish_stat.build_excel_sheets(summary_rows, daily_stats)
+    excel_path = os.path.join(work_dir, "video_stats.xlsx")
+    stage("excel", lambda: export_workbook(excel_path, sheets), sum(len(rows) for _, _, rows in sheets))
+    stage("excel_details", lambda: export_workbook(excel_path, sheets, iter_detail_rows(directories)),
+          ledger_rows)
+
+    if importlib.util.find_spec("matplotlib") is None:
+        print("未安装 matplotlib，跳过绘图阶段")
+    else:
+        charts = [
+            ("trend", daily_stats, os.path.join(work_dir, "trend.png")),
+            ("hourly", hourly_stats, os.path.join(work_dir, "hourly.png")),
+            ("date_hour", date_hour_stats, os.path.join(work_dir, "date_hour.png")),
+        ]
+        stage("plot", lambda: render_charts(charts, 1), len(daily_stats) + len(hourly_stats) + len(date_hour_stats))
+
+    fixed_dirs = [fixed_dir for _, _, fixed_dir in directories]
+    stage("skip_upload_dry_run",
+          lambda: [skip_upload.process_directory(d, dry_run=True) for d in fixed_dirs], ledger_rows)
+    # 第一次执行后待发布视频都已写入记录，之后的执行只是加锁读取记录并确认没有新视频
+    if writes:
+        stage("skip_upload",
+              lambda: [skip_upload.process_directory(d) for d in fixed_dirs], ledger_rows + tree["pending"])
+    elif stages is None or "skip_upload" in stages:
+        print("skip_upload 阶段会为所有待发布视频写入跳过记录，使用已有目录时跳过（可用 --allow-writes 开启）")
+    return results
+
+
+def compare_results(old, new):
+    """
+    按阶段对比两次测试结果的耗时和峰值内存
+    """
+    print(f"\n与 {old.get('revision') or '之前的结果'} 对比:")
+    if old.get("tree") != new["tree"]:
+        print("注意: 两次测试的目录规模不同，耗时不能直接比较")
+    print(f"{'阶段':<20}{'之前(秒)':>12}{'现在(秒)':>12}{'变化':>10}{'内存变化(MB)':>14}")
+    for name, result in new["stages"].items():
+        previous = old.get("stages", {}).get(name)
+        if not previous:
+            continue
+        change = (result["seconds"] / previous["seconds"] - 1) * 100 if previous["seconds"] else 0
+        line = f"{name:<22}{previous['seconds']:>12.4f}{result['seconds']:>12.4f}{change:>+9.1f}%"
+        if result["peak_memory_mb"] is not None and previous.get("peak_memory_mb") is not None:
+            line += f"{result['peak_memory_mb'] - previous['peak_memory_mb']:>+14.1f}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='publish-stat.py 和 skip-upload.py 的性能测试')
+    parser.add_argument('--base-dir', type=str,
+                        help='使用已有的视频目录，不指定时生成模拟目录；已有目录默认不执行会写入发布记录的 skip_upload 阶段')
+    parser.add_argument('--allow-writes', action='store_true',
+                        help='使用 --base-dir 时也执行 skip_upload 阶段，会为所有待发布视频写入 30000000/ 跳过记录')
+    parser.add_argument('--platforms', type=int, default=3, help='模拟的平台数，默认 3')
+    parser.add_argument('--lang-pairs', type=int, default=3, help='每个平台的语言组合数，默认 3')
+    parser.add_argument('--rows', type=int, default=10000, help='每个目录的发布记录行数，默认 10000')
+    parser.add_argument('--pending', type=int, default=20, help='每个目录的待发布视频数，默认 20')
+    parser.add_argument('--legacy-ratio', type=float, default=0.05, help='没有时间戳的旧记录比例，默认 0.05')
+    parser.add_argument('--placeholder-ratio', type=float, default=0.02,
+                        help='skip-upload.py 写入的 30000000/ 占位记录比例，默认 0.02')
+    parser.add_argument('--days', type=int, default=365, help='发布记录覆盖的天数，默认 365')
+    parser.add_argument('--seed', type=int, default=0, help='随机数种子，默认 0')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段计时的次数，取最快的一次，默认 3')
+    parser.add_argument('--jobs', type=int, default=1, help='并发分析目录的线程数，默认 1')
+    parser.add_argument('--stages', type=str, help='只测试这些阶段，逗号分隔')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='不统计峰值内存（tracemalloc 会让大数据量下的测试明显变慢）')
+    parser.add_argument('--output', type=str, help='测试结果 JSON 输出路径')
+    parser.add_argument('--compare', type=str, help='与之前保存的测试结果 JSON 对比')
+    parser.add_argument('--keep', action='store_true', help='保留生成的模拟目录和中间文件')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench-stat-")
+    params = {key: getattr(args, key) for key in
+              ("platforms", "lang_pairs", "rows", "pending", "legacy_ratio", "placeholder_ratio",
+               "days", "seed", "repeat", "jobs")}
+    try:
+        if args.base_dir:
+            base_dir = args.base_dir
+            directories = discover_directories(base_dir)
+            tree = {"directories": len(directories), "ledger_rows": 0, "pending": 0}
+            for _, _, fixed_dir in directories:
+                for csv_path in ledger_files(fixed_dir):
+                    try:
+                        with open(csv_path, 'rb') as f:
+                            tree["ledger_rows"] += sum(1 for _ in f)
+                    except FileNotFoundError:
+                        pass
+            params = {"base_dir": base_dir, "repeat": args.repeat, "jobs": args.jobs,
+                      "allow_writes": args.allow_writes}
+        else:
+            base_dir = os.path.join(work_dir, "videos")
+            started = time.perf_counter()
+            tree = generate_tree(base_dir, args.platforms, args.lang_pairs, args.rows, args.pending,
+                                 args.legacy_ratio, args.placeholder_ratio, args.days, args.seed)
+            print(f"已生成模拟目录: {tree['directories']} 个目录，{tree['ledger_rows']:,} 条发布记录，"
+                  f"用时 {time.perf_counter() - started:.2f} 秒")
+
+        stages = set(args.stages.split(',')) if args.stages else None
+        # 生成的模拟目录随时可以丢弃，已有目录只有明确允许时才写入
+        writes = not args.base_dir or args.allow_writes
+        results = run_benchmarks(base_dir, work_dir, tree, args.repeat, args.jobs, stages, not args.no_memory,
+                                 writes)
+    finally:
+        if args.keep:
+            print(f"中间文件保留在: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "revision": git_revision(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "machine": platform.platform(),
+        "params": params,
+        "tree": tree,
+        "stages": results,
+    }
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n测试结果已保存至: {args.output}")
+
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                compare_results(json.load(f), report)
+        except (OSError, ValueError) as e:
+            print(f"读取对比结果时出错: {e}")
+
+
+if __name__ == "__main__":
+    main()
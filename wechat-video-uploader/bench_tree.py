@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+# bench_tree.py
+# 生成用于性能测试的模拟视频目录: 基础目录/<平台>/fixed-<语言组合>/
+# 每个目录下写入指定行数的 0-released.csv 和指定数量的待发布 mp4 空文件，
+# 发布记录中按比例混入没有时间戳的旧记录和 skip-upload.py 写入的 30000000/ 占位记录
+
+import os
+import random
+from datetime import date, timedelta
+
+from ledger_common import RELEASED_CSV
+from video_tree import PLATFORMS, LANGUAGE_PAIRS, FIXED_DIR_PREFIX
+
+# 每次写入文件的行数
+WRITE_CHUNK_ROWS = 100000
+
+
+def tree_names(count, preset, pattern):
+    """
+    取 count 个名称，先用预设列表，不够时按 pattern 编号补充
+    """
+    names = list(preset[:count])
+    names.extend(pattern.format(i) for i in range(len(names), count))
+    return names
+
+
+def iter_ledger_lines(rng, rows, start_day, days, legacy_ratio, placeholder_ratio, prefix):
+    """
+    逐行产出模拟的发布记录
+    """
+    for i in range(rows):
+        draw = rng.random()
+        name = f"{prefix}{i:07d}.mp4"
+        if draw < placeholder_ratio:
+            # skip-upload.py 写入的占位记录
+            yield f"30000000/{name}\n"
+            continue
+
+        day = start_day + timedelta(days=rng.randrange(days))
+        date_dir = day.strftime("%Y%m%d")
+        if draw < placeholder_ratio + legacy_ratio:
+            # 没有时间戳列的旧记录
+            yield f"{date_dir}/{name}\n"
+        else:
+            yield (f"{date_dir}/{name},{date_dir}{rng.randrange(24):02d}"
+                   f"{rng.randrange(60):02d}{rng.randrange(60):02d}\n")
+
+
+def generate_tree(base_dir, platforms=3, lang_pairs=3, rows=10000, pending=20,
+                  legacy_ratio=0.05, placeholder_ratio=0.02, days=365, seed=0):
+    """
+    在 base_dir 下生成模拟视频目录，rows 和 pending 为每个目录的发布记录行数和待发布视频数
+    同样的参数和 seed 生成的内容完全相同，便于不同版本之间对比
+    返回 {"directories": 目录数, "ledger_rows": 发布记录数, "pending": 待发布数}，写入测试结果 JSON
+    """
+    rng = random.Random(seed)
+    start_day = date(2025, 1, 1)
+    directories = 0
+    for platform in tree_names(platforms, PLATFORMS, "platform{}"):
+        for lang_pair in tree_names(lang_pairs, LANGUAGE_PAIRS, "l{}-xx"):
+            fixed_dir = os.path.join(base_dir, platform, FIXED_DIR_PREFIX + lang_pair)
+            os.makedirs(fixed_dir, exist_ok=True)
+            prefix = f"{platform}-{lang_pair}-"
+
+            lines = iter_ledger_lines(rng, rows, start_day, days, legacy_ratio, placeholder_ratio, prefix)
+            with open(os.path.join(fixed_dir, RELEASED_CSV), 'w', encoding='utf-8') as f:
+                chunk = []
+                for line in lines:
+                    chunk.append(line)
+                    if len(chunk) >= WRITE_CHUNK_ROWS:
+                        f.write(''.join(chunk))
+                        chunk = []
+                f.write(''.join(chunk))
+
+            for i in range(pending):
+                open(os.path.join(fixed_dir, f"{prefix}pending{i:05d}.mp4"), 'wb').close()
+            directories += 1
+
+    return {
+        "directories": directories,
+        "ledger_rows": directories * rows,
+        "pending": directories * pending,
+    }
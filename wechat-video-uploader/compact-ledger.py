@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+# 整理 0-released.csv 发布记录文件: 去掉空行和首尾空白，按记录路径去重，没有时间戳的记录在前，
+# 其余按发布时间戳排序，整理后原子替换原文件；无法原样还原的行（文件名带逗号、时间戳不规范等）原样保留。如：
+# python compact-ledger.py --d /path/to/videos/douyin/fixed-zh-zh
+# 指定 --keep-months 时 0-released.csv 只保留最近几个月的记录，较早的记录按月移入
+# 0-released-segments/ 下的分段文件，manifest.json 列出有效的分段，publish-stat.py 和 skip-upload.py 都会读取。
+# 批量模式: 处理基础目录下所有 <平台>/fixed-<语言组合> 目录，如：
+# python compact-ledger.py --root /path/to/videos --keep-months 2 --dry-run
+# 注意: upload_common.js 追加记录时不加锁，整理期间追加的记录可能丢失，请在没有上传进程运行时整理。
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from ledger_common import (
+    RELEASED_CSV, SEGMENT_DIR, SEGMENT_MANIFEST, SEGMENT_MANIFEST_VERSION,
+    parse_release_line, load_segment_manifest, ledger_segments
+)
+from ledger_io import locked_ledger, replace_locked, write_atomic
+from video_tree import discover_directories
+
+# 没有时间戳的记录所在的分段
+UNDATED_SEGMENT = "undated"
+
+# upload_common.js 追加记录时不加锁，整理期间文件被追加时重新整理的次数
+MAX_ATTEMPTS = 3
+
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(
+        description='整理发布记录文件，可按月分段',
+        epilog='upload_common.js 追加发布记录时不加锁，整理期间追加的记录可能丢失，请在所有上传进程停止后运行')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--d', '--dir', help='指定视频文件目录')
+    target.add_argument('--root', help='批量模式: 处理该目录下所有 <平台>/fixed-<语言组合> 目录')
+    segments = parser.add_mutually_exclusive_group()
+    segments.add_argument('--keep-months', type=int,
+                          help='0-released.csv 只保留最近 N 个月（含本月）的记录，较早的记录按月移入分段文件')
+    segments.add_argument('--merge-segments', action='store_true', help='把分段文件中的记录全部合并回 0-released.csv')
+    parser.add_argument('--jobs', type=int, default=4, help='批量模式下并发处理目录的线程数，默认 4')
+    parser.add_argument('--dry-run', action='store_true', help='只显示整理结果，不写入文件')
+
+    args = parser.parse_args()
+    if args.keep_months is not None and args.keep_months < 1:
+        parser.error("--keep-months 至少为 1")
+    return args
+
+
+def cutoff_month(keep_months, today=None):
+    """
+    保留最近 keep_months 个月时，早于该月份（YYYYMM）的记录移入分段
+    """
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return f"{index // 12:04d}{index % 12 + 1:02d}"
+
+
+def normalize_records(lines):
+    """
+    解析并规范化记录行，按记录路径（日期目录/文件名）去重
+    同一路径出现多次时保留有时间戳的、时间戳最早的一条
+    只有能由 record_line 原样还原的行（没有逗号，或只有一个逗号且后面是 14 位数字时间戳）才参与整理，
+    文件名带逗号、时间戳不是 14 位或有多余列的行原样保留，不去重、不移入分段
+    返回 ({路径: 时间戳或 None}, [原样保留的行], 空行数, 重复行数)
+    """
+    records = {}
+    verbatim = []
+    blank = duplicates = 0
+    for line in lines:
+        record = parse_release_line(line)
+        if record is None or not record.path:
+            blank += 1
+            continue
+        if (record_line(record.path, record.timestamp) != line.strip()
+                or (record.timestamp is not None and not record.timestamp.isdigit())):
+            verbatim.append(line.rstrip('\r\n'))
+            continue
+        if record.path in records:
+            duplicates += 1
+            kept = records[record.path]
+            if kept is not None and (record.timestamp is None or record.timestamp >= kept):
+                continue
+            if kept is None and record.timestamp is None:
+                continue
+        records[record.path] = record.timestamp
+    return records, verbatim, blank, duplicates
+
+
+def record_line(path, timestamp):
+    """
+    规范格式的记录行（不含换行）
+    """
+    return f"{path},{timestamp}" if timestamp is not None else path
+
+
+def layout_records(records, verbatim=(), cutoff=None):
+    """
+    排序并分配记录: 没有时间戳的记录按路径排在前面，其余按 (时间戳, 路径) 排序
+    原样保留的行按原来的顺序留在 0-released.csv 中，排在有时间戳的记录之前
+    cutoff 为 YYYYMM 时，没有时间戳的记录和早于该月的记录移入分段
+    返回 ({分段名: [记录行]}, [0-released.csv 的记录行])，分段名为 undated 或 YYYY-MM，按顺序排列
+    """
+    undated = sorted(path for path, timestamp in records.items() if timestamp is None)
+    dated = sorted((timestamp, path) for path, timestamp in records.items() if timestamp is not None)
+
+    if cutoff is None:
+        return {}, [record_line(path, None) for path in undated] + list(verbatim) + \
+            [record_line(path, timestamp) for timestamp, path in dated]
+
+    segments = {}
+    if undated:
+        segments[UNDATED_SEGMENT] = [record_line(path, None) for path in undated]
+    active = list(verbatim)
+    for timestamp, path in dated:
+        if timestamp[:6] < cutoff:
+            segments.setdefault(f"{timestamp[:4]}-{timestamp[4:6]}", []).append(record_line(path, timestamp))
+        else:
+            active.append(record_line(path, timestamp))
+    return segments, active
+
+
+def segment_entry(name, lines):
+    """
+    分段清单中的一项，文件名带内容摘要: 内容不变时沿用原文件，变化时写入新文件，
+    旧清单引用的文件在新清单生效之前不会被修改
+    """
+    data = ''.join(line + '\n' for line in lines).encode('utf-8')
+    digest = hashlib.sha1(data).hexdigest()
+    timestamps = [int(line.rpartition(',')[2]) for line in lines] if name != UNDATED_SEGMENT else []
+    return {
+        "file": f"{name}-{digest[:12]}.csv",
+        "month": name,
+        "rows": len(lines),
+        "min_ts": min(timestamps) if timestamps else None,
+        "max_ts": max(timestamps) if timestamps else None,
+        "sha1": digest,
+    }, data
+
+
+def write_segments(video_dir, segments, cutoff):
+    """
+    写入分段文件和分段清单，返回新清单中的文件名集合
+    先写分段文件，最后原子替换清单；此时 0-released.csv 还没有替换，短时间内部分记录会被重复统计，
+    中途失败时重新整理即可去掉重复
+    """
+    segment_dir = os.path.join(video_dir, SEGMENT_DIR)
+    os.makedirs(segment_dir, exist_ok=True)
+    entries = []
+    for name, lines in segments.items():
+        entry, data = segment_entry(name, lines)
+        path = os.path.join(segment_dir, entry["file"])
+        if not os.path.exists(path):
+            write_atomic(path, data)
+        entries.append(entry)
+
+    manifest = {
+        "version": SEGMENT_MANIFEST_VERSION,
+        "cutoff": cutoff,
+        "compacted_at": datetime.now().isoformat(timespec='seconds'),
+        "segments": entries,
+    }
+    write_atomic(os.path.join(segment_dir, SEGMENT_MANIFEST),
+                 json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8'))
+    return {entry["file"] for entry in entries}
+
+
+def remove_segments(video_dir, old_files, keep_files):
+    """
+    删除旧清单中引用、新清单中不再引用的分段文件；新清单为空时同时删除清单和分段目录
+    """
+    segment_dir = os.path.join(video_dir, SEGMENT_DIR)
+    for file_name in old_files - keep_files:
+        try:
+            os.remove(os.path.join(segment_dir, file_name))
+        except FileNotFoundError:
+            pass
+    if not keep_files:
+        try:
+            os.remove(os.path.join(segment_dir, SEGMENT_MANIFEST))
+            os.rmdir(segment_dir)
+        except OSError:
+            # 目录中还有其他文件时保留目录
+            pass
+
+
+def read_segment_lines(video_dir, manifest):
+    """
+    读取分段清单中所有分段文件的记录行
+    """
+    lines = []
+    for segment_file in ledger_segments(video_dir, manifest):
+        with open(segment_file, 'r', encoding='utf-8', errors='replace') as f:
+            lines.extend(f.read().splitlines())
+    return lines
+
+
+def compact_directory(video_dir, keep_months=None, merge_segments=False, dry_run=False):
+    """
+    整理一个目录的发布记录（含分段文件），整个过程持有 0-released.csv 的排他锁
+    不指定 keep_months 和 merge_segments 时沿用上次整理的分段月份
+    返回 {"原有行数", "整理后行数", "空行", "重复", "原样保留": 无法规范化的行数, "分段": 分段数, "错误": 错误信息或 None}
+    """
+    csv_file = os.path.join(video_dir, RELEASED_CSV)
+    result = {"原有行数": 0, "整理后行数": 0, "空行": 0, "重复": 0, "原样保留": 0, "分段": 0, "错误": None}
+    if not os.path.exists(csv_file) and not os.path.isdir(os.path.join(video_dir, SEGMENT_DIR)):
+        # 还没有发布记录的目录不创建空文件
+        return result
+    try:
+        for _ in range(MAX_ATTEMPTS):
+            with locked_ledger(csv_file) as f:
+                size = os.fstat(f.fileno()).st_size
+                f.seek(0)
+                active_lines = f.read().decode('utf-8', errors='replace').splitlines()
+                manifest = load_segment_manifest(video_dir)
+                lines = read_segment_lines(video_dir, manifest) + active_lines
+
+                if merge_segments:
+                    cutoff = None
+                elif keep_months is not None:
+                    cutoff = cutoff_month(keep_months)
+                else:
+                    cutoff = manifest["cutoff"] if manifest else None
+
+                records, verbatim, blank, duplicates = normalize_records(lines)
+                segments, active = layout_records(records, verbatim, cutoff)
+                result.update({"原有行数": len(lines), "整理后行数": len(records) + len(verbatim), "空行": blank,
+                               "重复": duplicates, "原样保留": len(verbatim), "分段": len(segments)})
+                if dry_run:
+                    return result
+
+                old_files = {segment["file"] for segment in manifest["segments"]} if manifest else set()
+                keep_files = write_segments(video_dir, segments, cutoff) if segments else set()
+                if not replace_locked(f, csv_file, active, expected_size=size):
+                    # 读取之后被追加了新记录，重新整理；已写入的分段在下一轮去重
+                    continue
+                remove_segments(video_dir, old_files, keep_files)
+                return result
+        result["错误"] = f"整理期间文件持续被追加，已重试 {MAX_ATTEMPTS} 次"
+    except OSError as e:
+        result["错误"] = str(e)
+    return result
+
+
+def print_result(video_dir, result, dry_run=False):
+    """打印单个目录的整理结果"""
+    if result["错误"]:
+        print(f"整理 {video_dir} 时出错: {result['错误']}")
+        return
+    action = "将整理为" if dry_run else "整理为"
+    print(f"{video_dir}: {result['原有行数']} 行{action} {result['整理后行数']} 条记录，"
+          f"去掉 {result['空行']} 个空行和 {result['重复']} 条重复记录，"
+          f"原样保留 {result['原样保留']} 行无法规范化的记录，{result['分段']} 个分段")
+
+
+def run_batch(root, jobs=4, keep_months=None, merge_segments=False, dry_run=False):
+    """
+    批量模式: 遍历一次 root 找出所有目标目录，多线程并发整理，最后输出汇总
+    """
+    directories = discover_directories(root)
+    if not directories:
+        print(f"错误: 目录 '{root}' 下没有找到 <平台>/fixed-<语言组合> 目录")
+        sys.exit(1)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        results = list(executor.map(
+            lambda d: compact_directory(d[2], keep_months, merge_segments, dry_run), directories))
+
+    lines = [f"{'平台':<12}{'语言':<10}{'原有行数':>10}{'整理后':>10}{'空行':>8}{'重复':>8}{'分段':>6}"]
+    errors = 0
+    for (platform, lang_pair, _), result in zip(directories, results):
+        line = (f"{platform:<12}{lang_pair:<10}{result['原有行数']:>14}{result['整理后行数']:>13}"
+                f"{result['空行']:>10}{result['重复']:>10}{result['分段']:>8}")
+        if result["错误"]:
+            errors += 1
+            line += f"  错误: {result['错误']}"
+        lines.append(line)
+
+    action = "将整理" if dry_run else "整理了"
+    lines.append(f"\n处理完成: {action} {len(directories) - errors} 个目录，"
+                 f"去掉 {sum(r['空行'] for r in results)} 个空行和 {sum(r['重复'] for r in results)} 条重复记录，"
+                 f"原样保留 {sum(r['原样保留'] for r in results)} 行无法规范化的记录，"
+                 f"{errors} 个目录出错")
+    print('\n'.join(lines))
+
+
+def main():
+    """主函数"""
+    args = parse_args()
+
+    if args.root:
+        run_batch(args.root, args.jobs, args.keep_months, args.merge_segments, args.dry_run)
+        return
+
+    # 检查目录是否存在
+    if not os.path.isdir(args.d):
+        print(f"错误: 目录 '{args.d}' 不存在")
+        sys.exit(1)
+
+    result = compact_directory(args.d, args.keep_months, args.merge_segments, args.dry_run)
+    print_result(args.d, result, args.dry_run)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# ledger_common.py
+# 0-released.csv 发布记录文件的公共解析函数，供 publish-stat.py 等脚本共用
+# 记录格式: 日期目录/文件名.mp4[,发布时间戳]，如 20250302/video.mp4,20250302121530
+
+import os
+import re
+import json
+from collections import Counter, namedtuple
+from datetime import datetime
+from functools import lru_cache
+
+# 发布记录文件名
+RELEASED_CSV = "0-released.csv"
+
+# 发布记录分段目录: compact-ledger.py 把较早的记录按月移入其中，
+# manifest.json 列出当前有效的分段文件，不在清单中的文件一律忽略
+SEGMENT_DIR = "0-released-segments"
+SEGMENT_MANIFEST = "manifest.json"
+SEGMENT_MANIFEST_VERSION = 1
+
+# 单条发布记录: 原始路径, 日期目录对应的日期, 时间戳中的发布日期, 时间戳中的小时, 14位原始时间戳
+ReleaseRecord = namedtuple("ReleaseRecord", ["path", "date_dir", "release_date", "hour", "timestamp"])
+
+DATE_DIR_PATTERN = re.compile(r"(\d{8})/")
+
+# 统计结果中缺失的日期和小时的取值，日期以整数序数(date.toordinal())保存
+MISSING_DATE = 0
+MISSING_HOUR = -100
+
+
+@lru_cache(maxsize=4096)
+def parse_ymd(date_str):
+    """
+    把 YYYYMMDD 字符串转换为日期对象，无效日期返回 None
+    同一个日期会在记录中重复出现很多次，所以缓存解析结果
+    """
+    try:
+        return datetime.strptime(date_str, "%Y%m%d").date()
+    except ValueError:
+        return None
+
+
+def parse_release_date(filename):
+    """
+    从发布文件名中提取日期
+    格式示例: 20250302/video.mp4
+    """
+    match = DATE_DIR_PATTERN.match(filename)
+    if match:
+        return parse_ymd(match.group(1))
+    return None
+
+
+def parse_release_line(line):
+    """
+    解析一行发布记录，空行返回 None
+    旧格式的记录没有时间戳列，此时 release_date 和 hour 为 None
+    """
+    line = line.strip()
+    if not line:
+        return None
+
+    parts = line.split(',')
+    release_date = None
+    hour = None
+    timestamp = None
+    if len(parts) >= 2:
+        time_str = parts[1].strip()
+        if len(time_str) == 14:
+            timestamp = time_str
+            try:
+                # 提取小时部分 (第9-10位)
+                hour = int(time_str[8:10])
+            except ValueError:
+                hour = None
+            else:
+                # 提取日期部分 (前8位)
+                release_date = parse_ymd(time_str[:8])
+
+    return ReleaseRecord(parts[0].strip(), parse_release_date(line), release_date, hour, timestamp)
+
+
+def iter_ledger(csv_path):
+    """
+    逐行读取发布记录文件，依次产出 ReleaseRecord，文件只打开和读取一次
+    末尾没有换行结束的行可能还在写入中，不产出
+    """
+    with open(csv_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            record = parse_release_line(line)
+            if record is not None:
+                yield record
+
+
+def load_segment_manifest(fixed_dir):
+    """
+    读取目录的分段清单，没有分段时返回 None
+    清单损坏或版本不符时打印警告并返回 None，此时只统计 0-released.csv
+    """
+    manifest_path = os.path.join(fixed_dir, SEGMENT_DIR, SEGMENT_MANIFEST)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"读取分段清单 {manifest_path} 时出错: {e}")
+        return None
+
+    if not isinstance(manifest, dict) or manifest.get("version") != SEGMENT_MANIFEST_VERSION:
+        print(f"忽略分段清单 {manifest_path}: 版本不符")
+        return None
+    return manifest
+
+
+def ledger_segments(fixed_dir, manifest=None):
+    """
+    目录中分段文件的路径列表，按清单中的顺序（没有时间戳的记录在前，之后按月份）
+    """
+    manifest = manifest or load_segment_manifest(fixed_dir)
+    if manifest is None:
+        return []
+    return [os.path.join(fixed_dir, SEGMENT_DIR, segment["file"]) for segment in manifest["segments"]]
+
+
+def ledger_files(fixed_dir):
+    """
+    目录的所有发布记录文件: 先是各分段文件，最后是仍在追加的 0-released.csv
+    """
+    return ledger_segments(fixed_dir) + [os.path.join(fixed_dir, RELEASED_CSV)]
+
+
+def new_summary():
+    """
+    创建空的发布记录统计结果
+    发布分布以 (日期目录, 发布日期, 小时) 为键计数，日期为整数序数，小时为整数，
+    缺失的日期为 MISSING_DATE，缺失的小时为 MISSING_HOUR；键只由小整数组成，不保存日期对象。
+    日期分布、时间段分布和日期时间分布都可以由它汇总得到
+    """
+    return {
+        "已发布数": 0,
+        "发布分布": Counter(),
+    }
+
+
+def add_record(summary, record):
+    """
+    把一条发布记录累加到统计结果中
+    """
+    summary["已发布数"] += 1
+    summary["发布分布"][(
+        record.date_dir.toordinal() if record.date_dir is not None else MISSING_DATE,
+        record.release_date.toordinal() if record.release_date is not None else MISSING_DATE,
+        record.hour if record.hour is not None else MISSING_HOUR,
+    )] += 1
+
+
+def merge_summary(summary, other):
+    """
+    把另一份统计结果累加到 summary 中
+    """
+    summary["已发布数"] += other["已发布数"]
+    summary["发布分布"].update(other["发布分布"])
+    return summary
+
+
+def scan_ledger(f, summary, offset=0):
+    """
+    从字节偏移 offset 开始读取已打开（二进制模式）的发布记录文件，把完整的行累加到 summary
+    返回最后一个完整行之后的字节偏移
+    文件末尾没有换行结束的行可能是其他进程正在追加的记录，不计入 summary，
+    下次从返回的偏移重新读取时再统计
+    """
+    f.seek(offset)
+    for raw in f:
+        if not raw.endswith(b'\n'):
+            break
+        offset += len(raw)
+        record = parse_release_line(raw.decode('utf-8', errors='replace'))
+        if record is not None:
+            add_record(summary, record)
+    return offset
+
+
+def read_records(f, offset=0):
+    """
+    从字节偏移 offset 开始读取已打开（二进制模式）的发布记录文件中完整的行
+    返回 (ReleaseRecord 列表, 最后一个完整行之后的字节偏移)，末尾不完整的行同 scan_ledger 留到下次读取
+    """
+    f.seek(offset)
+    records = []
+    for raw in f:
+        if not raw.endswith(b'\n'):
+            break
+        offset += len(raw)
+        record = parse_release_line(raw.decode('utf-8', errors='replace'))
+        if record is not None:
+            records.append(record)
+    return records, offset
+
+
+def summarize_ledger(csv_path):
+    """
+    单次遍历发布记录文件，同时得到已发布数和发布分布
+    文件不存在时返回空统计；整个目录（含分段文件）的统计对每个 ledger_files 分别调用后用 merge_summary 合并
+    """
+    summary = new_summary()
+
+    try:
+        with open(csv_path, 'rb') as f:
+            scan_ledger(f, summary)
+    except FileNotFoundError:
+        pass
+    return summary
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# ledger_fast.py
+# 0-released.csv 的向量化解析
+# 把发布记录文件内存映射后用 numpy 在字节层面一次处理一大块: 按换行切分行，
+# 检查开头的 8 位日期目录和末尾固定宽度的 14 位时间戳，批量解码为整数数组再分组计数，
+# 不为每一行创建 Python 字符串。没有时间戳列的旧记录只要日期目录完整也批量处理；
+# 其余不符合格式的行（空行、含多余逗号或空白、时间戳不完整的行）逐行交给
+# ledger_common.parse_release_line 处理，结果与 scan_ledger 完全一致。
+
+import os
+import mmap
+
+import numpy as np
+
+from ledger_common import (
+    MISSING_DATE, MISSING_HOUR, new_summary, add_record, parse_release_line, scan_ledger
+)
+
+# 每次处理的字节数，临时数组的大小与之成正比
+CHUNK_BYTES = 32 * 1024 * 1024
+
+# 小于该字节数的部分直接逐行解析，内存映射和数组运算的固定开销不划算
+MIN_VECTOR_BYTES = 64 * 1024
+
+# 1970-01-01 的日期序数，用于 numpy datetime64 和 date.toordinal() 之间的转换
+EPOCH_ORDINAL = 719163
+
+# 标准格式 YYYYMMDD/x,YYYYMMDDhhmmss 的最短长度
+MIN_FAST_LINE = 8 + 1 + 1 + 1 + 14
+
+NEWLINE, CARRIAGE_RETURN, COMMA, SLASH, ZERO = 10, 13, 44, 47, 48
+
+# 打包分组键时小时占用的取值个数，两位数字的小时为 0-99，100 表示没有时间戳
+HOUR_CODES = 128
+HOUR_CODE_MISSING = 100
+
+DIGIT_WEIGHTS = np.array([10000000, 1000000, 100000, 10000, 1000, 100, 10, 1], dtype=np.int64)
+
+
+def ymd_ordinals(values):
+    """
+    把 YYYYMMDD 整数数组批量转换为日期序数，无效日期为 MISSING_DATE
+    与 datetime.strptime("%Y%m%d") 的判断一致: 年份 1-9999，月份 1-12，日期不超过当月天数
+    """
+    year = values // 10000
+    month = values // 100 % 100
+    day = values % 100
+    valid = (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1)
+
+    months = np.where(valid, (year - 1970) * 12 + month - 1, 0).astype("datetime64[M]")
+    month_start = months.astype("datetime64[D]")
+    month_days = ((months + 1).astype("datetime64[D]") - month_start).astype(np.int64)
+    valid &= day <= month_days
+
+    ordinals = month_start.astype(np.int64) + day - 1 + EPOCH_ORDINAL
+    return np.where(valid, ordinals, MISSING_DATE)
+
+
+def gather(buf, positions, width):
+    """
+    取出 buf 中从每个位置开始的 width 个字节（减去 '0' 后的数值），返回 (n, width) 的数组，
+    越界的位置截断到末尾
+    """
+    index = positions[:, None] + np.arange(width)
+    np.minimum(index, len(buf) - 1, out=index)
+    return buf[index] - ZERO
+
+
+def scan_block(buf, summary):
+    """
+    解析一块以换行结尾的字节，把结果累加到 summary
+    标准格式的行和没有时间戳列的旧格式行批量处理，其余的行逐行解析
+    """
+    ends = np.flatnonzero(buf == NEWLINE)
+    starts = np.empty_like(ends)
+    starts[0] = 0
+    starts[1:] = ends[:-1] + 1
+
+    # 去掉行尾的 \r
+    line_ends = ends.copy()
+    has_cr = buf[np.maximum(ends - 1, 0)] == CARRIAGE_RETURN
+    line_ends[has_cr & (ends > starts)] -= 1
+    lengths = line_ends - starts
+
+    # 每行逗号的数量: 标准格式只有一个，旧格式没有
+    commas = np.flatnonzero(buf == COMMA)
+    comma_counts = np.bincount(np.searchsorted(ends, commas), minlength=len(ends))
+
+    # 开头是 8 位数字加 / 的日期目录
+    dir_digits = gather(buf, starts, 8)
+    has_dir = ((lengths >= 9) & (dir_digits < 10).all(axis=1)
+               & (buf[np.minimum(starts + 8, len(buf) - 1)] == SLASH))
+
+    # 末尾是逗号加 14 位数字的时间戳
+    ts_starts = np.maximum(line_ends - 14, 0)
+    ts_digits = gather(buf, ts_starts, 14)
+    has_ts = ((lengths >= MIN_FAST_LINE) & (comma_counts == 1)
+              & (ts_digits < 10).all(axis=1) & (buf[np.maximum(ts_starts - 1, 0)] == COMMA))
+
+    legacy = has_dir & (comma_counts == 0)
+    fast = has_dir & has_ts
+    bulk = fast | legacy
+
+    if bulk.any():
+        # 日期目录、时间戳日期、小时打包成一个整数后分组计数，只对去重后的键转换日期
+        dir_values = dir_digits[bulk].astype(np.int64) @ DIGIT_WEIGHTS
+        ts_values = np.where(fast[bulk], ts_digits[bulk, :8].astype(np.int64) @ DIGIT_WEIGHTS, 0)
+        hours = np.where(fast[bulk], ts_digits[bulk, 8].astype(np.int64) * 10 + ts_digits[bulk, 9],
+                         HOUR_CODE_MISSING)
+        keys, counts = np.unique((dir_values * 100000000 + ts_values) * HOUR_CODES + hours,
+                                 return_counts=True)
+
+        hours = keys % HOUR_CODES
+        hours[hours == HOUR_CODE_MISSING] = MISSING_HOUR
+        keys //= HOUR_CODES
+        # 旧格式行的时间戳日期为 0，转换后即为 MISSING_DATE
+        release_dates = ymd_ordinals(keys % 100000000)
+        date_dirs = ymd_ordinals(keys // 100000000)
+
+        distribution = summary["发布分布"]
+        for key, count in zip(zip(date_dirs.tolist(), release_dates.tolist(), hours.tolist()), counts.tolist()):
+            distribution[key] += count
+        summary["已发布数"] += int(counts.sum())
+
+    # 其余的行逐行按原有方式解析
+    for start, end in zip(starts[~bulk].tolist(), ends[~bulk].tolist()):
+        record = parse_release_line(bytes(buf[start:end + 1]).decode('utf-8', errors='replace'))
+        if record is not None:
+            add_record(summary, record)
+
+
+def scan_mapped(mm, f, summary, offset, size):
+    """
+    按块解析内存映射的文件，每块截止到块内最后一个换行，返回解析到的字节偏移
+    所有引用映射内存的数组都是本函数的局部变量，返回后即释放，调用方才能关闭 mmap
+    """
+    data = np.frombuffer(mm, dtype=np.uint8)
+    while offset < size:
+        chunk = data[offset:min(offset + CHUNK_BYTES, size)]
+        newlines = np.flatnonzero(chunk == NEWLINE)
+        if len(newlines) == 0:
+            if offset + len(chunk) >= size:
+                # 剩下的是没有换行结束的末尾行
+                break
+            # 单行超过一块的大小，极少出现，其余部分交给逐行解析
+            return scan_ledger(f, summary, offset)
+        block_end = int(newlines[-1]) + 1
+        scan_block(chunk[:block_end], summary)
+        offset += block_end
+    return offset
+
+
+def scan_ledger_fast(f, summary, offset=0):
+    """
+    与 ledger_common.scan_ledger 相同的接口和结果: 从 offset 开始解析已打开（二进制模式）的
+    发布记录文件中完整的行，返回最后一个完整行之后的字节偏移，末尾不完整的行留到下次读取
+    新增部分较小时直接使用 scan_ledger
+    """
+    size = os.fstat(f.fileno()).st_size
+    if size - offset < MIN_VECTOR_BYTES:
+        return scan_ledger(f, summary, offset)
+
+    with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+        return scan_mapped(mm, f, summary, offset, size)
+
+
+def summarize_ledger_fast(csv_path):
+    """
+    与 ledger_common.summarize_ledger 相同，使用向量化解析
+    """
+    summary = new_summary()
+
+    try:
+        with open(csv_path, 'rb') as f:
+            scan_ledger_fast(f, summary)
+    except FileNotFoundError:
+        pass
+    return summary
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# ledger_io.py
+# 0-released.csv 发布记录文件的并发安全读写
+# 上传(upload_common.js)、skip-upload.py 和 publish-stat.py 会同时访问同一个记录文件:
+# 追加写入时持有 fcntl 排他锁，整体重写时写临时文件再原子重命名，
+# 读取方不加锁，末尾还没写完的行推迟到下次读取（见 ledger_common.scan_ledger）
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # 非 POSIX 系统没有 fcntl，退化为不加锁
+    fcntl = None
+
+
+def lock_file(f):
+    """
+    对已打开的文件加排他锁，阻塞直到获得锁
+    """
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+@contextmanager
+def locked_ledger(csv_path):
+    """
+    以排他锁打开发布记录文件（不存在时创建），产出以 a+b 模式打开的文件对象
+    重写会把新文件重命名到原路径，拿到锁后如果路径已经指向另一个文件，重新打开新文件再加锁
+    """
+    while True:
+        f = open(csv_path, 'a+b')
+        try:
+            lock_file(f)
+            try:
+                same_file = os.path.samestat(os.fstat(f.fileno()), os.stat(csv_path))
+            except FileNotFoundError:
+                same_file = False
+        except BaseException:
+            f.close()
+            raise
+        if same_file:
+            break
+        f.close()
+
+    try:
+        yield f
+    finally:
+        # 关闭文件即释放锁
+        f.close()
+
+
+def read_locked_lines(f):
+    """
+    读取已加锁文件中的所有记录行（去掉行尾换行，跳过空行）
+    """
+    f.seek(0)
+    return [line for line in f.read().decode('utf-8', errors='replace').splitlines() if line.strip()]
+
+
+def append_locked(f, lines):
+    """
+    向已加锁的文件一次性追加多行记录
+    文件末尾缺少换行时先补一个换行，避免新记录和最后一行连在一起
+    """
+    if not lines:
+        return
+    data = ''.join(line + '\n' for line in lines).encode('utf-8')
+    f.seek(0, os.SEEK_END)
+    if f.tell() > 0:
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b'\n':
+            data = b'\n' + data
+    f.write(data)
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def append_records(csv_path, lines):
+    """
+    加锁后向发布记录文件追加多行记录
+    """
+    if not lines:
+        return
+    with locked_ledger(csv_path) as f:
+        append_locked(f, lines)
+
+
+def write_atomic(path, data, mode=None, check=None):
+    """
+    先在同一目录写临时文件并落盘，再重命名到 path；读取方要么读到旧文件，要么读到完整的新文件
+    mode 不为 None 时设置新文件的权限；check 不为 None 时在重命名之前调用，返回假则放弃替换
+    返回是否已替换
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            tmp.write(data)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        if mode is not None:
+            os.chmod(tmp_path, mode)
+        if check is not None and not check():
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, path)
+        return True
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def replace_locked(f, csv_path, lines, expected_size=None):
+    """
+    用 lines 整体替换已加锁的发布记录文件，保持原文件的权限
+    重命名时仍持有旧文件的锁，等待锁的写入方拿到锁后会发现文件已被替换并改用新文件
+    upload_common.js 追加记录时不加锁，指定 expected_size 时在临时文件落盘之后、重命名之前检查文件大小，
+    读取之后又被追加了内容则不替换并返回 False，由调用方重新读取；检查和重命名之间仍有极短的窗口，
+    整理记录文件时不应有上传进程在运行
+    """
+    def unchanged():
+        return expected_size is None or os.fstat(f.fileno()).st_size == expected_size
+
+    return write_atomic(csv_path, ''.join(line + '\n' for line in lines).encode('utf-8'),
+                        os.fstat(f.fileno()).st_mode & 0o7777, unchanged)
@@ -2,598 +2,288 @@
 # publish-stat.py
 # 用于统计发布数据,/Users/xmx0632/aivideo/dist/videos 下所有视频的发布数据，使用表格形式输出
 
+# pandas 和 matplotlib 不在启动时导入（绘图见 stat_plot.py，导出见 stat_export.py），只看控制台统计时启动更快
 import os
-import re
-import glob
-import pandas as pd
-from datetime import datetime
-import matplotlib.pyplot as plt
-from collections import defaultdict, Counter
+import unicodedata
+from functools import partial
 import argparse
+from datetime import date, datetime
+
+from ledger_common import new_summary, merge_summary, ledger_files
+from ledger_fast import summarize_ledger_fast
+from video_tree import discover_directories, scan_fixed_dirs, count_pending_videos
+from tree_io import DEFAULT_IO_JOBS, read_directories
+from stat_cache import DEFAULT_CACHE_DIR, load_ledger_summary
+from stat_table import ReleaseTable, RECENT_DAYS, BASELINE_DAYS, DROP_RATIO
+from stat_index import DEFAULT_INDEX_PATH, open_index, update_index, IndexTable, find_releases
+from stat_export import export_release_snapshot, export_workbook, iter_detail_rows
+from stat_plot import render_charts
+from stat_daemon import DEFAULT_POLL_INTERVAL, serve
+from stat_profile import Profiler
+from stat_coverage import build_coverage, print_coverage
+from stat_window import parse_time_bound, summarize_window, summarize_window_dir, window_ledgers
+from stat_partial import build_partial, save_partial, merge_partials
 
 # 基础目录
 BASE_DIR = "/Users/xmx0632/aivideo/dist/videos"
 
-# 平台列表
-PLATFORMS = ["weixin", "weixin_188", "douyin", "kuaishou", "rednote"]
-
-# 语言组合
-LANGUAGE_PAIRS = ["en-ja", "en-zh", "ko-en", "zh-zh", "hk-en", "hk-hk"]
+def count_videos_in_directory(directory, released_count=0):
+    """
+    统计目录中的视频文件数量
+    当前目录下的mp4文件数量加上 0-released.csv 中的视频数量,不包含子目录下的视频数量
+    已发布数由调用方从发布记录中统计后传入，避免重复读取发布记录文件
+    """
+    return count_pending_videos(directory) + released_count
 
 
-def parse_release_date(filename):
+def analyze_directory(fixed_dir, cache_dir=None, window=None):
     """
-    从发布文件名中提取日期
-    格式示例: 20250302/video.mp4
+    分析单个语言组合目录的视频发布数据
+    指定 cache_dir 时使用增量统计缓存，只解析发布记录中新追加的部分
+    指定 window=(since, until) 时只统计发布时间戳在该范围内的记录，借助偏移索引只读取文件末尾附近
     """
-    match = re.match(r"(\d{8})/", filename)
-    if match:
-        date_str = match.group(1)
-        try:
-            return datetime.strptime(date_str, "%Y%m%d").date()
-        except ValueError:
-            return None
-    return None
+    # 单次读取发布记录，同时得到已发布数和各类分布；目录有分段文件时逐个统计后合并
+    if window:
+        ledger = summarize_window_dir(fixed_dir, window[0], window[1], cache_dir)
+    else:
+        ledger = new_summary()
+        for released_csv in ledger_files(fixed_dir):
+            if cache_dir:
+                merge_summary(ledger, load_ledger_summary(released_csv, cache_dir))
+            else:
+                merge_summary(ledger, summarize_ledger_fast(released_csv))
+    return directory_stats(ledger, count_videos_in_directory(fixed_dir, ledger["已发布数"]))
 
 
-def count_videos_in_directory(directory):
+def directory_stats(ledger, total_videos):
     """
-    统计目录中的视频文件数量
-    当前目录下的mp4文件数量加上 0-released.csv 中的视频数量,不包含子目录下的视频数量
+    由目录的发布记录统计和总视频数得到该目录的统计结果
     """
-    if not os.path.exists(directory):
-        return 0
+    released_count = ledger["已发布数"]
+    
+    # 确保已发布数不超过总视频数
+    if released_count > total_videos:
+        # 如果已发布数大于总视频数，则将总视频数调整为已发布数
+        total_videos = released_count
     
-    video_files = glob.glob(os.path.join(directory, "*.mp4"))
-    released_csv = os.path.join(directory, "0-released.csv")
-    released_videos = get_released_videos(released_csv)
-    return len(video_files) + len(released_videos)
+    return {
+        "总视频数": total_videos,
+        "已发布数": released_count,
+        "未发布数": total_videos - released_count,
+        "发布率": round(released_count / total_videos * 100, 2) if total_videos > 0 else 0,
+        "发布分布": ledger["发布分布"]  # (日期目录序数, 发布日期序数, 小时) 的计数
+    }
 
 
-def get_released_videos(csv_path):
+def analyze_platform(platform, cache_dir=None, base_dir=BASE_DIR):
     """
-    从发布CSV文件中获取已发布的视频列表
+    分析特定平台的视频发布数据
     """
-    if not os.path.exists(csv_path):
-        return []
+    results = {}
     
-    with open(csv_path, 'r', encoding='utf-8') as f:
-        return [line.strip() for line in f if line.strip()]
+    # 遍历所有语言组合目录
+    for lang_pair, fixed_dir in scan_fixed_dirs(os.path.join(base_dir, platform)):
+        results[lang_pair] = analyze_directory(fixed_dir, cache_dir)
+    
+    return results
 
 
-def parse_release_time(line):
+def ledger_reader(cache_dir=None, window=None):
     """
-    从CSV行中解析发布时间
-    格式示例: 20250302/video.mp4,20250302121530
-    返回小时数(0-23)
+    返回 (读取单个记录文件的函数, 挑选记录文件的函数)，与 analyze_directory 的读取方式一致
     """
-    parts = line.split(',')
-    if len(parts) >= 2 and parts[1].strip() and len(parts[1].strip()) == 14:
-        try:
-            time_str = parts[1].strip()
-            # 提取小时部分 (第9-10位)
-            hour = int(time_str[8:10])
-            return hour
-        except (ValueError, IndexError):
-            return None
-    return None
+    if window:
+        return (partial(summarize_window, since=window[0], until=window[1], cache_dir=cache_dir),
+                partial(window_ledgers, since=window[0], until=window[1]))
+    if cache_dir:
+        return partial(load_ledger_summary, cache_dir=cache_dir), None
+    return summarize_ledger_fast, None
 
 
-def parse_release_datetime(line):
+def collect_all_data(directories, cache_dir=None, jobs=DEFAULT_IO_JOBS, profiler=None, window=None):
     """
-    从CSV行中解析发布日期和时间
-    格式示例: 20250302/video.mp4,20250302121530
-    返回(日期, 小时)元组
+    收集 discover_directories 找到的各个目录的发布数据，返回 {平台: {语言组合: 统计}}
+    jobs 大于 1 时由 tree_io 按目录分批并发读取: 网络盘上每次 scandir、open 都要等待往返，
+    同时发起所有目录的请求后总耗时由带宽和线程数决定，而不是所有往返延迟之和
+    指定 profiler 时统计每个目录的耗时，指定 window 时只统计该时间范围内的发布记录
     """
-    parts = line.split(',')
-    if len(parts) >= 2 and parts[1].strip() and len(parts[1].strip()) == 14:
-        try:
-            time_str = parts[1].strip()
-            # 提取日期部分 (前8位)
-            date_str = time_str[:8]
-            # 提取小时部分 (第9-10位)
-            hour = int(time_str[8:10])
-            # 转换为日期对象
-            date_obj = datetime.strptime(date_str, "%Y%m%d").date()
-            return (date_obj, hour)
-        except (ValueError, IndexError):
-            return None
-    return None
+    profiler = profiler or Profiler()
+    if jobs <= 1:
+        profiler.track_directory_memory = True
+        results = [profiler.run_directory(platform, lang_pair, analyze_directory, fixed_dir, cache_dir, window)
+                   for platform, lang_pair, fixed_dir in directories]
+        profiler.track_directory_memory = False
+    else:
+        read_ledger, select = ledger_reader(cache_dir, window)
+        batches = read_directories([fixed_dir for _, _, fixed_dir in directories], read_ledger, jobs, select)
+        results = []
+        for (platform, lang_pair, _), (listing, summaries, wall) in zip(directories, batches):
+            ledger = new_summary()
+            for summary in summaries:
+                merge_summary(ledger, summary)
+            stats = directory_stats(ledger, len(listing.pending) + ledger["已发布数"])
+            profiler.add_directory(platform, lang_pair, wall, stats["已发布数"])
+            results.append(stats)
+    
+    # 按目录的发现顺序合并结果
+    all_data = {}
+    for (platform, lang_pair, _), stats in zip(directories, results):
+        all_data.setdefault(platform, {})[lang_pair] = stats
+    return all_data
+
 
+# 汇总表格的列名
+SUMMARY_COLUMNS = ["平台", "语言", "总视频数", "已发布数", "未发布数", "发布率(%)"]
 
-def analyze_platform(platform):
+
+def generate_summary_rows(table):
     """
-    分析特定平台的视频发布数据
+    生成汇总表格的数据行，先按平台再按语言排序
+    已发布数由发布事件表按目录分组求和得到
     """
-    platform_dir = os.path.join(BASE_DIR, platform)
-    if not os.path.exists(platform_dir):
-        return {}
-    
-    results = {}
-    
-    # 遍历所有语言组合目录
-    for lang_pair in LANGUAGE_PAIRS:
-        fixed_dir = os.path.join(platform_dir, f"fixed-{lang_pair}")
-        if not os.path.exists(fixed_dir):
-            continue
-        
-        # 统计总视频数
-        total_videos = count_videos_in_directory(fixed_dir)
-        
-        # 获取已发布视频列表
-        released_csv = os.path.join(fixed_dir, "0-released.csv")
-        released_videos = get_released_videos(released_csv)
-        
-        # 统计发布日期分布
-        release_dates = [parse_release_date(video) for video in released_videos]
-        release_dates = [d for d in release_dates if d is not None]
-        date_counts = Counter(release_dates)
-        
-        # 统计发布时间段分布
-        hour_counts = Counter()
-        # 统计日期+小时分布
-        date_hour_counts = Counter()
-        
-        with open(released_csv, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    hour = parse_release_time(line)
-                    if hour is not None:
-                        hour_counts[hour] += 1
-                    
-                    # 解析日期+小时
-                    datetime_info = parse_release_datetime(line)
-                    if datetime_info:
-                        date_obj, hour = datetime_info
-                        date_hour_counts[(date_obj, hour)] += 1
-        
-        # 提取视频名称（不含日期目录和扩展名）
-        video_names = []
-        for video in released_videos:
-            parts = video.split('/')
-            if len(parts) > 1:
-                name = parts[1].replace('.mp4', '')
-                video_names.append(name)
-        
-        # 确保已发布数不超过总视频数
-        released_count = len(released_videos)
-        if released_count > total_videos:
-            # 如果已发布数大于总视频数，则将总视频数调整为已发布数
-            total_videos = released_count
-        
-        results[lang_pair] = {
-            "总视频数": total_videos,
-            "已发布数": released_count,
-            "未发布数": total_videos - released_count,
-            "发布率": round(released_count / total_videos * 100, 2) if total_videos > 0 else 0,
-            "日期分布": date_counts,
-            "时间段分布": hour_counts,
-            "日期时间分布": date_hour_counts,  # 添加日期+小时分布
-            "视频列表": video_names
-        }
-    
-    return results
+    return sorted(table.summary_rows(), key=lambda row: (row[0], row[1]))
 
 
-def generate_summary_table(all_data):
+def generate_summary_table(table):
     """
-    生成汇总表格
+    生成汇总表格 DataFrame，便于在 notebook 等场景中继续分析
     """
-    summary_data = []
-    
-    for platform in PLATFORMS:
-        if platform not in all_data:
-            continue
-            
-        platform_data = all_data[platform]
-        
-        for lang_pair, stats in platform_data.items():
-            summary_data.append({
-                "平台": platform,
-                "语言": lang_pair,
-                "总视频数": stats["总视频数"],
-                "已发布数": stats["已发布数"],
-                "未发布数": stats["未发布数"],
-                "发布率(%)": stats["发布率"]
-            })
+    import pandas as pd
     
-    # 创建DataFrame
-    if summary_data:
-        df = pd.DataFrame(summary_data)
-        return df
-    else:
-        return pd.DataFrame()
+    return pd.DataFrame(generate_summary_rows(table), columns=SUMMARY_COLUMNS)
+
+
+# 平台工作表的列名
+PLATFORM_COLUMNS = ["语言", "总视频数", "已发布数", "未发布数", "发布率(%)"]
+
+
+# 吞吐量表格的列名
+THROUGHPUT_COLUMNS = ["平台", "语言", "未发布数", "1天发布", "7天发布", "30天发布", "预计清空(天)", "吞吐骤降"]
 
 
-def generate_daily_stats(all_data):
+def generate_throughput_rows(table, as_of):
     """
-    生成每日发布统计
+    生成各目录截至 as_of 的 1/7/30 天发布数、预计清空天数和吞吐骤降标记，先按平台再按语言排序
     """
-    daily_counts = defaultdict(int)
-    
-    for platform in all_data:
-        for lang_pair in all_data[platform]:
-            date_counts = all_data[platform][lang_pair]["日期分布"]
-            for date, count in date_counts.items():
-                daily_counts[date] += count
-    
-    # 按日期排序
-    sorted_dates = sorted(daily_counts.keys())
-    daily_stats = [(date, daily_counts[date]) for date in sorted_dates]
-    
-    return daily_stats
+    return sorted(table.throughput_rows(as_of), key=lambda row: (row[0], row[1]))
 
 
-def generate_hourly_stats(all_data):
+def throughput_cells(rows):
     """
-    生成每小时发布统计
+    把吞吐量数据行转换为文本单元格，没有近期发布而无法估算的清空天数显示为 -
     """
-    hourly_counts = defaultdict(int)
-    
-    for platform in all_data:
-        for lang_pair in all_data[platform]:
-            if "时间段分布" in all_data[platform][lang_pair]:
-                hour_counts = all_data[platform][lang_pair]["时间段分布"]
-                for hour, count in hour_counts.items():
-                    hourly_counts[hour] += count
-    
-    # 按小时排序
-    sorted_hours = sorted(hourly_counts.keys())
-    hourly_stats = [(hour, hourly_counts[hour]) for hour in sorted_hours]
-    
-    return hourly_stats
+    return [
+        [platform, lang_pair, f"{pending:,}", f"{day:,}", f"{week:,}", f"{month:,}",
+         f"{days_to_drain:,.1f}" if days_to_drain is not None else "-", "是" if dropped else ""]
+        for platform, lang_pair, pending, day, week, month, days_to_drain, dropped in rows
+    ]
 
 
-def generate_date_hour_stats(all_data):
+def build_excel_sheets(summary_rows, daily_stats, throughput_rows=None):
     """
-    生成按日期+小时的发布统计
+    生成 Excel 的汇总、每日统计和各平台工作表: [(工作表名, 表头, 数据行)]
     """
-    date_hour_counts = defaultdict(int)
+    sheets = [("汇总", SUMMARY_COLUMNS, summary_rows)]
+    
+    # 创建每日发布统计表
+    if daily_stats:
+        sheets.append(("每日统计", ['日期', '发布数量'], daily_stats))
     
-    for platform in all_data:
-        for lang_pair in all_data[platform]:
-            if "日期时间分布" in all_data[platform][lang_pair]:
-                dh_counts = all_data[platform][lang_pair]["日期时间分布"]
-                for (date, hour), count in dh_counts.items():
-                    date_hour_counts[(date, hour)] += count
+    # 吞吐量和预计清空天数
+    if throughput_rows:
+        sheets.append(("吞吐量", THROUGHPUT_COLUMNS, [
+            row[:7] + ("是" if row[7] else "",) for row in throughput_rows
+        ]))
     
-    # 按日期和小时排序
-    sorted_date_hours = sorted(date_hour_counts.keys())
-    date_hour_stats = [((date, hour), date_hour_counts[(date, hour)]) for date, hour in sorted_date_hours]
+    # 为每个平台创建详细表格
+    platform_rows = {}
+    for platform, *row in summary_rows:
+        platform_rows.setdefault(platform, []).append(row)
+    for platform, rows in platform_rows.items():
+        sheets.append((platform, PLATFORM_COLUMNS, rows))
     
-    return date_hour_stats
+    return sheets
 
 
-def plot_hourly_trend(hourly_stats, output_file=None):
+def display_width(text):
     """
-    绘制小时发布趋势图
+    计算字符串在终端中的显示宽度，中文等宽字符占两列
     """
-    if not hourly_stats:
-        print("没有足够的数据来绘制小时趋势图")
-        return
-    
-    # 导入字体管理模块
-    import matplotlib.font_manager as fm
-    
-    # 设置支持中文显示的字体
-    try:
-        # 尝试使用系统中可能存在的中文字体
-        chinese_fonts = ['Arial Unicode MS', 'SimHei', 'STHeiti', 'Microsoft YaHei', 'PingFang SC', 'Heiti SC']
-        font_path = None
-        
-        for font in chinese_fonts:
-            try:
-                font_path = fm.findfont(fm.FontProperties(family=font))
-                if font_path and 'ttf' in font_path.lower() and not font_path.endswith('DejaVuSans.ttf'):
-                    break
-            except:
-                continue
-        
-        if font_path and not font_path.endswith('DejaVuSans.ttf'):
-            plt.rcParams['font.family'] = fm.FontProperties(fname=font_path).get_name()
-        else:
-            # 如果找不到中文字体，使用英文标签
-            print("警告: 未找到支持中文的字体，将使用英文标签")
-            plt.rcParams['font.family'] = 'sans-serif'
-    except Exception as e:
-        print(f"设置字体时出错: {e}")
-        plt.rcParams['font.family'] = 'sans-serif'
-    
-    # 将数据转换为小时和计数列表
-    hours = [f"{hour}:00" for hour, _ in hourly_stats]
-    counts = [count for _, count in hourly_stats]
-    
-    # 使用更小的图像尺寸
-    plt.figure(figsize=(10, 6), dpi=100)
-    plt.bar(range(len(hours)), counts, color='lightgreen', width=0.7)
-    
-    # 设置 x 轴刻度为小时文本
-    plt.xticks(range(len(hours)), hours, rotation=45, fontsize=8)
-    
-    # 添加数据标签，但只对较大的值显示数字
-    for i, count in enumerate(counts):
-        if count > 5:  # 只对大于5的值显示标签
-            plt.text(i, count + 1, str(count), ha='center', va='bottom', fontsize=8)
-    
-    # 设置图表样式 - 如果字体问题未解决，使用英文标签
-    if plt.rcParams['font.family'] == 'sans-serif':
-        plt.xlabel('Hour of Day', fontsize=12)
-        plt.ylabel('Number of Videos', fontsize=12)
-        plt.title('Hourly Video Release Distribution', fontsize=16)
-    else:
-        plt.xlabel('小时', fontsize=12)
-        plt.ylabel('发布视频数量', fontsize=12)
-        plt.title('视频发布时间段分布', fontsize=16)
-    
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # 设置边距
-    plt.tight_layout()
-    
-    if output_file:
-        try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_file)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            
-            # 使用更小的DPI和压缩级别保存图片
-            plt.savefig(output_file, format='png', dpi=100, bbox_inches='tight', 
-                       transparent=False, pad_inches=0.1, 
-                       facecolor='white', edgecolor='none')
-            print(f"时间段分布图已保存至: {output_file}")
-            
-            # 关闭图表以释放内存
-            plt.close()
-        except Exception as e:
-            print(f"保存时间段分布图时出错: {e}")
-            # 尝试保存到当前目录且使用不同文件名
-            alt_output = "hourly_chart.png"
-            try:
-                plt.savefig(alt_output, format='png', dpi=72, bbox_inches='tight',
-                          transparent=False, facecolor='white')
-                print(f"时间段分布图已保存至当前目录: {alt_output}")
-            except Exception as e2:
-                print(f"保存图片失败: {e2}")
-            finally:
-                plt.close()
-    else:
-        plt.show()
-        plt.close()
+    return sum(2 if unicodedata.east_asian_width(ch) in 'WFA' else 1 for ch in text)
 
 
-def plot_date_hour_trend(date_hour_stats, output_file=None):
+def format_summary_table(rows):
     """
-    绘制日期+小时发布趋势热力图
+    不依赖 pandas，直接把汇总数据行排版成对齐的文本表格
     """
-    if not date_hour_stats:
-        print("没有足够的数据来绘制日期+小时趋势图")
-        return
-    
-    # 导入字体管理模块
-    import matplotlib.font_manager as fm
-    import numpy as np
-    
-    # 设置支持中文显示的字体
-    try:
-        # 尝试使用系统中可能存在的中文字体
-        chinese_fonts = ['Arial Unicode MS', 'SimHei', 'STHeiti', 'Microsoft YaHei', 'PingFang SC', 'Heiti SC']
-        font_path = None
-        
-        for font in chinese_fonts:
-            try:
-                font_path = fm.findfont(fm.FontProperties(family=font))
-                if font_path and 'ttf' in font_path.lower() and not font_path.endswith('DejaVuSans.ttf'):
-                    break
-            except:
-                continue
-        
-        if font_path and not font_path.endswith('DejaVuSans.ttf'):
-            plt.rcParams['font.family'] = fm.FontProperties(fname=font_path).get_name()
-        else:
-            # 如果找不到中文字体，使用英文标签
-            print("警告: 未找到支持中文的字体，将使用英文标签")
-            plt.rcParams['font.family'] = 'sans-serif'
-    except Exception as e:
-        print(f"设置字体时出错: {e}")
-        plt.rcParams['font.family'] = 'sans-serif'
-    
-    # 提取所有唯一的日期和小时
-    dates = sorted(set(date for (date, _), _ in date_hour_stats))
-    hours = sorted(set(hour for (_, hour), _ in date_hour_stats))
-    
-    # 如果日期太多，只取最近30天
-    if len(dates) > 30:
-        dates = dates[-30:]
-    
-    # 创建热力图数据矩阵
-    data = np.zeros((len(hours), len(dates)))
-    
-    # 填充数据
-    date_to_idx = {date: i for i, date in enumerate(dates)}
-    hour_to_idx = {hour: i for i, hour in enumerate(hours)}
-    
-    for (date, hour), count in date_hour_stats:
-        if date in date_to_idx and hour in hour_to_idx:
-            data[hour_to_idx[hour], date_to_idx[date]] = count
-    
-    # 创建图表
-    plt.figure(figsize=(12, 8), dpi=100)
-    
-    # 绘制热力图
-    im = plt.imshow(data, cmap='YlGnBu')
-    
-    # 添加颜色条
-    cbar = plt.colorbar(im)
-    if plt.rcParams['font.family'] == 'sans-serif':
-        cbar.set_label('Number of Videos', fontsize=10)
-    else:
-        cbar.set_label('视频数量', fontsize=10)
-    
-    # 设置坐标轴
-    plt.yticks(range(len(hours)), [f"{h:02d}:00" for h in hours])
-    
-    # 格式化日期标签
-    date_labels = [date.strftime("%m-%d") for date in dates]
-    plt.xticks(range(len(dates)), date_labels, rotation=45, ha='right')
-    
-    # 设置标题和标签
-    if plt.rcParams['font.family'] == 'sans-serif':
-        plt.title('Video Publication by Date and Hour', fontsize=14)
-        plt.xlabel('Date', fontsize=12)
-        plt.ylabel('Hour', fontsize=12)
-    else:
-        plt.title('按日期和小时统计的视频发布量', fontsize=14)
-        plt.xlabel('日期', fontsize=12)
-        plt.ylabel('小时', fontsize=12)
-    
-    # 添加网格线
-    plt.grid(False)
-    
-    # 为每个单元格添加数值标签
-    for i in range(len(hours)):
-        for j in range(len(dates)):
-            if data[i, j] > 0:
-                plt.text(j, i, int(data[i, j]), ha='center', va='center', 
-                         color='white' if data[i, j] > 3 else 'black', fontsize=8)
-    
-    plt.tight_layout()
-    
-    if output_file:
-        try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_file)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            
-            plt.savefig(output_file, format='png', dpi=100, bbox_inches='tight', 
-                       transparent=False, pad_inches=0.1, 
-                       facecolor='white', edgecolor='none')
-            print(f"日期+小时分布图已保存至: {output_file}")
-            
-            plt.close()
-        except Exception as e:
-            print(f"保存日期+小时分布图时出错: {e}")
-            # 尝试保存到当前目录且使用不同文件名
-            alt_output = "date_hour_chart.png"
-            try:
-                plt.savefig(alt_output, format='png', dpi=72, bbox_inches='tight',
-                          transparent=False, facecolor='white')
-                print(f"日期+小时分布图已保存至当前目录: {alt_output}")
-            except Exception as e2:
-                print(f"保存图片失败: {e2}")
-            finally:
-                plt.close()
-    else:
-        plt.show()
-        plt.close()
+    return format_text_table(SUMMARY_COLUMNS, [
+        [platform, lang_pair, f"{total:,}", f"{released:,}", f"{unreleased:,}", f"{rate:.2f}"]
+        for platform, lang_pair, total, released, unreleased, rate in rows
+    ])
 
 
-def plot_release_trend(daily_stats, output_file=None):
+def format_text_table(columns, rows):
     """
-    绘制发布趋势图
+    把表头和已经格式化为字符串的数据行排版成对齐的文本表格，表头居中，数据右对齐
     """
-    if not daily_stats:
-        print("没有足够的数据来绘制趋势图")
-        return
-    
-    # 导入字体管理模块
-    import matplotlib.font_manager as fm
-    
-    # 设置支持中文显示的字体
-    try:
-        # 尝试使用系统中可能存在的中文字体
-        chinese_fonts = ['Arial Unicode MS', 'SimHei', 'STHeiti', 'Microsoft YaHei', 'PingFang SC', 'Heiti SC']
-        font_path = None
-        
-        for font in chinese_fonts:
-            try:
-                font_path = fm.findfont(fm.FontProperties(family=font))
-                if font_path and 'ttf' in font_path.lower() and not font_path.endswith('DejaVuSans.ttf'):
-                    break
-            except:
-                continue
-        
-        if font_path and not font_path.endswith('DejaVuSans.ttf'):
-            plt.rcParams['font.family'] = fm.FontProperties(fname=font_path).get_name()
-        else:
-            # 如果找不到中文字体，使用英文标签
-            print("警告: 未找到支持中文的字体，将使用英文标签")
-            plt.rcParams['font.family'] = 'sans-serif'
-    except Exception as e:
-        print(f"设置字体时出错: {e}")
-        plt.rcParams['font.family'] = 'sans-serif'
-    
-    # 按日期排序
-    sorted_stats = sorted(daily_stats)
-    
-    # 只取最近30天的数据，减少图片大小
-    if len(sorted_stats) > 30:
-        sorted_stats = sorted_stats[-30:]
-    
-    # 如果数据点太多，可能会导致图片过大
-    # 将数据转换为日期对象和计数列表
-    date_strs = [date for date, _ in sorted_stats]
-    counts = [count for _, count in sorted_stats]
-    
-    # 使用更小的图像尺寸
-    plt.figure(figsize=(10, 6), dpi=100)
-    plt.bar(range(len(date_strs)), counts, color='skyblue', width=0.7)
-    
-    # 设置 x 轴刻度为日期文本
-    plt.xticks(range(len(date_strs)), date_strs, rotation=45, fontsize=8)
-    
-    # 添加数据标签，但只对较大的值显示数字
-    for i, count in enumerate(counts):
-        if count > 5:  # 只对大于5的值显示标签
-            plt.text(i, count + 1, str(count), ha='center', va='bottom', fontsize=8)
-    
-    # 设置图表样式 - 如果字体问题未解决，使用英文标签
-    if plt.rcParams['font.family'] == 'sans-serif':
-        plt.xlabel('Release Date', fontsize=12)
-        plt.ylabel('Number of Videos', fontsize=12)
-        plt.title('Daily Video Release Trend', fontsize=16)
-    else:
-        plt.xlabel('发布日期', fontsize=12)
-        plt.ylabel('发布视频数量', fontsize=12)
-        plt.title('每日视频发布数量趋势', fontsize=16)
-    
-    plt.xticks(rotation=45)
-    plt.grid(axis='y', linestyle='--', alpha=0.7)
-    
-    # 设置边距
-    plt.tight_layout()
-    
-    if output_file:
-        try:
-            # 确保输出目录存在
-            output_dir = os.path.dirname(output_file)
-            if output_dir and not os.path.exists(output_dir):
-                os.makedirs(output_dir)
-            
-            # 使用更小的DPI和压缩级别保存图片
-            plt.savefig(output_file, format='png', dpi=100, bbox_inches='tight', 
-                       transparent=False, pad_inches=0.1, 
-                       facecolor='white', edgecolor='none')
-            print(f"趋势图已保存至: {output_file}")
-            
-            # 关闭图表以释放内存
-            plt.close()
-        except Exception as e:
-            print(f"保存趋势图时出错: {e}")
-            # 尝试保存到当前目录且使用不同文件名
-            alt_output = "trend_chart.png"
-            try:
-                plt.savefig(alt_output, format='png', dpi=72, bbox_inches='tight',
-                          transparent=False, facecolor='white')
-                print(f"趋势图已保存至当前目录: {alt_output}")
-            except Exception as e2:
-                print(f"保存图片失败: {e2}")
-            finally:
-                plt.close()
-    else:
-        plt.show()
-        plt.close()
+    cells = [columns] + rows
+    widths = [max(display_width(row[i]) for row in cells) for i in range(len(columns))]
+    
+    lines = []
+    for row_index, row in enumerate(cells):
+        parts = []
+        for text, width in zip(row, widths):
+            padding = width - display_width(text)
+            if row_index == 0:
+                # 表头居中
+                parts.append(" " * (padding // 2) + text + " " * (padding - padding // 2))
+            else:
+                parts.append(" " * padding + text)
+        lines.append("  ".join(parts))
+    return "\n".join(lines)
+
+
+def generate_daily_stats(table):
+    """
+    生成每日发布统计
+    """
+    return table.daily_stats()
+
+
+def generate_hourly_stats(table):
+    """
+    生成每小时发布统计
+    """
+    return table.hourly_stats()
+
+
+def generate_date_hour_stats(table):
+    """
+    生成按日期+小时的发布统计
+    """
+    return table.date_hour_stats()
+
+
+def format_time_bound(value):
+    """
+    把 YYYYMMDDhhmmss 整数格式化为 YYYY-MM-DD hh:mm:ss，None 表示不限
+    """
+    if value is None:
+        return "不限"
+    text = f"{value:014d}"
+    return f"{text[:4]}-{text[4:6]}-{text[6:8]} {text[8:10]}:{text[10:12]}:{text[12:]}"
+
+
+def report_profile(profiler, args):
+    """
+    开启性能分析时打印结果，并按参数保存 JSON 和 cProfile 数据
+    """
+    if profiler.enabled:
+        profiler.print_report()
+        if args.profile_json:
+            profiler.save_json(args.profile_json)
+        if args.cprofile:
+            profiler.dump_hottest(args.cprofile)
 
 
 def main():
@@ -601,138 +291,250 @@ def main():
     parser = argparse.ArgumentParser(description='统计视频发布数据')
     parser.add_argument('--plot', action='store_true', help='生成发布趋势图')
     parser.add_argument('--output', type=str, help='输出Excel文件路径')
+    parser.add_argument('--excel-details', action='store_true', help='Excel 中附带每条发布记录的明细表')
     parser.add_argument('--plot-output', type=str, help='趋势图输出路径')
     parser.add_argument('--hourly-plot-output', type=str, help='时间段分布图输出路径')
     parser.add_argument('--date-hour-plot-output', type=str, help='日期+小时分布图输出路径')
+    parser.add_argument('--snapshot', type=str,
+                        help='发布事件快照输出路径，.parquet 写 Parquet，.arrow/.feather 写 Arrow IPC（需要 pyarrow）')
+    parser.add_argument('--no-heatmap-labels', action='store_true', help='日期+小时分布图不标注单元格数值')
+    parser.add_argument('--heatmap-label-threshold', type=int, default=1,
+                        help='日期+小时分布图只标注发布数不小于该值的单元格，默认 1')
     parser.add_argument('--platform', type=str, help='只显示指定平台的数据')
+    parser.add_argument('--base-dir', type=str, default=BASE_DIR, help=f'视频基础目录，默认 {BASE_DIR}')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help=f'增量统计缓存目录，默认 {DEFAULT_CACHE_DIR}')
+    parser.add_argument('--no-cache', action='store_true', help='不使用增量统计缓存，全量解析发布记录')
+    parser.add_argument('--jobs', type=int,
+                        help='并发更新索引、常驻统计和渲染图表的线程/进程数，默认 1（串行）；'
+                             '未指定 --io-jobs 时也作为读取目录和记录文件的并发数')
+    parser.add_argument('--io-jobs', type=int,
+                        help='同时进行的目录列表和记录文件读取数，网络盘上可调大，1 为串行，'
+                             f'默认与 --jobs 相同，都未指定时为 {DEFAULT_IO_JOBS}')
+    parser.add_argument('--index', nargs='?', const=DEFAULT_INDEX_PATH,
+                        help=f'增量更新 SQLite 发布索引并用 SQL 聚合统计，默认索引文件 {DEFAULT_INDEX_PATH}')
+    parser.add_argument('--find', type=str,
+                        help='在发布索引中按文件名查询发布记录（可用 * ? 通配符，可配合 --platform），查询后退出')
+    parser.add_argument('--serve', type=int, nargs='?', const=8765, metavar='PORT',
+                        help='常驻运行，监视目录变化并在 127.0.0.1:PORT 提供 JSON 统计接口，默认端口 8765')
+    parser.add_argument('--watch', choices=['auto', 'inotify', 'poll'], default='auto',
+                        help='常驻运行时监视目录变化的方式，默认 auto（优先 inotify，不可用时轮询）')
+    parser.add_argument('--poll-interval', type=int, default=DEFAULT_POLL_INTERVAL,
+                        help=f'常驻运行时的轮询间隔（秒），使用 inotify 时也按此间隔兜底检查，默认 {DEFAULT_POLL_INTERVAL}')
+    parser.add_argument('--profile', action='store_true',
+                        help='统计各阶段和各目录的耗时、CPU 时间、行数和峰值内存，运行结束后打印（会让运行变慢）')
+    parser.add_argument('--profile-json', type=str, help='性能分析结果的 JSON 输出路径（隐含 --profile）')
+    parser.add_argument('--cprofile', type=str, metavar='PATH',
+                        help='为各阶段采集 cProfile，把耗时最长的阶段保存到 PATH（隐含 --profile）')
+    parser.add_argument('--since', type=str,
+                        help='只统计该时间之后的发布记录，如 20250302、2025-03-02 12:00、today、7d（7 天前）')
+    parser.add_argument('--until', type=str, help='只统计该时间之前的发布记录，格式同 --since，只有日期时包含当天')
+    parser.add_argument('--throughput', action='store_true',
+                        help='统计各目录最近 1/7/30 天的发布数、积压预计清空天数，并标记吞吐骤降的目录')
+    parser.add_argument('--as-of', type=str, help='吞吐量统计的截止日期，默认今天，格式同 --since')
+    parser.add_argument('--coverage', action='store_true',
+                        help='统计各平台、语言组合之间的发布覆盖情况和不同视频总数，输出后退出')
+    parser.add_argument('--coverage-gap', nargs=2, metavar=('X', 'Y'),
+                        help='列出在 X 已发布但在 Y 未发布的视频，X、Y 为平台或 平台/语言组合（隐含 --coverage）')
+    parser.add_argument('--coverage-output', type=str,
+                        help='覆盖索引 CSV 输出路径，每个视频一行，每个目录一列（隐含 --coverage）')
+    parser.add_argument('--partial-output', type=str,
+                        help='把本机的统计写成部分统计文件（.gz 结尾时压缩），供 --merge 在其他机器上合并')
+    parser.add_argument('--merge', nargs='+', metavar='PARTIAL',
+                        help='合并多台机器的部分统计文件并照常输出汇总、图表和 Excel，不读取本机目录')
     args = parser.parse_args()
+    # 旧的调用（如 stat.sh 的 --jobs 8）仍按 --jobs 控制分析目录的并发数，--io-jobs 1 或 --jobs 1 为串行
+    if args.io_jobs is None:
+        args.io_jobs = DEFAULT_IO_JOBS if args.jobs is None else args.jobs
+    if args.jobs is None:
+        args.jobs = 1
+    if args.index and (args.merge or args.partial_output):
+        parser.error("--index 不能与 --merge、--partial-output 同时使用")
+    if args.merge and (args.since or args.until):
+        parser.error("--merge 不能与 --since、--until 同时使用，请在生成部分统计时指定时间范围")
+    cache_dir = None if args.no_cache else args.cache_dir
+    window = None
+    if args.since or args.until:
+        try:
+            window = (parse_time_bound(args.since) if args.since else None,
+                      parse_time_bound(args.until, end=True) if args.until else None)
+        except ValueError as e:
+            parser.error(str(e))
+    as_of = date.today()
+    if args.as_of:
+        try:
+            as_of = datetime.strptime(str(parse_time_bound(args.as_of)), "%Y%m%d%H%M%S").date()
+        except ValueError as e:
+            parser.error(str(e))
+    profiler = Profiler(args.profile or bool(args.profile_json) or bool(args.cprofile), bool(args.cprofile))
     
-    # 收集平台数据
-    all_data = {}
-    if args.platform and args.platform in PLATFORMS:
-        # 如果指定了平台，只分析该平台
-        platform_data = analyze_platform(args.platform)
-        if platform_data:
-            all_data[args.platform] = platform_data
+    if args.serve is not None:
+        serve(args.base_dir, args.serve, args.platform, args.jobs, args.watch, args.poll_interval)
+        return
+    if args.find and not args.index:
+        args.index = DEFAULT_INDEX_PATH
+    
+    if args.merge:
+        # 合并部分统计，不读取本机的目录和发布记录
+        with profiler.stage("merge") as stage:
+            all_data, sources = merge_partials(args.merge, args.platform)
+            stage["rows"] = len(sources)
+        for source in sources:
+            print(f"合并: {source['path']} ({source['machine']}，{source['generated_at']})")
+        windows = {tuple(source["window"]) if source["window"] else None for source in sources}
+        if len(windows) > 1:
+            print("注意: 合并的部分统计的时间范围不一致")
+        elif window is None and windows:
+            window = windows.pop()
+        if args.excel_details or args.snapshot or args.coverage or args.coverage_gap or args.coverage_output:
+            print("注意: 合并模式下没有发布记录明细，忽略 --excel-details、--snapshot 和覆盖统计")
+            args.excel_details = args.snapshot = False
+            args.coverage = args.coverage_gap = args.coverage_output = None
+        directories = []
     else:
-        # 否则分析所有平台
-        for platform in PLATFORMS:
-            platform_data = analyze_platform(platform)
-            if platform_data:
-                all_data[platform] = platform_data
-    
-    # 生成汇总表格
-    summary_df = generate_summary_table(all_data)
+        # 收集平台数据
+        with profiler.stage("discover") as stage:
+            directories = discover_directories(args.base_dir, args.io_jobs)
+            if args.platform and any(platform == args.platform for platform, _, _ in directories):
+                # 如果指定了平台，只分析该平台
+                directories = [d for d in directories if d[0] == args.platform]
+            # 否则分析所有平台
+            stage["rows"] = len(directories)
+    
+    if args.coverage or args.coverage_gap or args.coverage_output:
+        # 覆盖统计只需要文件名，一次读取所有发布记录和目录建立索引
+        with profiler.stage("coverage") as stage:
+            coverage = build_coverage(directories, args.io_jobs)
+            stage["rows"] = sum(len(names) for names in (coverage.released, coverage.pending))
+        print_coverage(coverage, args.coverage_gap)
+        if args.coverage_output:
+            coverage.save_csv(args.coverage_output)
+        report_profile(profiler, args)
+        return
     
-    if not summary_df.empty:
-        # 设置显示选项，使表格对齐
-        pd.set_option('display.unicode.ambiguous_as_wide', True)
-        pd.set_option('display.unicode.east_asian_width', True)
-        pd.set_option('display.width', 120)
-        pd.set_option('display.colheader_justify', 'center')
-        pd.set_option('display.precision', 2)
-        
-        # 排序表格，先按平台再按语言
-        summary_df = summary_df.sort_values(by=["平台", "语言"])
-        
-        # 打印汇总表格
-        print("\n" + "="*80)
-        print("发布数据汇总".center(80))
-        print("="*80)
-        print(summary_df.to_string(index=False))
-        print("-"*80)
+    if args.index:
+        # 先增量更新索引，所有统计都由 SQL 聚合得到
+        with profiler.stage("index"):
+            conn = open_index(args.index)
+            ledger_ids = update_index(conn, directories, args.jobs)
+        if args.find:
+            releases = find_releases(conn, args.find, args.platform, ledger_ids)
+            for platform, lang_pair, date_dir, file_name, released_at in releases:
+                print(f"{platform:<10}{lang_pair:<8}{date_dir or '':<10}{file_name}  {released_at or '无时间戳'}")
+            print(f"共找到 {len(releases)} 条发布记录")
+            return
+        table = IndexTable(conn, ledger_ids, window)
+    else:
+        if not args.merge:
+            with profiler.stage("analyze") as stage:
+                all_data = collect_all_data(directories, cache_dir, args.io_jobs, profiler, window)
+                stage["rows"] = sum(stats["已发布数"] for platform_data in all_data.values()
+                                    for stats in platform_data.values())
         
-        # 计算总体统计
-        total_videos = summary_df["总视频数"].sum()
-        total_released = summary_df["已发布数"].sum()
-        total_unreleased = summary_df["未发布数"].sum()
-        overall_rate = round(total_released / total_videos * 100, 2) if total_videos > 0 else 0
+        if args.partial_output:
+            save_partial(args.partial_output, build_partial(all_data, args.base_dir, window))
         
-        print(f"\n总体统计:")
-        print(f"总视频数: {total_videos:,}")
-        print(f"已发布数: {total_released:,}")
-        print(f"未发布数: {total_unreleased:,}")
-        print(f"总体发布率: {overall_rate:.2f}%")
+        # 所有统计都基于同一张列式发布事件表
+        with profiler.stage("table") as stage:
+            table = ReleaseTable.from_all_data(all_data)
+            stage["rows"] = len(table.count)
+        # 列式表建好之后不再需要各目录的发布分布，及早释放
+        del all_data
+    
+    with profiler.stage("aggregate") as stage:
+        # 生成汇总表格
+        summary_rows = generate_summary_rows(table)
         
         # 生成每日统计
-        daily_stats = generate_daily_stats(all_data)
+        daily_stats = generate_daily_stats(table)
         
         # 生成每小时统计
-        hourly_stats = generate_hourly_stats(all_data)
+        hourly_stats = generate_hourly_stats(table)
         
-        # 生成日期+小时统计 - 添加这一行
-        date_hour_stats = generate_date_hour_stats(all_data)
+        # 生成日期+小时统计
+        date_hour_stats = generate_date_hour_stats(table)
         
-        # 显示时间段统计
-        if hourly_stats:
+        # 生成吞吐量和积压清空预测
+        throughput_rows = generate_throughput_rows(table, as_of) if args.throughput else None
+        stage["rows"] = sum(row[3] for row in summary_rows)
+    
+    if summary_rows:
+        with profiler.stage("render") as stage:
+            # 打印汇总表格
             print("\n" + "="*80)
-            print("视频发布时间段统计".center(80))
+            print("发布数据汇总".center(80))
             print("="*80)
-            for hour, count in sorted(hourly_stats):
-                print(f"{hour:02d}:00 - {hour:02d}:59: {count:,} 个视频")
+            if window:
+                print(f"统计时间范围: {format_time_bound(window[0])} ~ {format_time_bound(window[1])}，"
+                      "已发布数只包含该范围内有发布时间戳的记录")
+            print(format_summary_table(summary_rows))
             print("-"*80)
+            
+            # 计算总体统计
+            total_videos = sum(row[2] for row in summary_rows)
+            total_released = sum(row[3] for row in summary_rows)
+            total_unreleased = sum(row[4] for row in summary_rows)
+            overall_rate = round(total_released / total_videos * 100, 2) if total_videos > 0 else 0
+            
+            print("\n总体统计:")
+            print(f"总视频数: {total_videos:,}")
+            print(f"已发布数: {total_released:,}")
+            print(f"未发布数: {total_unreleased:,}")
+            print(f"总体发布率: {overall_rate:.2f}%")
+            
+            # 显示时间段统计
+            if hourly_stats:
+                print("\n" + "="*80)
+                print("视频发布时间段统计".center(80))
+                print("="*80)
+                for hour, count in sorted(hourly_stats):
+                    print(f"{hour:02d}:00 - {hour:02d}:59: {count:,} 个视频")
+                print("-"*80)
+            
+            # 显示吞吐量和积压清空预测
+            if throughput_rows:
+                print("\n" + "="*80)
+                print(f"发布吞吐量（截至 {as_of.isoformat()}）".center(80))
+                print("="*80)
+                print(format_text_table(THROUGHPUT_COLUMNS, throughput_cells(throughput_rows)))
+                dropped = [f"{row[0]}/{row[1]}" for row in throughput_rows if row[7]]
+                if dropped:
+                    print(f"\n吞吐骤降（最近 {RECENT_DAYS} 天日均不到之前 {BASELINE_DAYS} 天的 "
+                          f"{DROP_RATIO:.0%}）: {', '.join(dropped)}")
+                print("-"*80)
+            stage["rows"] = len(summary_rows) + len(hourly_stats)
         
         # 保存到Excel
         if args.output:
-            try:
-                # 确保输出目录存在
-                output_dir = os.path.dirname(args.output)
-                if output_dir and not os.path.exists(output_dir):
-                    os.makedirs(output_dir)
-                
-                with pd.ExcelWriter(args.output, engine='openpyxl') as writer:
-                    summary_df.to_excel(writer, sheet_name='汇总', index=False)
-                    
-                    # 创建每日发布统计表
-                    if daily_stats:
-                        daily_df = pd.DataFrame(daily_stats, columns=['日期', '发布数量'])
-                        daily_df.to_excel(writer, sheet_name='每日统计', index=False)
-                    
-                    # 为每个平台创建详细表格
-                    for platform in all_data:
-                        platform_details = []
-                        for lang_pair in all_data[platform]:
-                            stats = all_data[platform][lang_pair]
-                            platform_details.append({
-                                "语言": lang_pair,
-                                "总视频数": stats["总视频数"],
-                                "已发布数": stats["已发布数"],
-                                "未发布数": stats["未发布数"],
-                                "发布率(%)": stats["发布率"]
-                            })
-                        
-                        if platform_details:
-                            platform_df = pd.DataFrame(platform_details)
-                            # 确保工作表名称不超过31个字符(Excel限制)
-                            sheet_name = platform[:31] if len(platform) > 31 else platform
-                            platform_df.to_excel(writer, sheet_name=sheet_name, index=False)
-                
-                print(f"\n数据已保存至: {args.output}")
-            except Exception as e:
-                print(f"保存Excel文件时出错: {e}")
-                # 尝试保存到当前目录
-                alt_output = os.path.basename(args.output) if args.output else "video_stats.xlsx"
-                try:
-                    with pd.ExcelWriter(alt_output, engine='openpyxl') as writer:
-                        summary_df.to_excel(writer, sheet_name='汇总', index=False)
-                        if daily_stats:
-                            daily_df = pd.DataFrame(daily_stats, columns=['日期', '发布数量'])
-                            daily_df.to_excel(writer, sheet_name='每日统计', index=False)
-                    print(f"数据已保存至当前目录: {alt_output}")
-                except Exception as e2:
-                    print(f"保存到当前目录也失败: {e2}")
+            with profiler.stage("excel") as stage:
+                detail_rows = iter_detail_rows(directories, window) if args.excel_details else None
+                sheets = build_excel_sheets(summary_rows, daily_stats, throughput_rows)
+                export_workbook(args.output, sheets, detail_rows)
+                stage["rows"] = sum(len(rows) for _, _, rows in sheets)
         
-        # 绘制趋势图
+        # 导出发布事件快照
+        if args.snapshot:
+            with profiler.stage("snapshot"):
+                export_release_snapshot(directories, args.snapshot, window)
+        
+        # 绘制趋势图、时间段分布图和日期+小时分布图
         if args.plot:
-            plot_release_trend(daily_stats, args.plot_output)
-            # 绘制时间段分布图
-            hourly_plot_output = args.hourly_plot_output or (args.plot_output and args.plot_output.replace('.png', '_hourly.png'))
-            plot_hourly_trend(hourly_stats, hourly_plot_output)
-            # 绘制日期+小时分布图
-            date_hour_plot_output = args.date_hour_plot_output or (args.plot_output and args.plot_output.replace('.png', '_date_hour.png'))
-            plot_date_hour_trend(date_hour_stats, date_hour_plot_output)
+            with profiler.stage("plot") as stage:
+                hourly_plot_output = args.hourly_plot_output or (args.plot_output and args.plot_output.replace('.png', '_hourly.png'))
+                date_hour_plot_output = args.date_hour_plot_output or (args.plot_output and args.plot_output.replace('.png', '_date_hour.png'))
+                render_charts([
+                    ("trend", daily_stats, args.plot_output),
+                    ("hourly", hourly_stats, hourly_plot_output),
+                    ("date_hour", date_hour_stats, date_hour_plot_output),
+                ], args.jobs, {
+                    "heatmap_labels": not args.no_heatmap_labels,
+                    "heatmap_label_threshold": args.heatmap_label_threshold,
+                })
+                stage["rows"] = len(daily_stats) + len(hourly_stats) + len(date_hour_stats)
     else:
         print("未找到任何发布数据")
+    
+    report_profile(profiler, args)
 
 
 if __name__ == "__main__":
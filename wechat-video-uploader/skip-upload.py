@@ -3,106 +3,350 @@
 # python skip-upload.py --d /path/to/videos
 # 内容为视频文件名加上固定的前缀 30000000/ ，格式如下：30000000/xxx.mp4
 # 如果文件中已经有这个文件名，则跳过，不重复写入。
+# 批量模式: 处理基础目录下所有 <平台>/fixed-<语言组合> 目录，如：
+# python skip-upload.py --root /path/to/videos --dry-run
+# 内容去重模式: 只为与已发布视频内容相同（重新渲染或改名的副本）的待发布视频写入跳过记录，如：
+# python skip-upload.py --root /path/to/videos --content-hash --dry-run
 
 import os
 import sys
 import argparse
-import glob
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from ledger_common import RELEASED_CSV, ledger_segments
+from ledger_io import locked_ledger, read_locked_lines, append_locked
+from video_tree import discover_directories, list_pending_videos
+from tree_io import DEFAULT_IO_JOBS, read_directories, list_directories
+from video_hash import DEFAULT_HASH_CACHE, HashCache, file_hashes
+
+# 跳过上传的视频记录使用的日期目录前缀
+SKIP_PREFIX = "30000000/"
 
 
 def parse_args():
     """解析命令行参数"""
     parser = argparse.ArgumentParser(description='将MP4文件写入CSV记录')
-    parser.add_argument('--d', '--dir', required=True, help='指定视频文件目录')
-    
-    return parser.parse_args()
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--d', '--dir', help='指定视频文件目录')
+    target.add_argument('--root', help='批量模式: 处理该目录下所有 <平台>/fixed-<语言组合> 目录')
+    parser.add_argument('--jobs', type=int, default=4, help='批量模式下并发处理目录的线程数，默认 4')
+    parser.add_argument('--io-jobs', type=int, default=DEFAULT_IO_JOBS,
+                        help=f'批量模式下同时进行的目录列表和记录文件读取数，网络盘上可调大，默认 {DEFAULT_IO_JOBS}')
+    parser.add_argument('--dry-run', action='store_true', help='只以 diff 形式显示将要新增的记录，不写入文件')
+    parser.add_argument('--content-hash', action='store_true',
+                        help='按文件内容去重: 只为与已发布视频内容相同的待发布视频写入跳过记录')
+    parser.add_argument('--hash-scope', choices=['dir', 'all'], default='dir',
+                        help='内容去重时比对的已发布视频: dir 只比对同一目录的发布记录（默认），'
+                             'all 比对批量模式下所有目录的发布记录（同一视频在其他平台发布过也会跳过，只能配合 --root）')
+    parser.add_argument('--hash-cache', default=DEFAULT_HASH_CACHE,
+                        help=f'视频内容摘要缓存文件，默认 {DEFAULT_HASH_CACHE}')
 
+    args = parser.parse_args()
+    if args.d and args.hash_scope == 'all':
+        parser.error("--hash-scope all 只用于批量模式（--root），单目录模式只比对本目录的发布记录")
+    return args
 
-def read_existing_records(csv_file):
-    """读取已存在的CSV记录"""
+
+def record_names(lines):
+    """从记录行中提取文件名集合"""
     existing_records = set()
-    
+    for line in lines:
+        line = line.strip()
+        if line:
+            # 提取文件名部分（如果有路径分隔符）
+            if '/' in line:
+                filename = line.split('/')[-1]
+                existing_records.add(filename)
+            else:
+                existing_records.add(line)
+    return existing_records
+
+
+def read_existing_lines(csv_file):
+    """不加锁读取已存在的CSV记录行，文件不存在时返回空列表（直接打开，不另外检查是否存在）"""
+    try:
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            return [line.strip() for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+    except Exception as e:
+        print(f"读取CSV文件时出错: {e}")
+        return []
+
+
+def read_segment_lines(video_dir):
+    """
+    读取 compact-ledger.py 移入分段文件的较早记录，没有分段时返回空列表
+    分段文件只在压缩时重写，压缩期间持有 0-released.csv 的锁
+    """
+    lines = []
+    for segment_file in ledger_segments(video_dir):
+        lines.extend(read_existing_lines(segment_file))
+    return lines
+
+
+def read_existing_records(csv_file):
+    """不加锁读取已存在的CSV记录（含分段文件），只用于预览"""
+    return record_names(read_segment_lines(os.path.dirname(csv_file)) + read_existing_lines(csv_file))
+
+
+def released_video_path(video_dir, record):
+    """
+    记录对应的视频文件路径
+    已发布的视频由 archiveVideo 移动到 日期目录/ 下，跳过上传的视频（30000000/ 前缀）和没有目录的记录还在原目录中
+    """
+    path = record.split(',')[0].strip()
+    date_dir, _, filename = path.rpartition('/')
+    if date_dir and f"{date_dir}/" != SKIP_PREFIX:
+        return os.path.join(video_dir, date_dir, filename)
+    return os.path.join(video_dir, filename)
+
+
+def released_digests(paths, hashes):
+    """
+    已发布视频的 {摘要: 路径}，同一内容有多个已发布文件时取最早的记录
+    """
+    return {hashes[path]: path for path in reversed(paths) if path in hashes}
+
+
+def find_duplicate_videos(video_dirs, cache_file, jobs=4, scope='dir', io_jobs=DEFAULT_IO_JOBS):
+    """
+    按内容查找与已发布视频相同的待发布视频（不含已经有记录的文件名）
+    各目录的列表和记录文件由 tree_io 用 io_jobs 个线程并发读取，
+    所有目录的已发布视频和待发布视频一起用 jobs 个线程计算摘要，摘要缓存在 cache_file 中
+    scope 为 dir 时只与同一目录的已发布视频比对，为 all 时与所有目录的已发布视频比对
+    返回 {目录: [(待发布文件名, 内容相同的已发布视频路径)]}
+    """
+    plans = []
+    for video_dir, (listing, ledger_lines, _) in zip(video_dirs,
+                                                     read_directories(video_dirs, read_existing_lines, io_jobs)):
+        lines = [line for file_lines in ledger_lines for line in file_lines]
+        existing_records = record_names(lines)
+        pending = [filename for filename in listing.pending if filename not in existing_records]
+        plans.append((video_dir, [released_video_path(video_dir, line) for line in lines], pending))
+
+    paths = []
+    for video_dir, released, pending in plans:
+        paths.extend(released)
+        paths.extend(os.path.join(video_dir, filename) for filename in pending)
+
+    cache = HashCache(cache_file)
+    try:
+        hashes = file_hashes(paths, cache, jobs)
+    finally:
+        cache.close()
+
+    if scope == 'all':
+        shared_digests = released_digests([path for _, released, _ in plans for path in released], hashes)
+
+    duplicates = {}
+    for video_dir, released, pending in plans:
+        digests = shared_digests if scope == 'all' else released_digests(released, hashes)
+        duplicates[video_dir] = []
+        for filename in pending:
+            digest = hashes.get(os.path.join(video_dir, filename))
+            if digest in digests:
+                duplicates[video_dir].append((filename, digests[digest]))
+    return duplicates
+
+
+def collect_new_records(videos, existing_records):
+    """
+    找出还没有记录的MP4文件
+    返回 (需要新增的记录列表, 已存在而跳过的文件名列表)
+    """
+    new_records = []
+    skipped = []
+    for filename in videos:
+        # 检查是否已存在
+        if filename in existing_records:
+            skipped.append(filename)
+            continue
+        new_records.append(f"{SKIP_PREFIX}{filename}")
+        # 将新添加的记录加入已存在集合，避免重复
+        existing_records.add(filename)
+    return new_records, skipped
+
+
+def record_videos(csv_file, videos):
+    """
+    持有记录文件的排他锁，在同一个临界区内重新读取已有记录并追加新记录，
+    其他进程在读取和写入之间追加的记录不会被重复写入
+    返回 (新增的记录列表, 跳过的文件名列表)
+    """
+    with locked_ledger(csv_file) as f:
+        existing_records = record_names(read_segment_lines(os.path.dirname(csv_file)) + read_locked_lines(f))
+        new_records, skipped = collect_new_records(videos, existing_records)
+        append_locked(f, new_records)
+    return new_records, skipped
+
+
+def write_videos_to_csv(video_dir, csv_file, videos=None):
+    """
+    将视频文件写入CSV
+    videos 为空时写入目录中所有的MP4文件，内容去重模式下只写入传入的重复视频
+    """
+    if videos is None:
+        videos = list_pending_videos(video_dir)
+        if not videos:
+            print(f"目录 {video_dir} 中没有找到MP4文件")
+            return
+    elif not videos:
+        print(f"目录 {video_dir} 中没有与已发布视频内容相同的MP4文件")
+        return
+
     if os.path.exists(csv_file):
         print(f"读取已有记录文件: {csv_file}")
-        try:
-            with open(csv_file, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        # 提取文件名部分（如果有路径分隔符）
-                        if '/' in line:
-                            filename = line.split('/')[-1]
-                            existing_records.add(filename)
-                        else:
-                            existing_records.add(line)
-            print(f"已读取 {len(existing_records)} 条记录")
-        except Exception as e:
-            print(f"读取CSV文件时出错: {e}")
     else:
         print(f"CSV文件不存在，将创建新文件: {csv_file}")
-    
-    return existing_records
 
+    # 加锁后按最新的记录文件内容判断，所有新记录一次写入
+    new_records, skipped = record_videos(csv_file, videos)
 
-def write_videos_to_csv(video_dir, csv_file, existing_records):
-    """将视频文件写入CSV"""
-    # 获取目录下所有MP4文件
-    mp4_files = glob.glob(os.path.join(video_dir, "*.mp4"))
-    
-    if not mp4_files:
-        print(f"目录 {video_dir} 中没有找到MP4文件")
-        return
-    
-    # 记录新增和跳过的文件数
-    added_count = 0
-    skipped_count = 0
-    
-    # 打开CSV文件进行追加
-    with open(csv_file, 'a', encoding='utf-8') as f:
-        for video_path in mp4_files:
-            # 获取文件名
-            filename = os.path.basename(video_path)
-            
-            # 检查是否已存在
-            if filename in existing_records:
-                print(f"跳过: {filename} (已存在)")
-                skipped_count += 1
-                continue
-            
-            # 写入新记录
-            record = f"30000000/{filename}"
-            f.write(record + '\n')
-            print(f"添加: {record}")
-            added_count += 1
-            
-            # 将新添加的记录加入已存在集合，避免重复
-            existing_records.add(filename)
-    
-    print(f"\n处理完成: 添加了 {added_count} 个新记录，跳过了 {skipped_count} 个已存在的记录")
+    for filename in skipped:
+        print(f"跳过: {filename} (已存在)")
+    for record in new_records:
+        print(f"添加: {record}")
+
+    print(f"\n处理完成: 添加了 {len(new_records)} 个新记录，跳过了 {len(skipped)} 个已存在的记录")
+
+
+def process_directory(video_dir, dry_run=False, videos=None):
+    """
+    批量模式下处理单个目录，不逐个文件输出
+    videos 为空时处理目录中所有的MP4文件，内容去重模式下只处理传入的重复视频
+    返回 {"新增": 新增记录列表, "跳过": 跳过数量, "错误": 错误信息或 None}
+    """
+    csv_file = os.path.join(video_dir, RELEASED_CSV)
+    try:
+        if videos is None:
+            videos = list_pending_videos(video_dir)
+        if dry_run:
+            existing_records = read_existing_records(csv_file)
+            new_records, skipped = collect_new_records(videos, existing_records)
+        elif videos:
+            new_records, skipped = record_videos(csv_file, videos)
+        else:
+            new_records, skipped = [], []
+        return {"新增": new_records, "跳过": len(skipped), "错误": None}
+    except OSError as e:
+        return {"新增": [], "跳过": 0, "错误": str(e)}
+
+
+def dry_run_diff(fixed_dir, new_records, sources=None):
+    """
+    以 diff 形式列出记录文件将要新增的行，sources 为 {文件名: 内容相同的已发布视频路径}
+    """
+    if not new_records:
+        return []
+    csv_file = os.path.join(fixed_dir, RELEASED_CSV)
+    lines = [f"--- {csv_file}", f"+++ {csv_file}"]
+    sources = sources or {}
+    for record in new_records:
+        lines.append(f"+{record}")
+        source = sources.get(record[len(SKIP_PREFIX):])
+        if source:
+            lines.append(f"#  与 {source} 内容相同")
+    return lines
+
+
+def run_batch(root, jobs=4, dry_run=False, hash_cache=None, hash_scope='dir', io_jobs=DEFAULT_IO_JOBS):
+    """
+    批量模式: 遍历一次 root 找出所有目标目录，多线程并发处理，最后输出汇总
+    目录发现和各目录的待发布视频列表由 io_jobs 个线程并发读取，加锁读写记录文件用 jobs 个线程
+    dry_run 时以 diff 形式列出每个记录文件将要新增的行，不写入文件
+    指定 hash_cache 时为内容去重模式，只为与已发布视频内容相同的待发布视频写入记录
+    """
+    directories = discover_directories(root, io_jobs)
+    if not directories:
+        print(f"错误: 目录 '{root}' 下没有找到 <平台>/fixed-<语言组合> 目录")
+        sys.exit(1)
+
+    fixed_dirs = [fixed_dir for _, _, fixed_dir in directories]
+    duplicates = {}
+    if hash_cache:
+        duplicates = find_duplicate_videos(fixed_dirs, hash_cache, jobs, hash_scope, io_jobs)
+        videos = {fixed_dir: [filename for filename, _ in duplicates[fixed_dir]] for fixed_dir in fixed_dirs}
+    else:
+        listings = list_directories(fixed_dirs, io_jobs)
+        videos = {fixed_dir: listing.pending for fixed_dir, listing in zip(fixed_dirs, listings)}
+
+    def process(directory):
+        return process_directory(directory[2], dry_run, videos[directory[2]])
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        results = list(executor.map(process, directories))
+
+    lines = []
+    if dry_run:
+        for (_, _, fixed_dir), result in zip(directories, results):
+            lines.extend(dry_run_diff(fixed_dir, result["新增"], dict(duplicates.get(fixed_dir, []))))
+        lines.append("")
+
+    lines.append(f"{'平台':<12}{'语言':<10}{'新增':>8}{'跳过':>8}")
+    total_added = total_skipped = errors = 0
+    for (platform, lang_pair, fixed_dir), result in zip(directories, results):
+        added = len(result["新增"])
+        total_added += added
+        total_skipped += result["跳过"]
+        line = f"{platform:<12}{lang_pair:<10}{added:>8}{result['跳过']:>8}"
+        if result["错误"]:
+            errors += 1
+            line += f"  错误: {result['错误']}"
+        lines.append(line)
+
+    action = "将添加" if dry_run else "添加了"
+    if hash_cache:
+        action += "内容重复的"
+    lines.append(f"\n处理完成: {len(directories)} 个目录，{action} {total_added} 个新记录，"
+                 f"跳过了 {total_skipped} 个已存在的记录，{errors} 个目录出错")
+    print('\n'.join(lines))
 
 
 def main():
     """主函数"""
     # 解析命令行参数
     args = parse_args()
+
+    hash_cache = args.hash_cache if args.content_hash else None
+    if args.root:
+        run_batch(args.root, args.jobs, args.dry_run, hash_cache, args.hash_scope, args.io_jobs)
+        return
+
     video_dir = args.d
-    
+
     # 检查目录是否存在
     if not os.path.isdir(video_dir):
         print(f"错误: 目录 '{video_dir}' 不存在")
         sys.exit(1)
-    
+
     print(f"处理目录: {video_dir}")
-    
+
     # CSV文件路径
-    csv_file = os.path.join(video_dir, "0-released.csv")
-    
-    # 读取已存在的记录
-    existing_records = read_existing_records(csv_file)
-    
+    csv_file = os.path.join(video_dir, RELEASED_CSV)
+
+    # 内容去重模式下只写入与本目录已发布视频内容相同的视频
+    videos = None
+    duplicates = []
+    if hash_cache:
+        duplicates = find_duplicate_videos([video_dir], hash_cache, args.jobs)[video_dir]
+        for filename, source in duplicates:
+            print(f"重复: {filename} (与 {source} 内容相同)")
+        videos = [filename for filename, _ in duplicates]
+
+    if args.dry_run:
+        # 与批量模式相同，只显示将要新增的记录
+        result = process_directory(video_dir, True, videos)
+        if result["错误"]:
+            print(f"读取记录文件时出错: {result['错误']}")
+            sys.exit(1)
+        lines = dry_run_diff(video_dir, result["新增"], dict(duplicates))
+        lines.append(f"\n处理完成: 将添加 {len(result['新增'])} 个新记录，跳过了 {result['跳过']} 个已存在的记录")
+        print('\n'.join(lines))
+        return
+
     # 写入视频记录
-    write_videos_to_csv(video_dir, csv_file, existing_records)
+    write_videos_to_csv(video_dir, csv_file, videos)
 
 
 if __name__ == "__main__":
@@ -8,12 +8,12 @@
 platform=${1:-"weixin"}
 mode=${2:-"all"}
 # 统计单词数量
-# python3 publish-stat.py --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
+# python3 publish-stat.py --jobs 8 --io-jobs 8 --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
 
 if [ "$mode" = "all" ]; then
     echo "统计所有平台数据..."
-    python3 publish-stat.py --platform all --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
+    python3 publish-stat.py --platform all --jobs 8 --io-jobs 8 --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
 else
     echo "统计 $platform 平台数据..."
-    python3 publish-stat.py --platform $platform --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
+    python3 publish-stat.py --platform $platform --jobs 8 --io-jobs 8 --plot --output ./video_stats.xlsx --plot-output ./video_trend.png
 fi
\ No newline at end of file
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# stat_cache.py
+# publish-stat.py 的增量统计缓存
+# 0-released.csv 只会被追加写入（upload_common.js 的 archiveVideo 使用 appendFileSync），
+# 缓存记录文件标识、上次解析到的字节偏移和累计的发布分布，之后每次只解析新追加的部分。
+# 文件被整体重写时（如 archiveVideo 给旧记录补时间戳列）自动全量重建。
+# 末尾还没写完换行的记录不计入统计，下次从该行开头重新解析。
+
+import os
+import json
+import hashlib
+import tempfile
+
+from ledger_common import new_summary
+from ledger_fast import scan_ledger_fast
+
+# 缓存格式版本，格式变化时递增，旧缓存自动失效
+CACHE_VERSION = 3
+
+# 默认缓存目录
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "publish-stat")
+
+# 校验文件是否被重写时读取的首尾字节数
+FINGERPRINT_BYTES = 4096
+
+
+def cache_file_for(csv_path, cache_dir):
+    """
+    每个发布记录文件对应一个缓存文件，文件名取绝对路径的哈希
+    """
+    key = hashlib.sha1(os.path.abspath(csv_path).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def fingerprint(f, offset):
+    """
+    计算文件在 offset 之前的首尾各 FINGERPRINT_BYTES 字节的摘要
+    文件被重写时开头或结尾内容会变化，据此判断缓存是否还能继续使用
+    """
+    head_size = min(offset, FINGERPRINT_BYTES)
+    f.seek(0)
+    head = hashlib.sha1(f.read(head_size)).hexdigest()
+
+    tail_start = max(0, offset - FINGERPRINT_BYTES)
+    f.seek(tail_start)
+    tail = hashlib.sha1(f.read(offset - tail_start)).hexdigest()
+    return head, tail
+
+
+def summary_to_state(summary):
+    """
+    把统计结果转换为可以写入 JSON 的形式，发布分布的键本身就是整数，直接展开
+    """
+    return {
+        "released": summary["已发布数"],
+        "records": [[date_dir, release_date, hour, count]
+                    for (date_dir, release_date, hour), count in summary["发布分布"].items()],
+    }
+
+
+def state_to_summary(state):
+    """
+    从缓存内容恢复统计结果
+    """
+    summary = new_summary()
+    summary["已发布数"] = state["released"]
+    summary["发布分布"].update({(date_dir, release_date, hour): count
+                               for date_dir, release_date, hour, count in state["records"]})
+    return summary
+
+
+def load_cache(cache_file):
+    """
+    读取缓存文件，不存在、损坏或版本不符时返回 None
+    """
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return None
+    return cache
+
+
+def save_cache(cache_file, cache):
+    """
+    先写临时文件再重命名，避免并发运行时读到写了一半的缓存
+    """
+    try:
+        cache_dir = os.path.dirname(cache_file)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_file)
+    except OSError as e:
+        print(f"写入统计缓存时出错: {e}")
+
+
+def load_ledger_summary(csv_path, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    增量统计发布记录文件
+    文件未变化时直接使用缓存；文件只是追加了新记录时只解析新增部分；
+    文件被替换或重写时全量重建缓存
+    """
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return new_summary()
+
+    cache_file = cache_file_for(csv_path, cache_dir)
+    cache = load_cache(cache_file)
+
+    with open(csv_path, 'rb') as f:
+        summary = None
+        offset = 0
+        if (cache and cache["inode"] == st.st_ino and cache["offset"] <= st.st_size):
+            if (cache["size"] == st.st_size and cache["mtime_ns"] == st.st_mtime_ns
+                    and cache["offset"] == st.st_size):
+                # 文件没有任何变化
+                return state_to_summary(cache["stats"])
+
+            if fingerprint(f, cache["offset"]) == (cache["head"], cache["tail"]):
+                summary = state_to_summary(cache["stats"])
+                offset = cache["offset"]
+
+        if summary is None:
+            # 没有可用的缓存，全量解析
+            summary = new_summary()
+
+        offset = scan_ledger_fast(f, summary, offset)
+        head, tail = fingerprint(f, offset)
+
+    save_cache(cache_file, {
+        "version": CACHE_VERSION,
+        "path": os.path.abspath(csv_path),
+        "inode": st.st_ino,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "offset": offset,
+        "head": head,
+        "tail": tail,
+        "stats": summary_to_state(summary),
+    })
+    return summary
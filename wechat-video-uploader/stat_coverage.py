@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+# stat_coverage.py
+# 跨平台发布覆盖索引
+# 一次遍历所有 0-released.csv 和 fixed-* 目录中的待发布 mp4，建立 文件名 -> 位掩码 的哈希索引，
+# 每个 (平台, 语言组合) 目录占一位。覆盖矩阵、"在 X 已发布但 Y 未发布" 的清单和去重后的视频总数
+# 都是对这一个索引的位运算，不需要为每一对目录重新读取发布记录。
+
+import csv
+from collections import Counter
+
+from tree_io import read_directories
+
+
+def read_released_names(csv_path):
+    """
+    读取发布记录中的文件名（去掉日期目录），不解析时间戳
+    与 parse_release_line 的取法一致: 第一个逗号之前的部分去掉首尾空白，取最后一个 / 之后的部分；
+    末尾没有换行结束的行同 scan_ledger 留到下次读取
+    """
+    names = []
+    try:
+        with open(csv_path, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    break
+                path = raw.strip().split(b',', 1)[0].strip()
+                if path:
+                    names.append(path.rpartition(b'/')[2].decode('utf-8', errors='replace'))
+    except FileNotFoundError:
+        pass
+    return names
+
+
+class CoverageIndex:
+    """
+    文件名 -> 位掩码 的覆盖索引，第 i 位对应 columns[i] 的 (平台, 语言组合)
+    released 记录已发布的目录，pending 记录目录中还有待发布 mp4 的目录
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.released = {}
+        self.pending = {}
+
+    def add(self, bit, released_names, pending_names):
+        """
+        把一个目录的文件名并入索引
+        """
+        flag = 1 << bit
+        released = self.released
+        for name in released_names:
+            released[name] = released.get(name, 0) | flag
+        pending = self.pending
+        for name in pending_names:
+            pending[name] = pending.get(name, 0) | flag
+
+    def platforms(self):
+        """
+        按目录顺序列出平台（去重）
+        """
+        return list(dict.fromkeys(platform for platform, _ in self.columns))
+
+    def mask(self, target):
+        """
+        把 "平台" 或 "平台/语言组合" 转换为位掩码，没有匹配的目录时返回 0
+        """
+        platform, _, lang_pair = target.partition('/')
+        mask = 0
+        for bit, (column_platform, column_lang) in enumerate(self.columns):
+            if column_platform == platform and (not lang_pair or column_lang == lang_pair):
+                mask |= 1 << bit
+        return mask
+
+    def distinct_count(self):
+        """
+        所有目录中已发布或待发布的不同视频数
+        """
+        return len(self.released.keys() | self.pending.keys())
+
+    def column_rows(self):
+        """
+        每个目录一行: (平台, 语言组合, 已发布数, 待发布数, 仅在该目录发布数)
+        同一个掩码的视频只统计一次，按掩码分组后计数
+        """
+        released_masks = Counter(self.released.values())
+        pending_masks = Counter(self.pending.values())
+        rows = []
+        for bit, (platform, lang_pair) in enumerate(self.columns):
+            flag = 1 << bit
+            rows.append((
+                platform, lang_pair,
+                sum(count for mask, count in released_masks.items() if mask & flag),
+                sum(count for mask, count in pending_masks.items() if mask & flag),
+                released_masks.get(flag, 0),
+            ))
+        return rows
+
+    def gap_matrix(self, targets):
+        """
+        覆盖矩阵: matrix[x][y] 为在 targets[x] 已发布但在 targets[y] 未发布的视频数，
+        对角线为在 targets[x] 已发布的视频数
+        不同的掩码取值远少于视频数，按掩码分组后只需对每种掩码做一次位运算
+        """
+        masks = [self.mask(target) for target in targets]
+        released_masks = Counter(self.released.values())
+        matrix = []
+        for x_mask in masks:
+            row = []
+            for y_mask in masks:
+                if x_mask == y_mask:
+                    row.append(sum(count for mask, count in released_masks.items() if mask & x_mask))
+                else:
+                    row.append(sum(count for mask, count in released_masks.items()
+                                   if mask & x_mask and not mask & y_mask))
+            matrix.append(row)
+        return matrix
+
+    def gaps(self, source, target):
+        """
+        在 source 已发布但在 target 未发布的视频，按文件名排序
+        返回 [(文件名, target 中是否还有待发布的 mp4)]
+        """
+        source_mask = self.mask(source)
+        target_mask = self.mask(target)
+        pending = self.pending
+        return sorted(
+            (name, bool(pending.get(name, 0) & target_mask))
+            for name, mask in self.released.items()
+            if mask & source_mask and not mask & target_mask
+        )
+
+    def iter_rows(self):
+        """
+        逐个视频产出 [文件名, 各目录的状态...]，状态为 已发布/待发布/空
+        """
+        flags = [1 << bit for bit in range(len(self.columns))]
+        for name in sorted(self.released.keys() | self.pending.keys()):
+            released = self.released.get(name, 0)
+            pending = self.pending.get(name, 0)
+            yield [name] + ["已发布" if released & flag else "待发布" if pending & flag else ""
+                            for flag in flags]
+
+    def save_csv(self, output_file):
+        """
+        把完整的覆盖索引写入 CSV，每个视频一行，每个目录一列
+        """
+        try:
+            with open(output_file, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["文件名"] + [f"{platform}/{lang_pair}" for platform, lang_pair in self.columns])
+                writer.writerows(self.iter_rows())
+            print(f"覆盖索引已保存至: {output_file}")
+        except OSError as e:
+            print(f"保存覆盖索引时出错: {e}")
+
+
+def build_coverage(directories, jobs=1):
+    """
+    读取 discover_directories 找到的各个目录，建立覆盖索引
+    已发布文件名包括分段文件中的记录；jobs 大于 1 时由 tree_io 并发读取各目录，按目录的发现顺序合并
+    """
+    index = CoverageIndex((platform, lang_pair) for platform, lang_pair, _ in directories)
+    batches = read_directories([fixed_dir for _, _, fixed_dir in directories], read_released_names, jobs)
+    for bit, (listing, released_names, _) in enumerate(batches):
+        index.add(bit, (name for names in released_names for name in names), listing.pending)
+    return index
+
+
+def print_coverage(index, gap=None):
+    """
+    打印各目录的覆盖情况、平台之间的覆盖矩阵和去重后的视频总数
+    gap 为 (X, Y) 时再列出在 X 已发布但在 Y 未发布的视频，X 和 Y 可以是平台或 平台/语言组合
+    """
+    print("\n" + "="*80)
+    print("跨平台发布覆盖".center(80))
+    print("="*80)
+    print(f"{'平台':<10}{'语言':<8}{'已发布数':>10}{'待发布数':>10}{'仅此处发布':>10}")
+    for platform, lang_pair, released, pending, only_here in index.column_rows():
+        print(f"{platform:<12}{lang_pair:<10}{released:>14,}{pending:>14,}{only_here:>15,}")
+    print("-"*80)
+    print(f"不同视频总数: {index.distinct_count():,}")
+
+    platforms = index.platforms()
+    if len(platforms) > 1:
+        print("\n覆盖矩阵（行: 已发布的平台，列: 未发布的平台，对角线为该平台已发布数）")
+        width = max(10, max(len(platform) for platform in platforms) + 2)
+        print(" " * width + "".join(f"{platform:>{width}}" for platform in platforms))
+        for platform, row in zip(platforms, index.gap_matrix(platforms)):
+            print(f"{platform:<{width}}" + "".join(f"{count:>{width},}" for count in row))
+
+    if gap:
+        source, target = gap
+        missing = [target_name for target_name in gap if not index.mask(target_name)]
+        if missing:
+            print(f"\n未找到目录: {', '.join(missing)}")
+            return
+        gaps = index.gaps(source, target)
+        print(f"\n在 {source} 已发布但在 {target} 未发布的视频:")
+        for name, pending in gaps:
+            print(f"{name}  {'(待发布)' if pending else ''}".rstrip())
+        print(f"共 {len(gaps):,} 个视频，其中 {sum(1 for _, pending in gaps if pending):,} 个在 {target} 中待发布")
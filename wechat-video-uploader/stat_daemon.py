@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# stat_daemon.py
+# publish-stat.py 的常驻统计服务
+# 启动时统计一次所有目录，之后监视各个 fixed-* 目录（Linux 上使用 inotify，其他情况轮询），
+# 只重新读取发生变化的目录；汇总、每日、每小时统计和待发布积压通过本机 HTTP 接口以 JSON 返回，
+# 监控每分钟查询一次只是读取内存中的结果，不再扫描 NAS。
+
+import os
+import json
+import time
+import errno
+import select
+import struct
+import threading
+import ctypes
+import ctypes.util
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from ledger_common import RELEASED_CSV, new_summary, add_record
+from stat_index import read_ledger_changes
+from stat_table import ReleaseTable
+from video_tree import discover_directories
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# 监视 fixed-* 目录: 记录文件追加、重写（重命名替换）和视频文件增删都会产生这些事件
+DIR_EVENTS = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE \
+    | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+# 监视基础目录和平台目录: 只关心新增或删除子目录
+TREE_EVENTS = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# 收到事件后等待的秒数，把一次写入产生的多个事件合并成一次刷新
+DEBOUNCE_SECONDS = 0.5
+
+# 默认轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 30
+
+
+def read_changes_logged(fixed_dir, state):
+    """
+    读取一个目录的变化，出错（目录已被删除、网络盘 ESTALE、stat 和 open 之间文件被替换等）时
+    打印原因并返回 None，该目录保留上一次的统计结果，下次变化或定时检查时再读取
+    """
+    try:
+        return read_ledger_changes(fixed_dir, state)
+    except OSError as e:
+        print(f"读取 {fixed_dir} 时出错，保留上次的统计结果: {e}")
+        return None
+
+
+class LiveStats:
+    """
+    所有目录的内存统计结果，每个目录保存发布记录统计、文件状态和待发布视频数
+    HTTP 线程读取、监视线程更新，用锁保护；查询结果缓存到下一次更新之前
+    """
+
+    def __init__(self, base_dir, platform=None, jobs=1):
+        self.base_dir = base_dir
+        self.platform = platform
+        self.jobs = jobs
+        self.lock = threading.Lock()
+        self.directories = []
+        self.entries = {}
+        self.views = None
+        self.views_day = None
+        self.updated_at = None
+
+    def discover(self):
+        """
+        重新发现目录，返回新增的目录列表；指定的平台不存在时统计所有平台
+        """
+        try:
+            directories = discover_directories(self.base_dir)
+        except OSError as e:
+            print(f"发现目录时出错，沿用上次的目录列表: {e}")
+            return []
+        if self.platform and any(platform == self.platform for platform, _, _ in directories):
+            directories = [d for d in directories if d[0] == self.platform]
+
+        with self.lock:
+            known = {fixed_dir for _, _, fixed_dir in self.directories}
+            self.directories = directories
+            current = {fixed_dir for _, _, fixed_dir in directories}
+            for fixed_dir in list(self.entries):
+                if fixed_dir not in current:
+                    del self.entries[fixed_dir]
+            self.views = None
+        added = [d for d in directories if d[2] not in known]
+        self.refresh([fixed_dir for _, _, fixed_dir in added])
+        return added
+
+    def refresh(self, fixed_dirs):
+        """
+        增量更新指定目录的统计，只读取记录文件新追加的部分，文件被重写时重新统计该目录
+        返回读取出错的目录列表
+        """
+        if not fixed_dirs:
+            return []
+        with self.lock:
+            states = [self.entries[d]["state"] if d in self.entries else None for d in fixed_dirs]
+
+        with ThreadPoolExecutor(max_workers=max(self.jobs, 1)) as executor:
+            changes = list(executor.map(read_changes_logged, fixed_dirs, states))
+
+        with self.lock:
+            for fixed_dir, change in zip(fixed_dirs, changes):
+                if change is None:
+                    continue
+                reset, records, state, pending = change
+                entry = self.entries.get(fixed_dir)
+                if entry is None or reset:
+                    entry = self.entries[fixed_dir] = {"summary": new_summary()}
+                for record in records:
+                    add_record(entry["summary"], record)
+                entry["state"] = state
+                entry["pending"] = pending
+            self.views = None
+            self.updated_at = time.time()
+        return [fixed_dir for fixed_dir, change in zip(fixed_dirs, changes) if change is None]
+
+    def build_views(self):
+        """
+        由各目录的统计结果生成所有查询结果，调用方持有锁
+        """
+        all_data = {}
+        for platform, lang_pair, fixed_dir in self.directories:
+            entry = self.entries.get(fixed_dir)
+            if entry is None:
+                continue
+            all_data.setdefault(platform, {})[lang_pair] = {
+                "未发布数": entry["pending"],
+                "发布分布": entry["summary"]["发布分布"],
+            }
+        table = ReleaseTable.from_all_data(all_data)
+
+        summary = [
+            {"platform": platform, "lang_pair": lang_pair, "total": total,
+             "released": released, "pending": pending, "rate": rate}
+            for platform, lang_pair, total, released, pending, rate
+            in sorted(table.summary_rows(), key=lambda row: (row[0], row[1]))
+        ]
+        total_videos = sum(row["total"] for row in summary)
+        total_released = sum(row["released"] for row in summary)
+        backlog = [
+            {"platform": platform, "lang_pair": lang_pair, "pending": pending,
+             "released_1d": day, "released_7d": week, "released_30d": month,
+             "days_to_drain": days_to_drain, "throughput_drop": dropped}
+            for platform, lang_pair, pending, day, week, month, days_to_drain, dropped
+            in table.throughput_rows(date.today())
+        ]
+        return {
+            "summary": {
+                "rows": summary,
+                "total": total_videos,
+                "released": total_released,
+                "pending": total_videos - total_released,
+                "rate": round(total_released / total_videos * 100, 2) if total_videos > 0 else 0,
+            },
+            "daily": [{"date": day.isoformat(), "count": count} for day, count in table.daily_stats()],
+            "hourly": [{"hour": hour, "count": count} for hour, count in table.hourly_stats()],
+            "backlog": {
+                "rows": sorted(backlog, key=lambda row: -row["pending"]),
+                "pending": total_videos - total_released,
+            },
+        }
+
+    def view(self, name):
+        """
+        返回指定查询结果的 JSON 字节串，name 为 None 时返回全部
+        """
+        with self.lock:
+            # 吞吐量按日期滚动，跨天后即使没有文件变化也重新生成
+            if self.views is None or self.views_day != date.today():
+                self.views_day = date.today()
+                views = self.build_views()
+                views["updated_at"] = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.updated_at))
+                self.views = {key: json.dumps(value, ensure_ascii=False).encode('utf-8')
+                              for key, value in views.items()}
+                self.views[None] = json.dumps(views, ensure_ascii=False).encode('utf-8')
+            return self.views.get(name)
+
+
+def make_handler(stats):
+    """
+    生成 HTTP 请求处理类: / 返回全部结果，/summary /daily /hourly /backlog 返回单项（backlog 含吞吐量和预计清空天数）
+    """
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            name = self.path.split('?', 1)[0].strip('/') or None
+            body = stats.view(name) if name != "updated_at" else None
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 监控每分钟都会查询，不输出访问日志
+            pass
+
+    return StatsHandler
+
+
+class Inotify:
+    """
+    通过 ctypes 调用 libc 的 inotify 接口，不依赖第三方库
+    """
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("找不到 libc")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("当前系统不支持 inotify")
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.paths = {}
+
+    def add_watch(self, path, mask):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"无法监视目录: {path}")
+        self.paths[wd] = path
+        return wd
+
+    def read_events(self, timeout):
+        """
+        等待最多 timeout 秒，返回 [(被监视的目录, 事件掩码, 文件名)]
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, name_len = EVENT_HEADER.unpack_from(data, pos)
+            pos += EVENT_HEADER.size
+            name = data[pos:pos + name_len].rstrip(b'\0').decode('utf-8', errors='replace')
+            pos += name_len
+            events.append((self.paths.get(wd), mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def watch_inotify(stats, interval, inotify):
+    """
+    用 inotify 监视基础目录、平台目录和所有 fixed-* 目录，有事件的目录在短暂合并后刷新
+    新增目录时重新发现；事件队列溢出时刷新所有目录；每隔 interval 秒仍按轮询方式检查一次，
+    兜底处理网络盘上其他主机写入时收不到事件的情况
+    inotify 由调用方创建，返回时关闭
+    """
+    watched = set()
+
+    def add_watch(path, mask):
+        # 发现之后被删除的目录等无法监视时跳过，下次定时检查时再尝试，不影响其他目录
+        try:
+            inotify.add_watch(path, mask)
+            watched.add(path)
+        except OSError as e:
+            print(f"监视 {path} 时出错: {e}")
+
+    def add_watches():
+        tree_dirs = {stats.base_dir} | {os.path.dirname(d) for _, _, d in stats.directories}
+        for path in tree_dirs:
+            if path not in watched:
+                add_watch(path, TREE_EVENTS)
+        for _, _, fixed_dir in stats.directories:
+            if fixed_dir not in watched:
+                add_watch(fixed_dir, DIR_EVENTS)
+
+    try:
+        add_watches()
+        fixed_dirs = {d for _, _, d in stats.directories}
+        signatures = {d: directory_signature(d) for d in fixed_dirs}
+        last_full = time.monotonic()
+        while True:
+            timeout = max(0, interval - (time.monotonic() - last_full))
+            events = inotify.read_events(timeout)
+            if not events:
+                # 定时检查
+                signatures = check_changes(stats, signatures)
+                add_watches()
+                fixed_dirs = {d for _, _, d in stats.directories}
+                last_full = time.monotonic()
+                continue
+
+            # 合并短时间内的连续事件
+            deadline = time.monotonic() + DEBOUNCE_SECONDS
+            while time.monotonic() < deadline:
+                events.extend(inotify.read_events(max(0, deadline - time.monotonic())))
+
+            dirty = set()
+            rediscover = False
+            for path, mask, _ in events:
+                if mask & IN_Q_OVERFLOW:
+                    dirty.update(fixed_dirs)
+                elif path in fixed_dirs:
+                    dirty.add(path)
+                    if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                        rediscover = True
+                else:
+                    rediscover = True
+
+            if rediscover:
+                stats.discover()
+                # 被删除或移走的目录由内核自动取消监视，重新发现后按新的目录列表补充监视
+                watched.difference_update(fixed_dirs - {d for _, _, d in stats.directories})
+                add_watches()
+                fixed_dirs = {d for _, _, d in stats.directories}
+            stats.refresh(sorted(dirty & fixed_dirs))
+    finally:
+        inotify.close()
+
+
+def directory_signature(fixed_dir):
+    """
+    轮询时判断目录是否变化: 目录本身的修改时间（视频增删）和记录文件的标识、大小、修改时间
+    """
+    signature = []
+    for path in (fixed_dir, os.path.join(fixed_dir, RELEASED_CSV)):
+        try:
+            st = os.stat(path)
+            signature.append((st.st_ino, st.st_size, st.st_mtime_ns))
+        except OSError:
+            # 不存在或暂时无法访问，恢复后状态不同，会触发刷新
+            signature.append(None)
+    return tuple(signature)
+
+
+def check_changes(stats, signatures):
+    """
+    重新发现目录并对比各目录的状态，只刷新发生变化的目录，返回新的状态表
+    """
+    stats.discover()
+    current = {}
+    dirty = []
+    for _, _, fixed_dir in stats.directories:
+        current[fixed_dir] = directory_signature(fixed_dir)
+        if signatures.get(fixed_dir) != current[fixed_dir]:
+            dirty.append(fixed_dir)
+    for fixed_dir in stats.refresh(dirty):
+        # 读取出错的目录不记录状态，下次检查时重试
+        current.pop(fixed_dir, None)
+    return current
+
+
+def watch_polling(stats, interval):
+    """
+    每隔 interval 秒检查一次各目录和记录文件的状态，只刷新发生变化的目录
+    """
+    signatures = {d: directory_signature(d) for _, _, d in stats.directories}
+    while True:
+        time.sleep(interval)
+        signatures = check_changes(stats, signatures)
+
+
+def serve(base_dir, port, platform=None, jobs=1, watch="auto", interval=DEFAULT_POLL_INTERVAL):
+    """
+    启动常驻统计服务: 先统计一次所有目录，然后在 127.0.0.1:port 提供 JSON 接口并监视目录变化
+    watch 为 auto 时优先使用 inotify，不可用时退回轮询
+    """
+    stats = LiveStats(base_dir, platform, jobs)
+    started = time.monotonic()
+    stats.discover()
+    print(f"已统计 {len(stats.directories)} 个目录，用时 {time.monotonic() - started:.2f} 秒")
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(stats))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"统计服务已启动: http://127.0.0.1:{server.server_port}/ (summary, daily, hourly, backlog)")
+
+    try:
+        if watch in ("auto", "inotify"):
+            # 只有创建 inotify 本身失败时退回轮询，单个目录的错误在监视循环中处理
+            try:
+                inotify = Inotify()
+            except OSError as e:
+                if watch == "inotify":
+                    raise
+                print(f"inotify 不可用 ({e})，改为每 {interval} 秒轮询")
+                watch_polling(stats, interval)
+            else:
+                print("使用 inotify 监视目录变化")
+                watch_inotify(stats, interval, inotify)
+        else:
+            print(f"每 {interval} 秒轮询目录变化")
+            watch_polling(stats, interval)
+    except KeyboardInterrupt:
+        print("\n统计服务已停止")
+    finally:
+        server.shutdown()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# stat_export.py
+# publish-stat.py 的导出功能
+# 发布事件快照: 把每一条发布记录写成列式快照文件（Parquet 或 Arrow IPC），
+# 下游的 notebook 和看板直接读取快照，不用再扫描 NAS 上的所有发布记录文件
+# Excel 导出: 逐行流式写入工作簿，内存占用固定，可以附带每条发布记录的明细表
+
+import os
+import shutil
+import tempfile
+from itertools import chain, islice
+
+from ledger_common import iter_ledger, ledger_files, load_segment_manifest
+from stat_window import NO_TIMESTAMP_MAX, NO_TIMESTAMP_MIN, timestamp_value, window_ledgers
+
+# 使用 Arrow IPC 格式的快照文件后缀，其余后缀写 Parquet
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+# 每个记录批次的最大行数，大文件分批写入，内存占用不随发布记录数增长
+SNAPSHOT_BATCH_ROWS = 65536
+
+
+def snapshot_schema(pa):
+    """
+    发布事件快照的表结构，重复度高的字符串列使用字典编码
+    """
+    return pa.schema([
+        ("platform", pa.dictionary(pa.int32(), pa.string())),
+        ("lang_pair", pa.dictionary(pa.int32(), pa.string())),
+        ("file_name", pa.string()),
+        ("date_dir", pa.dictionary(pa.int32(), pa.string())),
+        ("released_at", pa.timestamp("s")),
+        ("ledger", pa.dictionary(pa.int32(), pa.string())),
+    ])
+
+
+class SnapshotDictionary:
+    """
+    在所有记录批次之间共享的字典编码
+    Arrow IPC 文件中同一列的字典只能追加不能替换，所以各批次使用同一个不断增长的字典
+    """
+
+    def __init__(self):
+        self.values = []
+        self.codes = {}
+
+    def encode(self, pa, items):
+        """
+        把字符串列表编码为字典数组，None 编码为空值
+        """
+        indices = []
+        for item in items:
+            if item is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(item)
+            if code is None:
+                code = self.codes[item] = len(self.values)
+                self.values.append(item)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def export_files(fixed_dir, window=None):
+    """
+    导出时需要读取的记录文件，指定 window 时只取与时间范围相交的分段
+    """
+    if window:
+        return window_ledgers(fixed_dir, load_segment_manifest(fixed_dir), window[0], window[1])
+    return ledger_files(fixed_dir)
+
+
+def iter_export_records(csv_path, window=None):
+    """
+    逐条产出记录文件中要导出的记录，文件不存在时不产出
+    指定 window=(since, until) 时与 --since/--until 的统计一致，只产出发布时间戳在该范围内的记录，
+    没有时间戳的记录不产出
+    """
+    if window:
+        since = NO_TIMESTAMP_MAX if window[0] is None else window[0]
+        until = NO_TIMESTAMP_MIN - 1 if window[1] is None else window[1]
+    try:
+        for record in iter_ledger(csv_path):
+            if window:
+                value = timestamp_value(record.timestamp)
+                if value is None or not since <= value <= until:
+                    continue
+            yield record
+    except FileNotFoundError:
+        return
+
+
+def iter_snapshot_batches(pa, pc, schema, dictionaries, platform, lang_pair, csv_path, window=None):
+    """
+    逐批读取一个发布记录文件，产出快照记录批次，指定 window 时只包含该时间范围内的记录
+    文件名和日期目录取自记录路径，发布时间由14位时间戳批量转换，没有时间戳的旧记录为空值
+    """
+    def build_batch(file_names, date_dirs, timestamps):
+        size = len(file_names)
+        released_at = pc.strptime(pa.array(timestamps, pa.string()), format="%Y%m%d%H%M%S",
+                                  unit="s", error_is_null=True)
+        return pa.record_batch([
+            dictionaries["platform"].encode(pa, [platform] * size),
+            dictionaries["lang_pair"].encode(pa, [lang_pair] * size),
+            pa.array(file_names, pa.string()),
+            dictionaries["date_dir"].encode(pa, date_dirs),
+            released_at,
+            dictionaries["ledger"].encode(pa, [csv_path] * size),
+        ], schema=schema)
+
+    file_names, date_dirs, timestamps = [], [], []
+    for record in iter_export_records(csv_path, window):
+        date_dir, _, file_name = record.path.rpartition('/')
+        file_names.append(file_name)
+        date_dirs.append(date_dir or None)
+        timestamps.append(record.timestamp)
+        if len(file_names) >= SNAPSHOT_BATCH_ROWS:
+            yield build_batch(file_names, date_dirs, timestamps)
+            file_names, date_dirs, timestamps = [], [], []
+
+    if file_names:
+        yield build_batch(file_names, date_dirs, timestamps)
+
+
+def export_release_snapshot(directories, output_file, window=None):
+    """
+    把 discover_directories 找到的所有目录中的发布事件写入快照文件，指定 window 时只写入该时间范围内的事件
+    .arrow/.feather/.ipc 后缀写不压缩的 Arrow IPC 文件，下游可以直接内存映射读取；
+    其余后缀写 zstd 压缩的 Parquet 文件。需要安装 pyarrow，返回是否写入成功
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        print("导出发布快照需要安装 pyarrow: pip install pyarrow")
+        return False
+
+    try:
+        # 确保输出目录存在
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+
+        schema = snapshot_schema(pa)
+        dictionaries = {name: SnapshotDictionary() for name in ("platform", "lang_pair", "date_dir", "ledger")}
+        if output_file.lower().endswith(ARROW_SUFFIXES):
+            options = pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+            writer = pa.ipc.new_file(output_file, schema, options=options)
+        else:
+            import pyarrow.parquet as pq
+            writer = pq.ParquetWriter(output_file, schema, compression="zstd")
+
+        rows = 0
+        with writer:
+            for platform, lang_pair, fixed_dir in directories:
+                for csv_path in export_files(fixed_dir, window):
+                    for batch in iter_snapshot_batches(pa, pc, schema, dictionaries,
+                                                       platform, lang_pair, csv_path, window):
+                        writer.write_batch(batch)
+                        rows += batch.num_rows
+
+        print(f"发布事件快照已保存至: {output_file} ({rows:,} 条记录)")
+        return True
+    except Exception as e:
+        print(f"保存发布事件快照时出错: {e}")
+        return False
+
+
+# Excel 单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+# 发布明细工作表
+DETAIL_SHEET = "发布明细"
+DETAIL_COLUMNS = ["平台", "语言", "文件名", "日期目录", "发布时间"]
+
+
+class XlsxWriterBook:
+    """
+    使用 xlsxwriter 的 constant_memory 模式逐行写入，每行写完即落盘，速度最快
+    """
+
+    def __init__(self, path):
+        import xlsxwriter
+
+        self.workbook = xlsxwriter.Workbook(path, {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd",
+        })
+
+    def add_sheet(self, name, header, rows):
+        worksheet = self.workbook.add_worksheet(name)
+        worksheet.write_row(0, 0, header)
+        for row_index, row in enumerate(rows, 1):
+            worksheet.write_row(row_index, 0, row)
+
+    def close(self):
+        self.workbook.close()
+
+
+class OpenpyxlBook:
+    """
+    没有安装 xlsxwriter 时使用 openpyxl 的 write_only 模式，同样逐行写入、内存占用固定
+    """
+
+    def __init__(self, path):
+        from openpyxl import Workbook
+
+        self.path = path
+        self.workbook = Workbook(write_only=True)
+
+    def add_sheet(self, name, header, rows):
+        worksheet = self.workbook.create_sheet(name)
+        worksheet.append(header)
+        for row in rows:
+            worksheet.append(row)
+
+    def close(self):
+        self.workbook.save(self.path)
+
+
+def open_workbook(path):
+    """
+    优先使用 xlsxwriter，没有安装时退回 openpyxl
+    """
+    try:
+        return XlsxWriterBook(path)
+    except ImportError:
+        return OpenpyxlBook(path)
+
+
+def format_timestamp(timestamp):
+    """
+    14位时间戳转换为 YYYY-MM-DD HH:MM:SS，直接切片不经过 datetime
+    """
+    if not timestamp:
+        return ""
+    t = timestamp
+    return f"{t[:4]}-{t[4:6]}-{t[6:8]} {t[8:10]}:{t[10:12]}:{t[12:14]}"
+
+
+def iter_detail_rows(directories, window=None):
+    """
+    逐条产出所有目录发布记录（含分段文件）的明细行: (平台, 语言, 文件名, 日期目录, 发布时间)
+    指定 window=(since, until) 时只产出该时间范围内的记录，与快照和 --since/--until 的统计一致
+    """
+    for platform, lang_pair, fixed_dir in directories:
+        for csv_path in export_files(fixed_dir, window):
+            for record in iter_export_records(csv_path, window):
+                date_dir, _, file_name = record.path.rpartition('/')
+                yield (platform, lang_pair, file_name, date_dir, format_timestamp(record.timestamp))
+
+
+def write_workbook(path, sheets, detail_rows=None):
+    """
+    把工作表写入 path，sheets 为 [(工作表名, 表头, 数据行)]
+    detail_rows 不为空时追加发布明细表，超过 Excel 行数上限时自动拆分为 发布明细2、发布明细3 ...
+    """
+    book = open_workbook(path)
+    try:
+        for name, header, rows in sheets:
+            # 确保工作表名称不超过31个字符(Excel限制)
+            book.add_sheet(name[:31], header, rows)
+
+        if detail_rows is not None:
+            detail_rows = iter(detail_rows)
+            part = 1
+            while True:
+                chunk = islice(detail_rows, EXCEL_MAX_ROWS - 1)
+                first = next(chunk, None)
+                if first is None and part > 1:
+                    break
+                name = DETAIL_SHEET if part == 1 else f"{DETAIL_SHEET}{part}"
+                book.add_sheet(name, DETAIL_COLUMNS, chain([first], chunk) if first is not None else [])
+                if first is None:
+                    break
+                part += 1
+    finally:
+        book.close()
+
+
+def export_workbook(output_file, sheets, detail_rows=None):
+    """
+    导出 Excel 工作簿，先在本地临时目录完整写好一次，再移动到输出路径；
+    移动失败时把同一个已经写好的文件移到当前目录，不再重新生成。返回实际保存的路径，失败返回 None
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_workbook(tmp_path, sheets, detail_rows)
+        # mkstemp 创建的文件只有所有者可读写，改回按 umask 创建普通文件时的权限
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_path, 0o666 & ~umask)
+    except Exception as e:
+        print(f"保存Excel文件时出错: {e}")
+        os.remove(tmp_path)
+        return None
+
+    try:
+        # 确保输出目录存在
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        shutil.move(tmp_path, output_file)
+        print(f"\n数据已保存至: {output_file}")
+        return output_file
+    except Exception as e:
+        print(f"保存Excel文件时出错: {e}")
+
+    # 尝试保存到当前目录
+    alt_output = os.path.basename(output_file) or "video_stats.xlsx"
+    try:
+        shutil.move(tmp_path, alt_output)
+        print(f"数据已保存至当前目录: {alt_output}")
+        return alt_output
+    except Exception as e2:
+        print(f"保存到当前目录也失败: {e2}")
+        os.remove(tmp_path)
+        return None
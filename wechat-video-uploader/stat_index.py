@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# stat_index.py
+# publish-stat.py 的 SQLite 发布索引
+# 把 BASE_DIR 下所有 0-released.csv 镜像到一个本地 SQLite 数据库，每条发布记录一行，
+# 汇总、每日、每小时、日期+小时统计直接用 SQL 聚合得到，不用再读取文本文件；
+# "某个视频什么时候在快手发布的" 之类的临时查询也只需要查一次索引。
+# 和 stat_cache.py 一样按文件标识、字节偏移和首尾摘要增量更新，文件被重写时重建该文件的记录。
+# 目录有分段文件时（compact-ledger.py），分段清单变化后重建该目录的记录。
+
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+import numpy as np
+
+from ledger_common import RELEASED_CSV, read_records, load_segment_manifest, ledger_segments
+from stat_cache import DEFAULT_CACHE_DIR, fingerprint
+from stat_table import THROUGHPUT_SPAN, rolling_throughput
+from video_tree import count_pending_videos
+
+# 索引格式版本，格式变化时递增，旧索引自动重建
+INDEX_VERSION = 2
+
+# 默认索引文件
+DEFAULT_INDEX_PATH = os.path.join(DEFAULT_CACHE_DIR, "releases.sqlite3")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledgers (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    platform TEXT NOT NULL,
+    lang_pair TEXT NOT NULL,
+    pending INTEGER NOT NULL DEFAULT 0,
+    inode INTEGER,
+    size INTEGER,
+    mtime_ns INTEGER,
+    offset INTEGER NOT NULL DEFAULT 0,
+    head TEXT,
+    tail TEXT,
+    segments TEXT
+);
+CREATE TABLE IF NOT EXISTS releases (
+    ledger_id INTEGER NOT NULL REFERENCES ledgers(id),
+    platform TEXT NOT NULL,
+    lang_pair TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    date_dir TEXT,
+    day TEXT,
+    released_at TEXT,
+    release_date TEXT,
+    hour INTEGER
+);
+CREATE INDEX IF NOT EXISTS releases_platform_lang ON releases(platform, lang_pair);
+CREATE INDEX IF NOT EXISTS releases_release_date ON releases(release_date);
+CREATE INDEX IF NOT EXISTS releases_file_name ON releases(file_name);
+CREATE INDEX IF NOT EXISTS releases_ledger ON releases(ledger_id);
+-- 每日统计和吞吐量按日期目录分组、按日期范围过滤，同时按 ledger 和 --since/--until 过滤，(day, ledger_id, released_at) 可以覆盖这两类查询；
+-- 没有 ANALYZE 统计信息时 SQLite 会选 releases_ledger，所以这两类查询用 INDEXED BY 指定
+CREATE INDEX IF NOT EXISTS releases_day ON releases(day, ledger_id, released_at);
+"""
+
+
+def open_index(index_path=DEFAULT_INDEX_PATH):
+    """
+    打开（必要时创建）发布索引，版本不符时删除旧表重建
+    """
+    index_dir = os.path.dirname(index_path)
+    if index_dir:
+        os.makedirs(index_dir, exist_ok=True)
+    conn = sqlite3.connect(index_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    if conn.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:
+        conn.executescript("DROP TABLE IF EXISTS releases; DROP TABLE IF EXISTS ledgers;")
+        conn.execute(f"PRAGMA user_version={INDEX_VERSION}")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def release_row(ledger_id, platform, lang_pair, record):
+    """
+    把一条 ReleaseRecord 转换为 releases 表的一行
+    day 和 release_date 只保存有效日期（ISO 格式），占位的 30000000 等无效日期为空
+    """
+    date_dir, _, file_name = record.path.rpartition('/')
+    return (
+        ledger_id, platform, lang_pair, file_name, date_dir or None,
+        record.date_dir.isoformat() if record.date_dir is not None else None,
+        record.timestamp,
+        record.release_date.isoformat() if record.release_date is not None else None,
+        record.hour,
+    )
+
+
+def read_ledger_changes(fixed_dir, state):
+    """
+    对照索引中保存的状态读取一个目录的发布记录文件，只读文件不写数据库，可以在线程池中并发执行
+    返回 (是否需要先清空该文件的旧记录, 新读到的记录, 新的文件状态, 待发布视频数)
+    """
+    csv_path = os.path.join(fixed_dir, RELEASED_CSV)
+    pending = count_pending_videos(fixed_dir)
+    manifest = load_segment_manifest(fixed_dir)
+    segments = segment_signature(manifest)
+    try:
+        st = os.stat(csv_path)
+    except FileNotFoundError:
+        return True, read_segment_records(fixed_dir, manifest), None, pending
+
+    with open(csv_path, 'rb') as f:
+        offset = 0
+        reset = True
+        if (state and state["inode"] == st.st_ino and state["offset"] <= st.st_size
+                and state.get("segments") == segments):
+            if (state["size"] == st.st_size and state["mtime_ns"] == st.st_mtime_ns
+                    and state["offset"] == st.st_size):
+                # 文件没有任何变化
+                return False, [], state, pending
+            if fingerprint(f, state["offset"]) == (state["head"], state["tail"]):
+                # 只追加了新记录
+                offset = state["offset"]
+                reset = False
+
+        records, offset = read_records(f, offset)
+        head, tail = fingerprint(f, offset)
+
+    if reset:
+        # 分段文件在压缩之后不再变化，只在重建时读取
+        records = read_segment_records(fixed_dir, manifest) + records
+
+    return reset, records, {
+        "inode": st.st_ino,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "offset": offset,
+        "head": head,
+        "tail": tail,
+        "segments": segments,
+    }, pending
+
+
+def read_segment_records(fixed_dir, manifest):
+    """
+    读取分段清单中所有分段文件的记录
+    """
+    records = []
+    for segment_path in ledger_segments(fixed_dir, manifest):
+        try:
+            with open(segment_path, 'rb') as f:
+                records.extend(read_records(f)[0])
+        except FileNotFoundError:
+            print(f"分段文件不存在: {segment_path}")
+    return records
+
+
+def segment_signature(manifest):
+    """
+    分段清单的摘要: 各分段的文件名和内容摘要，没有分段时为 None
+    """
+    if manifest is None:
+        return None
+    return ",".join(f"{segment['file']}:{segment['sha1']}" for segment in manifest["segments"])
+
+
+def ledger_ids(conn, directories):
+    """
+    取得 directories 中各目录在索引中的编号，没有的先登记，返回与 directories 顺序一致的编号列表
+    """
+    ids = []
+    for platform, lang_pair, fixed_dir in directories:
+        path = os.path.abspath(os.path.join(fixed_dir, RELEASED_CSV))
+        conn.execute(
+            "INSERT INTO ledgers (path, platform, lang_pair) VALUES (?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET platform = excluded.platform, lang_pair = excluded.lang_pair",
+            (path, platform, lang_pair))
+        ids.append(conn.execute("SELECT id FROM ledgers WHERE path = ?", (path,)).fetchone()[0])
+    return ids
+
+
+def update_index(conn, directories, jobs=1):
+    """
+    增量更新 discover_directories 找到的各个目录的发布记录，返回与 directories 顺序一致的 ledger 编号
+    文件读取用线程池并发，数据库在当前线程内一次事务写入
+    """
+    with conn:
+        ids = ledger_ids(conn, directories)
+        states = []
+        for ledger_id in ids:
+            row = conn.execute(
+                "SELECT inode, size, mtime_ns, offset, head, tail, segments FROM ledgers WHERE id = ?",
+                (ledger_id,)).fetchone()
+            states.append(dict(zip(("inode", "size", "mtime_ns", "offset", "head", "tail", "segments"), row))
+                          if row[0] is not None else None)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        changes = list(executor.map(read_ledger_changes,
+                                    [fixed_dir for _, _, fixed_dir in directories], states))
+
+    with conn:
+        for ledger_id, (platform, lang_pair, _), (reset, records, state, pending) in zip(ids, directories, changes):
+            if reset:
+                conn.execute("DELETE FROM releases WHERE ledger_id = ?", (ledger_id,))
+            if records:
+                conn.executemany(
+                    "INSERT INTO releases VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (release_row(ledger_id, platform, lang_pair, record) for record in records))
+            if state is None:
+                # 记录文件不存在
+                state = {"inode": None, "size": None, "mtime_ns": None, "offset": 0, "head": None, "tail": None,
+                         "segments": None}
+            conn.execute(
+                "UPDATE ledgers SET pending = ?, inode = ?, size = ?, mtime_ns = ?, offset = ?, head = ?, tail = ?, "
+                "segments = ? WHERE id = ?",
+                (pending, state["inode"], state["size"], state["mtime_ns"], state["offset"],
+                 state["head"], state["tail"], state["segments"], ledger_id))
+    return ids
+
+
+class IndexTable:
+    """
+    基于 SQLite 发布索引的统计，和 stat_table.ReleaseTable 提供相同的统计方法，
+    只统计 ledger_ids 指定的目录；指定 window=(since, until)（YYYYMMDDhhmmss 整数，None 表示不限）时
+    只统计发布时间戳在该范围内的记录
+    """
+
+    def __init__(self, conn, ids, window=None):
+        self.conn = conn
+        self.ids = list(ids)
+        self.id_list = ",".join(str(int(i)) for i in self.ids) or "NULL"
+        # releases 表的查询条件
+        self.where = f"ledger_id IN ({self.id_list})"
+        if window:
+            since, until = window
+            self.where += " AND length(released_at) = 14 AND released_at NOT GLOB '*[^0-9]*'"
+            if since is not None:
+                self.where += f" AND released_at >= '{int(since):014d}'"
+            if until is not None:
+                self.where += f" AND released_at <= '{int(until):014d}'"
+
+    def summary_rows(self):
+        """
+        每个目录一行: (平台, 语言组合, 总视频数, 已发布数, 未发布数, 发布率)
+        """
+        released = dict(self.conn.execute(
+            f"SELECT ledger_id, COUNT(*) FROM releases WHERE {self.where} GROUP BY ledger_id"))
+        info = {ledger_id: (platform, lang_pair, pending) for ledger_id, platform, lang_pair, pending in self.conn.execute(
+            f"SELECT id, platform, lang_pair, pending FROM ledgers WHERE id IN ({self.id_list})")}
+        rows = []
+        for ledger_id in self.ids:
+            platform, lang_pair, pending = info[ledger_id]
+            released_count = released.get(ledger_id, 0)
+            total_videos = released_count + pending
+            rows.append((
+                platform,
+                lang_pair,
+                total_videos,
+                released_count,
+                pending,
+                round(released_count / total_videos * 100, 2) if total_videos > 0 else 0,
+            ))
+        return rows
+
+    def throughput_rows(self, as_of):
+        """
+        每个目录一行: (平台, 语言组合, 未发布数, 1/7/30 天发布数, 预计清空天数, 是否骤降)
+        只从索引中取出截止日期之前一段时间内按 (目录, 日期目录) 分组的数量
+        """
+        info = {ledger_id: (platform, lang_pair, pending) for ledger_id, platform, lang_pair, pending in self.conn.execute(
+            f"SELECT id, platform, lang_pair, pending FROM ledgers WHERE id IN ({self.id_list})")}
+        dir_codes = {ledger_id: dir_code for dir_code, ledger_id in enumerate(self.ids)}
+        rows = self.conn.execute(
+            f"SELECT ledger_id, day, COUNT(*) FROM releases INDEXED BY releases_day "
+            f"WHERE {self.where} AND day >= ? AND day <= ? "
+            "GROUP BY ledger_id, day",
+            ((as_of - timedelta(days=THROUGHPUT_SPAN - 1)).isoformat(), as_of.isoformat())).fetchall()
+        throughput = rolling_throughput(
+            np.array([dir_codes[ledger_id] for ledger_id, _, _ in rows], dtype=np.int64),
+            np.array([date.fromisoformat(day).toordinal() for _, day, _ in rows], dtype=np.int64),
+            np.array([count for _, _, count in rows], dtype=np.int64),
+            [info[ledger_id][2] for ledger_id in self.ids], as_of.toordinal())
+        return [info[ledger_id] + row for ledger_id, row in zip(self.ids, throughput)]
+
+    def daily_stats(self):
+        """
+        按日期目录统计每日发布数量，返回 [(日期, 数量)]
+        """
+        return [(date.fromisoformat(day), count) for day, count in self.conn.execute(
+            f"SELECT day, COUNT(*) FROM releases INDEXED BY releases_day WHERE {self.where} AND day IS NOT NULL "
+            "GROUP BY day ORDER BY day")]
+
+    def hourly_stats(self):
+        """
+        按发布时间戳中的小时统计发布数量，返回 [(小时, 数量)]
+        """
+        return list(self.conn.execute(
+            f"SELECT hour, COUNT(*) FROM releases WHERE {self.where} AND hour IS NOT NULL "
+            "GROUP BY hour ORDER BY hour"))
+
+    def date_hour_stats(self):
+        """
+        按发布时间戳中的日期和小时统计发布数量，返回 [((日期, 小时), 数量)]
+        """
+        return [((date.fromisoformat(day), hour), count) for day, hour, count in self.conn.execute(
+            f"SELECT release_date, hour, COUNT(*) FROM releases WHERE {self.where} "
+            "AND release_date IS NOT NULL AND hour IS NOT NULL "
+            "GROUP BY release_date, hour ORDER BY release_date, hour")]
+
+
+def find_releases(conn, file_name, platform=None, ids=None):
+    """
+    按文件名查询发布记录，可以限定平台，ids 不为空时只查这些 ledger
+    file_name 中含有 * 或 ? 时按通配符匹配，否则精确匹配（走文件名索引）
+    返回 [(平台, 语言组合, 日期目录, 文件名, 发布时间戳)]
+    """
+    operator = "GLOB" if any(ch in file_name for ch in "*?[") else "="
+    sql = ("SELECT platform, lang_pair, date_dir, file_name, released_at FROM releases "
+           f"WHERE file_name {operator} ?")
+    params = [file_name]
+    if ids is not None:
+        sql += f" AND ledger_id IN ({','.join(str(int(i)) for i in ids) or 'NULL'})"
+    if platform:
+        sql += " AND platform = ?"
+        params.append(platform)
+    return conn.execute(sql + " ORDER BY released_at, platform, lang_pair", params).fetchall()
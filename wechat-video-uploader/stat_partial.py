@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# stat_partial.py
+# 多台机器的统计合并
+# 每台上传机器各有一份 BASE_DIR，用 publish-stat.py --partial-output 把本机的统计写成一个部分统计文件:
+# 每个 (平台, 语言组合) 的待发布数、已发布数和发布分布（(日期目录, 发布日期, 小时) 计数，
+# 每日、每小时、日期+小时统计都由它汇总得到）。文件只和目录数、不同日期小时数有关，与记录条数无关；
+# publish-stat.py --merge 读取任意多个部分统计文件，合并后照常输出汇总、图表和 Excel。
+# 文件名以 .gz 结尾时用 gzip 压缩。
+
+import os
+import gzip
+import json
+import socket
+from collections import Counter
+from datetime import datetime
+
+# 部分统计文件的格式标识和版本，格式变化时递增，旧版本的文件不再合并
+PARTIAL_FORMAT = "publish-stat-partial"
+PARTIAL_VERSION = 1
+
+
+def open_partial(path, mode):
+    """
+    按文件名打开部分统计文件，.gz 结尾时使用 gzip
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def build_partial(all_data, base_dir, window=None):
+    """
+    把 collect_all_data 的结果转换为部分统计，发布分布的键都是整数，直接展开
+    """
+    return {
+        "format": PARTIAL_FORMAT,
+        "version": PARTIAL_VERSION,
+        "machine": socket.gethostname(),
+        "generated_at": datetime.now().isoformat(timespec='seconds'),
+        "base_dir": os.path.abspath(base_dir),
+        "window": list(window) if window else None,
+        "directories": [
+            {
+                "platform": platform,
+                "lang_pair": lang_pair,
+                "pending": stats["未发布数"],
+                "released": stats["已发布数"],
+                "distribution": [[date_dir, release_date, hour, count]
+                                 for (date_dir, release_date, hour), count in stats["发布分布"].items()],
+            }
+            for platform, platform_data in all_data.items()
+            for lang_pair, stats in platform_data.items()
+        ],
+    }
+
+
+def save_partial(output_file, partial):
+    """
+    写入部分统计文件
+    """
+    try:
+        with open_partial(output_file, 'w') as f:
+            json.dump(partial, f, ensure_ascii=False, separators=(',', ':'))
+        print(f"部分统计已保存至: {output_file}")
+    except OSError as e:
+        print(f"保存部分统计时出错: {e}")
+
+
+def load_partial(path):
+    """
+    读取部分统计文件，无法读取或格式、版本不符时打印原因并返回 None
+    """
+    try:
+        with open_partial(path, 'r') as f:
+            partial = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取部分统计 {path} 时出错: {e}")
+        return None
+
+    if not isinstance(partial, dict) or partial.get("format") != PARTIAL_FORMAT:
+        print(f"跳过 {path}: 不是部分统计文件")
+        return None
+    if partial.get("version") != PARTIAL_VERSION:
+        print(f"跳过 {path}: 版本 {partial.get('version')} 与当前版本 {PARTIAL_VERSION} 不符")
+        return None
+    return partial
+
+
+def merge_partials(paths, platform=None):
+    """
+    合并多个部分统计文件，返回 (与 collect_all_data 相同结构的 {平台: {语言组合: 统计}}, 合并的文件信息列表)
+    同一个 (平台, 语言组合) 在多台机器上都有时，待发布数、已发布数和发布分布相加；
+    同一台机器同一时间生成的文件只合并一次；指定 platform 时只保留该平台
+    """
+    merged = {}
+    sources = []
+    seen = set()
+    for path in paths:
+        partial = load_partial(path)
+        if partial is None:
+            continue
+        key = (partial.get("machine"), partial.get("generated_at"), partial.get("base_dir"))
+        if key in seen:
+            print(f"跳过 {path}: 与已合并的文件重复")
+            continue
+        seen.add(key)
+        sources.append({"path": path, "machine": key[0], "generated_at": key[1],
+                        "window": partial.get("window")})
+
+        for entry in partial["directories"]:
+            if platform and entry["platform"] != platform:
+                continue
+            stats = merged.setdefault(entry["platform"], {}).setdefault(entry["lang_pair"], {
+                "待发布数": 0,
+                "已发布数": 0,
+                "发布分布": Counter(),
+            })
+            stats["待发布数"] += entry["pending"]
+            stats["已发布数"] += entry["released"]
+            distribution = stats["发布分布"]
+            for date_dir, release_date, hour, count in entry["distribution"]:
+                distribution[(date_dir, release_date, hour)] += count
+
+    # 补齐与 analyze_directory 相同的字段
+    all_data = {}
+    for platform_name, platform_data in merged.items():
+        for lang_pair, stats in platform_data.items():
+            released_count = stats["已发布数"]
+            total_videos = released_count + stats["待发布数"]
+            all_data.setdefault(platform_name, {})[lang_pair] = {
+                "总视频数": total_videos,
+                "已发布数": released_count,
+                "未发布数": stats["待发布数"],
+                "发布率": round(released_count / total_videos * 100, 2) if total_videos > 0 else 0,
+                "发布分布": stats["发布分布"],
+            }
+    return all_data, sources
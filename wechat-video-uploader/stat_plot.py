@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+# stat_plot.py
+# publish-stat.py 的绘图功能
+# 中文字体只解析一次并缓存到磁盘；图表使用面向对象的 Figure API（Agg 后端）绘制，
+# 不依赖 pyplot 的全局状态，多张图可以在多个进程中同时渲染
+
+import os
+import glob
+import json
+from concurrent.futures import ProcessPoolExecutor
+
+from stat_cache import DEFAULT_CACHE_DIR
+
+# 尝试使用系统中可能存在的中文字体
+CHINESE_FONTS = ['Arial Unicode MS', 'SimHei', 'STHeiti', 'Microsoft YaHei', 'PingFang SC', 'Heiti SC']
+
+# 字体解析结果缓存文件
+FONT_CACHE_FILE = os.path.join(DEFAULT_CACHE_DIR, "font.json")
+
+# 图表名称，用于输出信息
+CHART_NAMES = {
+    "trend": "趋势图",
+    "hourly": "时间段分布图",
+    "date_hour": "日期+小时分布图",
+}
+
+# 没有数据时的提示
+EMPTY_MESSAGES = {
+    "trend": "没有足够的数据来绘制趋势图",
+    "hourly": "没有足够的数据来绘制小时趋势图",
+    "date_hour": "没有足够的数据来绘制日期+小时趋势图",
+}
+
+# 保存失败时在当前目录使用的文件名
+ALT_OUTPUTS = {
+    "trend": "trend_chart.png",
+    "hourly": "hourly_chart.png",
+    "date_hour": "date_hour_chart.png",
+}
+
+# 图像尺寸
+CHART_SIZES = {
+    "trend": (10, 6),
+    "hourly": (10, 6),
+    "date_hour": (12, 8),
+}
+
+# 图表标签: (标题, x轴, y轴)，找不到中文字体时使用英文标签
+CHART_LABELS = {
+    "trend": {
+        "zh": ('每日视频发布数量趋势', '发布日期', '发布视频数量'),
+        "en": ('Daily Video Release Trend', 'Release Date', 'Number of Videos'),
+    },
+    "hourly": {
+        "zh": ('视频发布时间段分布', '小时', '发布视频数量'),
+        "en": ('Hourly Video Release Distribution', 'Hour of Day', 'Number of Videos'),
+    },
+    "date_hour": {
+        "zh": ('按日期和小时统计的视频发布量', '日期', '小时'),
+        "en": ('Video Publication by Date and Hour', 'Date', 'Hour'),
+    },
+}
+
+COLORBAR_LABELS = {"zh": '视频数量', "en": 'Number of Videos'}
+
+# 热力图最多显示的列数，日期跨度更大时自动按周或按月合并
+MAX_HEATMAP_COLUMNS = 60
+
+# 热力图 x 轴最多显示的日期标签数
+MAX_HEATMAP_TICKS = 40
+
+# 热力图最多标注的单元格数量，超过时不再逐个标注数值
+MAX_HEATMAP_LABELS = 1500
+
+# 日期合并粒度对应的标签格式和坐标轴名称
+BIN_DATE_FORMATS = {"day": "%m-%d", "week": "%Y-%m-%d", "month": "%Y-%m"}
+BIN_AXIS_LABELS = {
+    "day": {"zh": '日期', "en": 'Date'},
+    "week": {"zh": '周（起始日期）', "en": 'Week (starting)'},
+    "month": {"zh": '月份', "en": 'Month'},
+}
+
+# 1970-01-01 的日期序数，用于 date.toordinal() 和 numpy datetime64 之间的转换
+EPOCH_ORDINAL = 719163
+
+
+def font_cache_key():
+    """
+    字体缓存的键: matplotlib 版本、候选字体和 matplotlib 字体列表缓存的修改时间
+    matplotlib 重建字体列表（如安装了新字体后）时缓存自动失效
+    """
+    import matplotlib
+
+    fontlists = sorted(glob.glob(os.path.join(matplotlib.get_cachedir(), "fontlist-*.json")))
+    mtimes = [str(int(os.path.getmtime(path))) for path in fontlists]
+    return "|".join([matplotlib.__version__] + CHINESE_FONTS + mtimes)
+
+
+def resolve_chinese_font(cache_file=FONT_CACHE_FILE):
+    """
+    查找支持中文的字体，返回 (字体文件路径, 字体名称)，找不到时返回 None
+    逐个 findfont 很慢，结果缓存到磁盘，之后的运行直接读取缓存
+    """
+    key = font_cache_key()
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached.get("key") == key and (cached["path"] is None or os.path.exists(cached["path"])):
+            return (cached["path"], cached["name"]) if cached["path"] else None
+    except (OSError, ValueError, KeyError, AttributeError):
+        pass
+
+    import matplotlib.font_manager as fm
+
+    font = None
+    for family in CHINESE_FONTS:
+        try:
+            font_path = fm.findfont(fm.FontProperties(family=family), fallback_to_default=False)
+        except Exception:
+            continue
+        font = (font_path, fm.FontProperties(fname=font_path).get_name())
+        break
+
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "path": font and font[0], "name": font and font[1]}, f, ensure_ascii=False)
+    except OSError as e:
+        print(f"写入字体缓存时出错: {e}")
+
+    return font
+
+
+def draw_release_trend(fig, daily_stats, lang, options=None):
+    """
+    绘制发布趋势图
+    """
+    # 按日期排序，只取最近30天的数据，减少图片大小
+    sorted_stats = sorted(daily_stats)[-30:]
+    date_strs = [date for date, _ in sorted_stats]
+    counts = [count for _, count in sorted_stats]
+
+    ax = fig.add_subplot()
+    ax.bar(range(len(date_strs)), counts, color='skyblue', width=0.7)
+
+    # 设置 x 轴刻度为日期文本
+    ax.set_xticks(range(len(date_strs)))
+    ax.set_xticklabels(date_strs, rotation=45, fontsize=8)
+
+    # 添加数据标签，但只对较大的值显示数字
+    for i, count in enumerate(counts):
+        if count > 5:  # 只对大于5的值显示标签
+            ax.text(i, count + 1, str(count), ha='center', va='bottom', fontsize=8)
+
+    title, xlabel, ylabel = CHART_LABELS["trend"][lang]
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_title(title, fontsize=16)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+def draw_hourly_trend(fig, hourly_stats, lang, options=None):
+    """
+    绘制小时发布趋势图
+    """
+    hours = [f"{hour}:00" for hour, _ in hourly_stats]
+    counts = [count for _, count in hourly_stats]
+
+    ax = fig.add_subplot()
+    ax.bar(range(len(hours)), counts, color='lightgreen', width=0.7)
+
+    # 设置 x 轴刻度为小时文本
+    ax.set_xticks(range(len(hours)))
+    ax.set_xticklabels(hours, rotation=45, fontsize=8)
+
+    # 添加数据标签，但只对较大的值显示数字
+    for i, count in enumerate(counts):
+        if count > 5:  # 只对大于5的值显示标签
+            ax.text(i, count + 1, str(count), ha='center', va='bottom', fontsize=8)
+
+    title, xlabel, ylabel = CHART_LABELS["hourly"][lang]
+    ax.set_xlabel(xlabel, fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.set_title(title, fontsize=16)
+    ax.grid(axis='y', linestyle='--', alpha=0.7)
+
+
+def bin_dates(ordinals):
+    """
+    根据日期跨度自动选择按天、按周或按月合并日期，使热力图的列数不超过 MAX_HEATMAP_COLUMNS
+    ordinals 为 date.toordinal() 的整数数组，返回 (粒度, 每个日期所属分组的起始日期 datetime64[D] 数组)
+    """
+    import numpy as np
+
+    days = (ordinals - EPOCH_ORDINAL).astype('datetime64[D]')
+    day_numbers = days.astype(np.int64)
+    candidates = (
+        ("day", days),
+        # 1970-01-01 是星期四，加 3 后对 7 取余得到距离星期一的天数
+        ("week", (day_numbers - (day_numbers + 3) % 7).astype('datetime64[D]')),
+        ("month", days.astype('datetime64[M]').astype('datetime64[D]')),
+    )
+    for unit, bins in candidates:
+        if len(np.unique(bins)) <= MAX_HEATMAP_COLUMNS:
+            return unit, bins
+    return candidates[-1]
+
+
+def draw_date_hour_trend(fig, date_hour_stats, lang, options=None):
+    """
+    绘制日期+小时发布趋势热力图
+    覆盖全部历史数据，日期跨度较大时自动按周或按月合并；
+    单元格数值标注可以关闭（heatmap_labels）或只标注不小于阈值的单元格（heatmap_label_threshold）
+    """
+    import numpy as np
+
+    options = options or {}
+    ordinals = np.array([date.toordinal() for (date, _), _ in date_hour_stats], dtype=np.int64)
+    hours = np.array([hour for (_, hour), _ in date_hour_stats], dtype=np.int64)
+    counts = np.array([count for _, count in date_hour_stats], dtype=np.int64)
+
+    # 日期分组后按 (小时, 分组) 累加得到热力图数据矩阵
+    unit, bins = bin_dates(ordinals)
+    bin_values, bin_index = np.unique(bins, return_inverse=True)
+    hour_values, hour_index = np.unique(hours, return_inverse=True)
+    data = np.zeros((len(hour_values), len(bin_values)), dtype=np.int64)
+    np.add.at(data, (hour_index.reshape(-1), bin_index.reshape(-1)), counts)
+
+    ax = fig.add_subplot()
+    im = ax.imshow(data, cmap='YlGnBu', aspect='auto')
+
+    # 添加颜色条
+    cbar = fig.colorbar(im, ax=ax)
+    cbar.set_label(COLORBAR_LABELS[lang], fontsize=10)
+
+    # 设置坐标轴，列数较多时间隔显示日期标签
+    ax.set_yticks(range(len(hour_values)))
+    ax.set_yticklabels([f"{h:02d}:00" for h in hour_values])
+    step = -(-len(bin_values) // MAX_HEATMAP_TICKS)
+    date_format = BIN_DATE_FORMATS[unit]
+    ax.set_xticks(range(0, len(bin_values), step))
+    ax.set_xticklabels([value.astype(object).strftime(date_format) for value in bin_values[::step]],
+                       rotation=45, ha='right')
+
+    title, _, ylabel = CHART_LABELS["date_hour"][lang]
+    ax.set_title(title, fontsize=14)
+    ax.set_xlabel(BIN_AXIS_LABELS[unit][lang], fontsize=12)
+    ax.set_ylabel(ylabel, fontsize=12)
+    ax.grid(False)
+
+    # 一次性选出需要标注的单元格，数量过多时不标注
+    if options.get("heatmap_labels", True):
+        threshold = max(options.get("heatmap_label_threshold", 1), 1)
+        rows, cols = np.nonzero(data >= threshold)
+        if len(rows) <= MAX_HEATMAP_LABELS:
+            values = data[rows, cols]
+            colors = np.where(values > data.max() / 2, 'white', 'black')
+            for row, col, value, color in zip(rows.tolist(), cols.tolist(), values.tolist(), colors.tolist()):
+                ax.text(col, row, value, ha='center', va='center', color=color, fontsize=8)
+
+
+CHART_DRAWERS = {
+    "trend": draw_release_trend,
+    "hourly": draw_hourly_trend,
+    "date_hour": draw_date_hour_trend,
+}
+
+
+def chart_rc(font):
+    """
+    绘图时使用的 matplotlib 配置，只在绘制期间生效
+    """
+    return {'font.family': font[1] if font else 'sans-serif'}
+
+
+def save_figure(fig, kind, output_file):
+    """
+    保存图表，返回要输出的信息列表
+    保存失败时尝试以较低分辨率保存到当前目录
+    """
+    name = CHART_NAMES[kind]
+    messages = []
+    try:
+        # 确保输出目录存在
+        output_dir = os.path.dirname(output_file)
+        if output_dir and not os.path.exists(output_dir):
+            os.makedirs(output_dir, exist_ok=True)
+
+        # 使用更小的DPI和压缩级别保存图片
+        fig.savefig(output_file, format='png', dpi=100, bbox_inches='tight',
+                    transparent=False, pad_inches=0.1,
+                    facecolor='white', edgecolor='none')
+        messages.append(f"{name}已保存至: {output_file}")
+    except Exception as e:
+        messages.append(f"保存{name}时出错: {e}")
+        # 尝试保存到当前目录且使用不同文件名
+        alt_output = ALT_OUTPUTS[kind]
+        try:
+            fig.savefig(alt_output, format='png', dpi=72, bbox_inches='tight',
+                        transparent=False, facecolor='white')
+            messages.append(f"{name}已保存至当前目录: {alt_output}")
+        except Exception as e2:
+            messages.append(f"保存图片失败: {e2}")
+    return messages
+
+
+def render_chart(kind, stats, output_file, font, options=None):
+    """
+    在当前进程中绘制一张图表并保存为 PNG，返回要输出的信息列表
+    可以作为工作进程的任务执行
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+
+    lang = "zh" if font else "en"
+    with matplotlib.rc_context(chart_rc(font)):
+        fig = Figure(figsize=CHART_SIZES[kind], dpi=100)
+        CHART_DRAWERS[kind](fig, stats, lang, options)
+        fig.tight_layout()
+        return save_figure(fig, kind, output_file)
+
+
+def show_chart(kind, stats, font, options=None):
+    """
+    没有指定输出路径时在窗口中显示图表，只有这里需要 pyplot
+    """
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    lang = "zh" if font else "en"
+    with matplotlib.rc_context(chart_rc(font)):
+        fig = plt.figure(figsize=CHART_SIZES[kind], dpi=100)
+        CHART_DRAWERS[kind](fig, stats, lang, options)
+        fig.tight_layout()
+        plt.show()
+        plt.close(fig)
+
+
+def render_charts(charts, jobs=1, options=None):
+    """
+    绘制多张图表，charts 为 [(图表类型, 统计数据, 输出路径)]，options 为传给各绘图函数的选项
+    字体只解析一次；jobs 大于 1 时需要保存的图表在多个进程中并发渲染
+    """
+    font = resolve_chinese_font()
+    if font is None:
+        print("警告: 未找到支持中文的字体，将使用英文标签")
+
+    to_save = []
+    for kind, stats, output_file in charts:
+        if not stats:
+            print(EMPTY_MESSAGES[kind])
+        elif output_file:
+            to_save.append((kind, stats, output_file))
+        else:
+            show_chart(kind, stats, font, options)
+
+    if jobs > 1 and len(to_save) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(to_save))) as executor:
+            futures = [executor.submit(render_chart, kind, stats, output_file, font, options)
+                       for kind, stats, output_file in to_save]
+            results = [future.result() for future in futures]
+    else:
+        results = [render_chart(kind, stats, output_file, font, options)
+                   for kind, stats, output_file in to_save]
+
+    for messages in results:
+        for message in messages:
+            print(message)
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# stat_profile.py
+# publish-stat.py --profile 的分阶段计时
+# 记录每个阶段（目录发现、发布记录解析、汇总、输出、Excel、快照、绘图）和每个 (平台, 语言组合) 目录的
+# 墙钟时间、CPU 时间、处理行数和峰值内存，运行结束后打印明细，也可以输出 JSON；
+# 可选地为每个阶段采集 cProfile，运行结束后保存耗时最长的阶段
+
+import sys
+import time
+import json
+import cProfile
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，不统计进程的最大常驻内存
+    resource = None
+
+
+def max_rss_mb():
+    """
+    进程到目前为止的最大常驻内存（MB），无法获取时返回 None
+    """
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+class Profiler:
+    """
+    分阶段计时器，enabled 为假时所有方法都不做任何事情，不影响正常运行的速度
+    峰值内存使用 tracemalloc 统计，开启后程序整体会变慢，各阶段之间的耗时比例仍然可以参考
+    """
+
+    def __init__(self, enabled=False, cprofile=False):
+        self.enabled = enabled
+        self.cprofile = enabled and cprofile
+        self.stages = []
+        self.directories = []
+        self.profiles = {}
+        self.track_directory_memory = False
+        self.stage_peak = 0
+        if enabled:
+            tracemalloc.start()
+
+    def take_peak(self):
+        """
+        取出上次取出之后的内存峰值并重新开始统计，同时计入当前阶段的峰值
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        self.stage_peak = max(self.stage_peak, peak)
+        return peak
+
+    @contextmanager
+    def stage(self, name):
+        """
+        统计一个阶段，产出的字典中可以写入 rows（处理的行数）
+        """
+        info = {"rows": None}
+        if not self.enabled:
+            yield info
+            return
+
+        self.take_peak()
+        self.stage_peak = 0
+        profile = cProfile.Profile() if self.cprofile else None
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profile:
+            profile.enable()
+        try:
+            yield info
+        finally:
+            if profile:
+                profile.disable()
+                self.profiles[name] = profile
+            self.take_peak()
+            self.stages.append({
+                "name": name,
+                "wall": time.perf_counter() - wall_start,
+                "cpu": time.process_time() - cpu_start,
+                "rows": info["rows"],
+                "peak_mb": self.stage_peak / 1024 / 1024,
+            })
+
+    def run_directory(self, platform, lang_pair, func, *args):
+        """
+        执行并统计一个目录的分析函数，可以在线程池中调用
+        CPU 时间为当前线程的时间；并发分析时各目录的内存峰值互相重叠，只在串行分析时统计
+        """
+        if not self.enabled:
+            return func(*args)
+
+        if self.track_directory_memory:
+            self.take_peak()
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        result = func(*args)
+        self.add_directory(platform, lang_pair, time.perf_counter() - wall_start, result["已发布数"],
+                           time.thread_time() - cpu_start,
+                           self.take_peak() / 1024 / 1024 if self.track_directory_memory else None)
+        return result
+
+    def add_directory(self, platform, lang_pair, wall, rows, cpu=None, peak_mb=None):
+        """
+        记录一个目录的耗时，并发读取时目录的 I/O 分散在多个线程中，CPU 时间和内存峰值为 None
+        """
+        if not self.enabled:
+            return
+        # list.append 是原子操作，线程池中调用也是安全的
+        self.directories.append({
+            "platform": platform,
+            "lang_pair": lang_pair,
+            "wall": wall,
+            "cpu": cpu,
+            "rows": rows,
+            "peak_mb": peak_mb,
+        })
+
+    def report(self):
+        """
+        生成 JSON 可序列化的分析结果
+        """
+        return {
+            "total_wall": sum(s["wall"] for s in self.stages),
+            "total_cpu": sum(s["cpu"] for s in self.stages),
+            "max_rss_mb": max_rss_mb(),
+            "stages": self.stages,
+            "directories": sorted(self.directories, key=lambda d: -d["wall"]),
+        }
+
+    def print_report(self):
+        """
+        打印各阶段和各目录的耗时明细，目录按耗时从高到低排列
+        """
+        report = self.report()
+        total_wall = report["total_wall"] or 1
+
+        def rows_text(rows):
+            return f"{rows:,}" if rows is not None else "-"
+
+        def memory_text(peak_mb):
+            return f"{peak_mb:.1f}" if peak_mb is not None else "-"
+
+        def cpu_text(cpu):
+            return f"{cpu:.3f}" if cpu is not None else "-"
+
+        print("\n" + "="*80)
+        print("性能分析".center(80))
+        print("="*80)
+        print(f"{'阶段':<16}{'耗时(秒)':>10}{'占比':>8}{'CPU(秒)':>10}{'行数':>14}{'峰值内存(MB)':>14}")
+        for s in report["stages"]:
+            print(f"{s['name']:<18}{s['wall']:>10.3f}{s['wall'] / total_wall * 100:>9.1f}%{s['cpu']:>10.3f}"
+                  f"{rows_text(s['rows']):>14}{memory_text(s['peak_mb']):>16}")
+        print("-"*80)
+        print(f"{'合计':<16}{report['total_wall']:>10.3f}{'':>10}{report['total_cpu']:>10.3f}")
+        if report["max_rss_mb"] is not None:
+            print(f"进程最大常驻内存: {report['max_rss_mb']:.1f} MB")
+
+        if report["directories"]:
+            print(f"\n{'平台':<10}{'语言':<8}{'耗时(秒)':>10}{'CPU(秒)':>10}{'行数':>14}{'峰值内存(MB)':>14}")
+            for d in report["directories"]:
+                print(f"{d['platform']:<12}{d['lang_pair']:<10}{d['wall']:>10.3f}{cpu_text(d['cpu']):>10}"
+                      f"{rows_text(d['rows']):>14}{memory_text(d['peak_mb']):>16}")
+
+    def save_json(self, output_file):
+        """
+        把分析结果写入 JSON 文件
+        """
+        try:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            print(f"性能分析结果已保存至: {output_file}")
+        except OSError as e:
+            print(f"保存性能分析结果时出错: {e}")
+
+    def dump_hottest(self, output_file):
+        """
+        保存耗时最长的阶段的 cProfile 数据，可以用 python -m pstats 或 snakeviz 查看
+        """
+        if not self.profiles:
+            return
+        hottest = max((s for s in self.stages if s["name"] in self.profiles), key=lambda s: s["wall"])
+        try:
+            self.profiles[hottest["name"]].dump_stats(output_file)
+            print(f"耗时最长的阶段 {hottest['name']} 的 cProfile 数据已保存至: {output_file}")
+        except OSError as e:
+            print(f"保存 cProfile 数据时出错: {e}")
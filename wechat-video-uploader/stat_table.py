@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# stat_table.py
+# publish-stat.py 的列式发布事件表
+# 把所有目录的发布分布合并成一张整次运行共用的列式表，汇总、每日、每小时、日期+小时统计
+# 都是在这张表上做向量化的分组求和，不再在 Python 层逐个合并 Counter
+
+from datetime import date
+
+import numpy as np
+
+from ledger_common import MISSING_DATE, MISSING_HOUR
+
+# 滚动吞吐量的窗口（天）
+THROUGHPUT_WINDOWS = (1, 7, 30)
+
+# 吞吐量骤降的判断: 最近 RECENT_DAYS 天的日均发布数低于之前 BASELINE_DAYS 天日均的 DROP_RATIO
+RECENT_DAYS = 7
+BASELINE_DAYS = 30
+DROP_RATIO = 0.5
+
+# 之前 BASELINE_DAYS 天的发布数少于该值时不判断骤降，避免发布很少的目录误报
+DROP_MIN_BASELINE = 7
+
+# 计算吞吐量需要的天数（含截止日期当天）
+THROUGHPUT_SPAN = max(max(THROUGHPUT_WINDOWS), RECENT_DAYS + BASELINE_DAYS)
+
+
+def group_sum(keys, weights):
+    """
+    按 keys 分组对 weights 求和，keys 为一维数组或每行一组键的二维数组
+    返回 (去重后的键, 每组的和)，键按升序排列
+    """
+    if len(weights) == 0:
+        return keys[:0], np.zeros(0, dtype=np.int64)
+    if keys.ndim == 1:
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+    else:
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+    sums = np.bincount(inverse.reshape(-1), weights=weights, minlength=len(unique_keys))
+    return unique_keys, sums.astype(np.int64)
+
+
+def rolling_throughput(dir_column, day_column, counts, pending, as_of):
+    """
+    由发布事件的 (目录, 日期序数, 数量) 三列计算各目录截至 as_of（日期序数，含当天）的滚动吞吐量
+    先按目录、日期累加成每日数量矩阵，再沿日期求前缀和，任意窗口的发布数都是两个前缀和之差，
+    计算量与事件数和目录数成线性关系
+    返回每个目录一行: (各窗口发布数..., 预计清空天数, 是否骤降)，
+    预计清空天数按最近 RECENT_DAYS 天的日均发布数估算，期间没有发布时为 None
+    """
+    dir_count = len(pending)
+    span = THROUGHPUT_SPAN
+    start = as_of - span + 1
+    mask = (day_column >= start) & (day_column <= as_of)
+    daily = np.bincount(dir_column[mask].astype(np.int64) * span + (day_column[mask] - start),
+                        weights=counts[mask], minlength=dir_count * span).reshape(dir_count, span)
+    cumulative = np.zeros((dir_count, span + 1))
+    np.cumsum(daily, axis=1, out=cumulative[:, 1:])
+
+    def window_sum(days, end=span):
+        return cumulative[:, end] - cumulative[:, end - days]
+
+    windows = [window_sum(days) for days in THROUGHPUT_WINDOWS]
+    recent = window_sum(RECENT_DAYS)
+    baseline = window_sum(BASELINE_DAYS, span - RECENT_DAYS)
+    dropped = ((baseline >= DROP_MIN_BASELINE)
+               & (recent / RECENT_DAYS < DROP_RATIO * baseline / BASELINE_DAYS))
+
+    rows = []
+    for dir_code, backlog in enumerate(pending):
+        if backlog == 0:
+            days_to_drain = 0.0
+        elif recent[dir_code] > 0:
+            days_to_drain = round(float(backlog / (recent[dir_code] / RECENT_DAYS)), 1)
+        else:
+            days_to_drain = None
+        rows.append(tuple(int(window[dir_code]) for window in windows)
+                    + (days_to_drain, bool(dropped[dir_code])))
+    return rows
+
+
+class ReleaseTable:
+    """
+    整次运行的发布事件列式表
+    每一行是同一目录下 (日期目录, 发布日期, 小时) 都相同的一组发布记录，count 列为记录条数；
+    平台和语言组合为分类编码，日期为整数序数(date.toordinal())，缺失的日期为 0，缺失的小时为 -100
+    directories 保存每个目录的平台、语言组合编码和待发布视频数，dir 列是它的下标
+    """
+
+    def __init__(self, platforms, lang_pairs, directories, columns):
+        self.platforms = platforms
+        self.lang_pairs = lang_pairs
+        self.directories = directories
+        self.dir = columns["dir"]
+        self.platform = columns["platform"]
+        self.lang_pair = columns["lang_pair"]
+        self.date_dir = columns["date_dir"]
+        self.release_date = columns["release_date"]
+        self.hour = columns["hour"]
+        self.count = columns["count"]
+
+    @classmethod
+    def from_all_data(cls, all_data):
+        """
+        由 {平台: {语言组合: 统计}} 构建列式表，行数为各目录不同发布分布键的数量之和
+        """
+        platforms = list(all_data)
+        lang_pairs = []
+        lang_codes = {}
+        directories = []
+        dirs, keys, counts = [], [], []
+
+        for platform_code, platform in enumerate(platforms):
+            for lang_pair, stats in all_data[platform].items():
+                if lang_pair not in lang_codes:
+                    lang_codes[lang_pair] = len(lang_pairs)
+                    lang_pairs.append(lang_pair)
+                dir_code = len(directories)
+                directories.append((platform_code, lang_codes[lang_pair], stats["未发布数"]))
+
+                # 发布分布的键已经是 (日期序数, 日期序数, 小时) 整数，直接整块转换为数组
+                distribution = stats["发布分布"]
+                dirs.extend([dir_code] * len(distribution))
+                keys.extend(distribution.keys())
+                counts.extend(distribution.values())
+
+        key_columns = np.array(keys, dtype=np.int32).reshape(-1, 3)
+        dir_column = np.array(dirs, dtype=np.int32)
+        dir_info = np.array([d[:2] for d in directories], dtype=np.int16).reshape(-1, 2)
+        columns = {
+            "dir": dir_column,
+            "platform": dir_info[dir_column, 0],
+            "lang_pair": dir_info[dir_column, 1],
+            "date_dir": key_columns[:, 0],
+            "release_date": key_columns[:, 1],
+            "hour": key_columns[:, 2].astype(np.int16),
+            "count": np.array(counts, dtype=np.int64),
+        }
+        return cls(platforms, lang_pairs, directories, columns)
+
+    def summary_rows(self):
+        """
+        每个目录一行: (平台, 语言组合, 总视频数, 已发布数, 未发布数, 发布率)
+        已发布数由 count 列按目录分组求和得到
+        """
+        released = np.bincount(self.dir, weights=self.count, minlength=len(self.directories))
+        rows = []
+        for dir_code, (platform_code, lang_code, pending) in enumerate(self.directories):
+            released_count = int(released[dir_code])
+            total_videos = released_count + pending
+            rows.append((
+                self.platforms[platform_code],
+                self.lang_pairs[lang_code],
+                total_videos,
+                released_count,
+                pending,
+                round(released_count / total_videos * 100, 2) if total_videos > 0 else 0,
+            ))
+        return rows
+
+    def throughput_rows(self, as_of):
+        """
+        每个目录一行: (平台, 语言组合, 未发布数, 1/7/30 天发布数, 预计清空天数, 是否骤降)
+        按日期目录统计，as_of 为截止日期（date）
+        """
+        pending = [pending for _, _, pending in self.directories]
+        mask = self.date_dir != MISSING_DATE
+        throughput = rolling_throughput(self.dir[mask], self.date_dir[mask], self.count[mask],
+                                        pending, as_of.toordinal())
+        return [(self.platforms[platform_code], self.lang_pairs[lang_code], backlog) + row
+                for (platform_code, lang_code, backlog), row in zip(self.directories, throughput)]
+
+    def daily_stats(self):
+        """
+        按日期目录统计每日发布数量，返回 [(日期, 数量)]
+        """
+        mask = self.date_dir != MISSING_DATE
+        days, sums = group_sum(self.date_dir[mask], self.count[mask])
+        return [(date.fromordinal(int(d)), int(c)) for d, c in zip(days, sums)]
+
+    def hourly_stats(self):
+        """
+        按发布时间戳中的小时统计发布数量，返回 [(小时, 数量)]
+        """
+        mask = self.hour != MISSING_HOUR
+        hours, sums = group_sum(self.hour[mask], self.count[mask])
+        return [(int(h), int(c)) for h, c in zip(hours, sums)]
+
+    def date_hour_stats(self):
+        """
+        按发布时间戳中的日期和小时统计发布数量，返回 [((日期, 小时), 数量)]
+        """
+        mask = (self.release_date != MISSING_DATE) & (self.hour != MISSING_HOUR)
+        keys = np.column_stack([self.release_date[mask], self.hour[mask]])
+        keys, sums = group_sum(keys, self.count[mask])
+        return [((date.fromordinal(int(d)), int(h)), int(c)) for (d, h), c in zip(keys, sums)]
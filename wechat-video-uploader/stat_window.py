@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+# stat_window.py
+# publish-stat.py --since/--until 的按时间范围统计
+# archiveVideo 按发布时间顺序追加记录，所以时间范围内的记录集中在文件末尾附近。
+# 每个发布记录文件对应一个偏移索引（放在统计缓存目录中），把文件按约 64KB 分段，
+# 记录每段的字节偏移和段内时间戳的最大值、最小值。查询时对 "截至各段的最大时间戳" 二分查找起点，
+# 对 "各段之后的最小时间戳" 二分查找终点，只读取中间的字节。
+# 两者对乱序的记录同样成立（乱序只会让读取范围变大），没有时间戳的旧记录不影响查找，也不计入结果。
+# 偏移索引和 stat_cache.py 一样按文件标识、字节偏移和首尾摘要增量更新，文件被重写时重建。
+
+import os
+import json
+import re
+import tempfile
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from ledger_common import (
+    RELEASED_CSV, new_summary, add_record, merge_summary, parse_release_line, load_segment_manifest, ledger_segments
+)
+from stat_cache import DEFAULT_CACHE_DIR, cache_file_for, fingerprint
+
+# 偏移索引格式版本，格式变化时递增，旧索引自动重建
+WINDOW_INDEX_VERSION = 1
+
+# 每段的大致字节数
+SEGMENT_BYTES = 64 * 1024
+
+# 时间戳以 YYYYMMDDhhmmss 整数比较，没有时间戳的段用这两个值表示
+NO_TIMESTAMP_MAX = 0
+NO_TIMESTAMP_MIN = 10 ** 14
+
+TIME_BOUND_FORMATS = ["%Y%m%d%H%M%S", "%Y%m%d%H%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M",
+                      "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M"]
+DATE_BOUND_FORMATS = ["%Y%m%d", "%Y-%m-%d"]
+RELATIVE_DAYS_PATTERN = re.compile(r"(\d+)d")
+
+
+def parse_time_bound(text, end=False, now=None):
+    """
+    把 --since/--until 的参数转换为 YYYYMMDDhhmmss 整数
+    支持日期（20250302、2025-03-02）、日期时间（20250302121530、2025-03-02 12:15 等）、
+    today、yesterday 和 Nd（N 天前）；只有日期时 end 为真取当天最后一秒，否则取当天零点
+    无法识别时抛出 ValueError
+    """
+    now = now or datetime.now()
+    text = text.strip()
+    day = None
+    if text == "today":
+        day = now.date()
+    elif text == "yesterday":
+        day = now.date() - timedelta(days=1)
+    elif RELATIVE_DAYS_PATTERN.fullmatch(text):
+        day = now.date() - timedelta(days=int(text[:-1]))
+    else:
+        for fmt in DATE_BOUND_FORMATS:
+            try:
+                day = datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                pass
+
+    if day is not None:
+        moment = datetime.combine(day, datetime.max.time() if end else datetime.min.time())
+    else:
+        for fmt in TIME_BOUND_FORMATS:
+            try:
+                moment = datetime.strptime(text, fmt)
+                break
+            except ValueError:
+                pass
+        else:
+            raise ValueError(f"无法识别的时间: {text}")
+    return int(moment.strftime("%Y%m%d%H%M%S"))
+
+
+def timestamp_value(timestamp):
+    """
+    把记录中的 14 位时间戳转换为整数，不是 14 位数字时返回 None
+    """
+    if timestamp is not None and timestamp.isascii() and timestamp.isdigit():
+        return int(timestamp)
+    return None
+
+
+def extend_segments(f, segments, offset):
+    """
+    从 offset 开始读取完整的行，更新分段列表 [[起始偏移, 段内最大时间戳, 段内最小时间戳]]
+    最后一段不足 SEGMENT_BYTES 时继续填充，返回最后一个完整行之后的字节偏移
+    """
+    if not segments:
+        segments.append([offset, NO_TIMESTAMP_MAX, NO_TIMESTAMP_MIN])
+    segment = segments[-1]
+    f.seek(offset)
+    for raw in f:
+        if not raw.endswith(b'\n'):
+            break
+        if offset - segment[0] >= SEGMENT_BYTES:
+            segment = [offset, NO_TIMESTAMP_MAX, NO_TIMESTAMP_MIN]
+            segments.append(segment)
+        offset += len(raw)
+        record = parse_release_line(raw.decode('utf-8', errors='replace'))
+        value = timestamp_value(record.timestamp) if record is not None else None
+        if value is not None:
+            if value > segment[1]:
+                segment[1] = value
+            if value < segment[2]:
+                segment[2] = value
+    return offset
+
+
+def window_index_file(csv_path, cache_dir):
+    """
+    偏移索引文件和统计缓存放在同一目录，用 .window.json 后缀区分
+    """
+    return cache_file_for(csv_path, cache_dir)[:-len(".json")] + ".window.json"
+
+
+def load_window_index(index_file):
+    """
+    读取偏移索引，不存在、损坏或版本不符时返回 None
+    """
+    try:
+        with open(index_file, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(index, dict) or index.get("version") != WINDOW_INDEX_VERSION:
+        return None
+    return index
+
+
+def save_window_index(index_file, index):
+    """
+    先写临时文件再重命名，避免并发运行时读到写了一半的索引
+    """
+    try:
+        index_dir = os.path.dirname(index_file)
+        os.makedirs(index_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(tmp_path, index_file)
+    except OSError as e:
+        print(f"写入偏移索引时出错: {e}")
+
+
+def update_window_index(f, st, csv_path, cache_dir):
+    """
+    增量更新已打开的发布记录文件的偏移索引，返回 (分段列表, 索引覆盖到的字节偏移)
+    文件没有变化时只读取首尾摘要，只追加了记录时只读取新增部分
+    """
+    index_file = window_index_file(csv_path, cache_dir)
+    index = load_window_index(index_file)
+
+    segments = []
+    offset = 0
+    if index and index["inode"] == st.st_ino and index["offset"] <= st.st_size:
+        if (index["size"] == st.st_size and index["mtime_ns"] == st.st_mtime_ns
+                and index["offset"] == st.st_size):
+            return index["segments"], index["offset"]
+        if fingerprint(f, index["offset"]) == (index["head"], index["tail"]):
+            segments = index["segments"]
+            offset = index["offset"]
+
+    offset = extend_segments(f, segments, offset)
+    head, tail = fingerprint(f, offset)
+    save_window_index(index_file, {
+        "version": WINDOW_INDEX_VERSION,
+        "path": os.path.abspath(csv_path),
+        "inode": st.st_ino,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "offset": offset,
+        "head": head,
+        "tail": tail,
+        "segments": segments,
+    })
+    return segments, offset
+
+
+def window_range(segments, offset, since, until):
+    """
+    根据分段计算需要读取的字节范围 (起点, 终点)
+    起点: 第一个 "截至该段的最大时间戳" 不小于 since 的段，之前的记录都早于 since；
+    终点: 第一个 "该段及之后的最小时间戳" 大于 until 的段，之后的记录都晚于 until。
+    两个序列都是单调的，可以二分查找
+    """
+    if not segments:
+        return offset, offset
+    prefix_max = list(accumulate((segment[1] for segment in segments), max))
+    start = bisect_left(prefix_max, since)
+    if start == len(segments):
+        return offset, offset
+
+    suffix_min = list(accumulate((segment[2] for segment in reversed(segments)), min))[::-1]
+    end = max(bisect_right(suffix_min, until), start + 1)
+    return segments[start][0], segments[end][0] if end < len(segments) else offset
+
+
+def scan_window(f, summary, since, until, start=0, end=None):
+    """
+    从字节偏移 start 读到 end（None 表示文件末尾），把时间戳在 [since, until] 内的记录累加到 summary
+    末尾没有换行结束的行同 scan_ledger 不计入
+    """
+    f.seek(start)
+    position = start
+    for raw in f:
+        if (end is not None and position >= end) or not raw.endswith(b'\n'):
+            break
+        position += len(raw)
+        record = parse_release_line(raw.decode('utf-8', errors='replace'))
+        if record is None:
+            continue
+        value = timestamp_value(record.timestamp)
+        if value is not None and since <= value <= until:
+            add_record(summary, record)
+
+
+def summarize_window(csv_path, since=None, until=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    统计发布时间戳在 [since, until] 内的发布记录，since、until 为 YYYYMMDDhhmmss 整数，None 表示不限
+    cache_dir 为空时不使用偏移索引，全量读取文件；文件不存在时返回空统计
+    """
+    since = NO_TIMESTAMP_MAX if since is None else since
+    until = NO_TIMESTAMP_MIN - 1 if until is None else until
+    summary = new_summary()
+    try:
+        with open(csv_path, 'rb') as f:
+            if cache_dir:
+                segments, offset = update_window_index(f, os.fstat(f.fileno()), csv_path, cache_dir)
+                start, end = window_range(segments, offset, since, until)
+                scan_window(f, summary, since, until, start, end)
+            else:
+                scan_window(f, summary, since, until)
+    except FileNotFoundError:
+        pass
+    return summary
+
+
+def window_ledgers(fixed_dir, manifest, since=None, until=None):
+    """
+    目录中需要按 [since, until] 读取的记录文件: 与查询范围相交的分段和 0-released.csv
+    分段清单记录了每个分段的时间戳范围，不相交的分段（包括没有时间戳的分段）不读取
+    """
+    lower = NO_TIMESTAMP_MAX if since is None else since
+    upper = NO_TIMESTAMP_MIN - 1 if until is None else until
+    paths = []
+    if manifest is not None:
+        for segment, csv_path in zip(manifest["segments"], ledger_segments(fixed_dir, manifest)):
+            if segment["min_ts"] is None or segment["max_ts"] < lower or segment["min_ts"] > upper:
+                continue
+            paths.append(csv_path)
+    paths.append(os.path.join(fixed_dir, RELEASED_CSV))
+    return paths
+
+
+def summarize_window_dir(fixed_dir, since=None, until=None, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    统计一个目录（含分段文件）中发布时间戳在 [since, until] 内的记录
+    """
+    summary = new_summary()
+    for csv_path in window_ledgers(fixed_dir, load_segment_manifest(fixed_dir), since, until):
+        merge_summary(summary, summarize_window(csv_path, since, until, cache_dir))
+    return summary
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+# compact-ledger.py 的记录规范化测试: 无法原样还原的行必须原样保留
+# python -m pytest tests/test_compact_ledger.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import importlib.util
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+spec = importlib.util.spec_from_file_location("compact_ledger", os.path.join(SCRIPT_DIR, "compact-ledger.py"))
+compact_ledger = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(compact_ledger)
+
+# 文件名带逗号、时间戳不足 14 位、有多余列
+IRREGULAR_LINES = [
+    "20250101/a,b.mp4,20250101101010",
+    "20250102/c.mp4,2025010210",
+    "20250103/d.mp4,20250103101010,extra",
+]
+
+
+class NormalizeRecordsTest(unittest.TestCase):
+
+    def test_irregular_lines_kept_verbatim(self):
+        lines = ["20250104/e.mp4,20250104101010", "", "20250104/e.mp4"] + IRREGULAR_LINES
+        records, verbatim, blank, duplicates = compact_ledger.normalize_records(lines)
+        self.assertEqual(records, {"20250104/e.mp4": "20250104101010"})
+        self.assertEqual(verbatim, IRREGULAR_LINES)
+        self.assertEqual((blank, duplicates), (1, 1))
+
+    def test_layout_keeps_verbatim_in_active_file(self):
+        records, verbatim, _, _ = compact_ledger.normalize_records(IRREGULAR_LINES + ["20250104/e.mp4,20250104101010"])
+        segments, active = compact_ledger.layout_records(records, verbatim, "202502")
+        self.assertEqual(active, IRREGULAR_LINES)
+        self.assertEqual(segments, {"2025-01": ["20250104/e.mp4,20250104101010"]})
+
+
+class CompactDirectoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.video_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.video_dir)
+
+    def test_compaction_round_trip(self):
+        csv_file = os.path.join(self.video_dir, compact_ledger.RELEASED_CSV)
+        with open(csv_file, 'w', encoding='utf-8') as f:
+            f.write("20250105/f.mp4,20250105101010\n" + "".join(line + "\n" for line in IRREGULAR_LINES))
+
+        result = compact_ledger.compact_directory(self.video_dir)
+        self.assertIsNone(result["错误"])
+        self.assertEqual(result["原样保留"], len(IRREGULAR_LINES))
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, IRREGULAR_LINES + ["20250105/f.mp4,20250105101010"])
+
+        # 再次整理结果不变
+        compact_ledger.compact_directory(self.video_dir)
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
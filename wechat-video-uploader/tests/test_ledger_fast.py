@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+# ledger_fast.py 的向量化解析测试: 不规则的记录文件也必须与 ledger_common.scan_ledger 的结果完全一致
+# python -m pytest tests/test_ledger_fast.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+import ledger_fast
+from ledger_common import new_summary, scan_ledger, summarize_ledger
+
+# 标准行、旧格式行、CRLF、空行、跳过占位、逗号两侧有空格、无效日期、不完整时间戳、文件名带逗号或中文
+MESSY_LINES = [
+    b"20250101/a.mp4,20250101101010\n",
+    b"20250101/b.mp4\n",
+    b"20250102/c.mp4,20250102231500\r\n",
+    b"20250102/d.mp4\r\n",
+    b"\n",
+    b"\r\n",
+    b"   \n",
+    b"30000000/\n",
+    b"30000000/skip.mp4,20250103080000\n",
+    b"20250103/e.mp4 , 20250103090000\n",
+    b"20250103/f.mp4, 20250103100000 \r\n",
+    b" 20250104/g.mp4,20250104110000\n",
+    b"20251340/h.mp4,20250104120000\n",
+    b"20250105/i.mp4,20251399120000\n",
+    b"20250105/j.mp4,2025010512\n",
+    b"20250105/k.mp4,20250105129900\n",
+    b"20250106/l,m.mp4,20250106130000\n",
+    "20250106/视频.mp4,20250106140000\n".encode('utf-8'),
+    b"no-date.mp4,20250107150000\n",
+    b"20250107/n.mp4,20250107160000,extra\n",
+]
+
+
+def summarize_both(path):
+    """
+    分别用逐行解析和向量化解析统计同一个文件，返回 ((结果, 偏移), (结果, 偏移))
+    """
+    with open(path, 'rb') as f:
+        expected = new_summary()
+        expected_offset = scan_ledger(f, expected)
+    with open(path, 'rb') as f:
+        actual = new_summary()
+        actual_offset = ledger_fast.scan_ledger_fast(f, actual)
+    return (expected, expected_offset), (actual, actual_offset)
+
+
+class ScanLedgerFastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp_dir, "0-released.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, data):
+        with open(self.path, 'wb') as f:
+            f.write(data)
+
+    def messy_data(self):
+        # 重复到超过 MIN_VECTOR_BYTES，确保走向量化路径
+        block = b"".join(MESSY_LINES)
+        return block * (ledger_fast.MIN_VECTOR_BYTES // len(block) + 2)
+
+    def test_messy_lines_match_scan_ledger(self):
+        self.write(self.messy_data())
+        expected, actual = summarize_both(self.path)
+        self.assertEqual(actual, expected)
+        self.assertGreater(expected[0]["已发布数"], 0)
+
+    def test_missing_final_newline_left_for_next_read(self):
+        data = self.messy_data()
+        self.write(data + b"20250108/partial.mp4,2025010817")
+        expected, actual = summarize_both(self.path)
+        self.assertEqual(actual, expected)
+        self.assertEqual(actual[1], len(data))
+
+    def test_chunk_boundaries_match_scan_ledger(self):
+        # 块大小不是行长度的整数倍，块边界落在行中间
+        self.write(self.messy_data())
+        with mock.patch.object(ledger_fast, "CHUNK_BYTES", 4099):
+            expected, actual = summarize_both(self.path)
+        self.assertEqual(actual, expected)
+
+    def test_offset_resumes_like_scan_ledger(self):
+        data = self.messy_data()
+        self.write(data + data)
+        with open(self.path, 'rb') as f:
+            expected = new_summary()
+            expected_offset = scan_ledger(f, expected, len(data))
+            actual = new_summary()
+            actual_offset = ledger_fast.scan_ledger_fast(f, actual, len(data))
+        self.assertEqual((actual, actual_offset), (expected, expected_offset))
+
+    def test_summarize_ledger_fast_matches_summarize_ledger(self):
+        self.write(self.messy_data() + b"20250108/partial.mp4")
+        self.assertEqual(ledger_fast.summarize_ledger_fast(self.path), summarize_ledger(self.path))
+        missing = os.path.join(self.tmp_dir, "missing.csv")
+        self.assertEqual(ledger_fast.summarize_ledger_fast(missing), summarize_ledger(missing))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# stat_cache.py 的增量统计缓存测试: 追加时只解析新增部分，重写（含同样大小的截断重写）时全量重建
+# python -m pytest tests/test_stat_cache.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+import stat_cache
+from ledger_common import summarize_ledger
+
+LINES = [
+    "20250101/a.mp4,20250101101010\n",
+    "20250102/b.mp4,20250102111111\n",
+    "20250103/c.mp4\n",
+]
+
+
+class LoadLedgerSummaryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.path = os.path.join(self.tmp_dir, "0-released.csv")
+        self.write(LINES)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write(self, lines, mode='w'):
+        with open(self.path, mode, encoding='utf-8') as f:
+            f.writelines(lines)
+        # 文件系统的时间精度可能较粗，每次写入后把修改时间往后推，模拟真实的先后写入
+        st = os.stat(self.path)
+        mtime_ns = getattr(self, "mtime_ns", st.st_mtime_ns) + 1000000000
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+        self.mtime_ns = mtime_ns
+
+    def load(self):
+        """
+        读取统计结果，返回 (结果, 本次解析的起始偏移列表)，直接使用缓存时列表为空
+        """
+        offsets = []
+        scan = stat_cache.scan_ledger_fast
+
+        def recording_scan(f, summary, offset=0):
+            offsets.append(offset)
+            return scan(f, summary, offset)
+
+        with mock.patch.object(stat_cache, "scan_ledger_fast", recording_scan):
+            summary = stat_cache.load_ledger_summary(self.path, self.cache_dir)
+        return summary, offsets
+
+    def test_unchanged_file_uses_cache(self):
+        self.load()
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [])
+        self.assertEqual(summary, summarize_ledger(self.path))
+
+    def test_append_parses_only_new_lines(self):
+        self.load()
+        size = os.path.getsize(self.path)
+        self.write(["20250104/d.mp4,20250104121212\n"], mode='a')
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [size])
+        self.assertEqual(summary, summarize_ledger(self.path))
+
+    def test_partial_line_counted_after_completion(self):
+        self.write(["20250104/d.mp4,2025010412"], mode='a')
+        summary, _ = self.load()
+        self.assertEqual(summary["已发布数"], len(LINES))
+        self.write(["1212\n"], mode='a')
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [sum(len(line) for line in LINES)])
+        self.assertEqual(summary, summarize_ledger(self.path))
+        self.assertEqual(summary["已发布数"], len(LINES) + 1)
+
+    def test_rewrite_rebuilds(self):
+        self.load()
+        # 像 archiveVideo 一样写临时文件后重命名替换
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(["20250105/e.mp4,20250105131313\n"] + LINES)
+        os.replace(tmp_path, self.path)
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [0])
+        self.assertEqual(summary, summarize_ledger(self.path))
+
+    def test_same_size_truncate_and_rewrite_rebuilds(self):
+        self.load()
+        inode = os.stat(self.path).st_ino
+        size = os.path.getsize(self.path)
+        # 同一个文件截断后写入长度相同、内容不同的记录
+        rewritten = [line.replace("2025", "2024") for line in LINES]
+        self.write(rewritten)
+        self.assertEqual((os.stat(self.path).st_ino, os.path.getsize(self.path)), (inode, size))
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [0])
+        self.assertEqual(summary, summarize_ledger(self.path))
+
+    def test_shorter_rewrite_rebuilds(self):
+        self.load()
+        self.write(LINES[:1])
+        summary, offsets = self.load()
+        self.assertEqual(offsets, [0])
+        self.assertEqual(summary["已发布数"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
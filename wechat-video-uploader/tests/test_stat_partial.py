@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# stat_partial.py 的多机合并测试: 先写部分统计再 --merge，结果必须与直接统计完全一致
+# python -m pytest tests/test_stat_partial.py
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import subprocess
+import importlib.util
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+spec = importlib.util.spec_from_file_location("publish_stat", os.path.join(SCRIPT_DIR, "publish-stat.py"))
+publish_stat = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(publish_stat)
+
+from stat_partial import build_partial, save_partial, merge_partials
+from video_tree import discover_directories
+
+# (平台, 语言组合, 发布记录, 待发布视频)，包含旧格式记录、跳过占位和没写完的末尾行
+TREE = [
+    ("weixin", "en-zh",
+     ["20250101/a.mp4,20250201101010\n", "20250102/b.mp4\n", "30000000/\n",
+      "20250103/c.mp4,20250215231500\r\n", "20250104/d.mp4,20250301080000\n", "20250105/e.mp4,2025030109"],
+     ["f.mp4", "g.mp4"]),
+    ("weixin", "en-ja", ["20250110/h.mp4,20250210120000\n"], []),
+    ("douyin", "en-zh", [], ["i.mp4", "j.mp4", "k.mp4"]),
+]
+
+
+def write_tree(base_dir, tree):
+    """
+    按 TREE 的格式在 base_dir 下创建平台和语言组合目录
+    """
+    for platform, lang_pair, lines, pending in tree:
+        fixed_dir = os.path.join(base_dir, platform, f"fixed-{lang_pair}")
+        os.makedirs(fixed_dir, exist_ok=True)
+        if lines:
+            with open(os.path.join(fixed_dir, "0-released.csv"), 'a', encoding='utf-8', newline='') as f:
+                f.writelines(lines)
+        for name in pending:
+            open(os.path.join(fixed_dir, name), 'wb').close()
+
+
+class MergePartialsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.base_dir = os.path.join(self.tmp_dir, "videos")
+        write_tree(self.base_dir, TREE)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def collect(self, base_dir, window=None):
+        return publish_stat.collect_all_data(discover_directories(base_dir), None, 1, None, window)
+
+    def test_round_trip_matches_collect(self):
+        for window in (None, (20250210000000, None)):
+            all_data = self.collect(self.base_dir, window)
+            for file_name in ("partial.json", "partial.json.gz"):
+                with self.subTest(window=window, file_name=file_name):
+                    path = os.path.join(self.tmp_dir, file_name)
+                    save_partial(path, build_partial(all_data, self.base_dir, window))
+                    merged, sources = merge_partials([path])
+                    self.assertEqual(merged, all_data)
+                    self.assertEqual(sources[0]["window"], list(window) if window else None)
+
+    def test_machines_merge_like_one_tree(self):
+        # 第二台机器上有相同的目录，记录和待发布视频不同
+        other_tree = [
+            ("weixin", "en-zh", ["20250106/l.mp4,20250302090000\n"], ["m.mp4"]),
+            ("rednote", "en-zh", ["20250107/n.mp4,20250303100000\n"], ["o.mp4"]),
+        ]
+        other_dir = os.path.join(self.tmp_dir, "other")
+        write_tree(other_dir, other_tree)
+        paths = []
+        for name, base_dir in (("a.json", self.base_dir), ("b.json.gz", other_dir)):
+            partial = build_partial(self.collect(base_dir), base_dir)
+            partial["machine"] = name
+            paths.append(os.path.join(self.tmp_dir, name))
+            save_partial(paths[-1], partial)
+
+        # 两台机器的内容放在同一棵目录树中直接统计；第一台末尾没写完的行在各自统计时不计入，这里不写入
+        combined_dir = os.path.join(self.tmp_dir, "combined")
+        combined_tree = [(platform, lang_pair, [line for line in lines if line.endswith('\n')], pending)
+                         for platform, lang_pair, lines, pending in TREE]
+        write_tree(combined_dir, combined_tree + other_tree)
+        merged, sources = merge_partials(paths)
+        self.assertEqual(len(sources), 2)
+        self.assertEqual(merged, self.collect(combined_dir))
+
+        merged, _ = merge_partials(paths, "weixin")
+        self.assertEqual(merged, {"weixin": self.collect(combined_dir)["weixin"]})
+
+    def test_cli_merge_output_matches_full_run(self):
+        script = os.path.join(SCRIPT_DIR, "publish-stat.py")
+        partial_path = os.path.join(self.tmp_dir, "partial.json.gz")
+        for options in ([], ["--since", "20250210"]):
+            with self.subTest(options=options):
+                common = ["--as-of", "20250310", "--throughput"]
+                full = subprocess.run([sys.executable, script, "--base-dir", self.base_dir, "--no-cache",
+                                       "--partial-output", partial_path] + common + options,
+                                      capture_output=True, text=True, check=True, cwd=self.tmp_dir)
+                merged = subprocess.run([sys.executable, script, "--merge", partial_path] + common,
+                                        capture_output=True, text=True, check=True, cwd=self.tmp_dir)
+                # 只有第一行不同: 保存部分统计 / 合并的文件
+                self.assertEqual(merged.stdout.splitlines()[1:], full.stdout.splitlines()[1:])
+                self.assertIn("已发布", full.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+# stat_window.py 的按时间范围统计测试: 偏移索引只是少读字节，结果必须与逐行过滤完全一致，
+# 包括没有时间戳的旧记录和乱序的记录
+# python -m pytest tests/test_stat_window.py
+
+import os
+import sys
+import json
+import random
+import shutil
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+import stat_window
+from ledger_common import (
+    RELEASED_CSV, SEGMENT_DIR, SEGMENT_MANIFEST, SEGMENT_MANIFEST_VERSION, new_summary, add_record,
+    iter_ledger
+)
+
+START = datetime(2025, 1, 1)
+
+
+def ledger_lines(count, seed, start=START):
+    """
+    生成大致按时间顺序追加的记录: 夹杂没有时间戳的旧记录、空行、时间戳不完整的行和往前乱序的记录
+    """
+    rng = random.Random(seed)
+    lines = []
+    moment = start
+    for i in range(count):
+        moment += timedelta(minutes=rng.randint(1, 90))
+        kind = rng.random()
+        name = f"{moment:%Y%m%d}/v{seed}_{i}.mp4"
+        if kind < 0.1:
+            lines.append(f"{name}\n")
+        elif kind < 0.12:
+            lines.append("\n")
+        elif kind < 0.14:
+            lines.append(f"{name},{moment:%Y%m%d%H}\n")
+        elif kind < 0.2:
+            # 乱序: 时间戳比前面的记录早几天
+            lines.append(f"{name},{moment - timedelta(days=rng.randint(1, 20)):%Y%m%d%H%M%S}\n")
+        else:
+            lines.append(f"{name},{moment:%Y%m%d%H%M%S}\n")
+    return lines
+
+
+def brute_force(paths, since, until):
+    """
+    逐条读取所有记录，只保留时间戳在 [since, until] 内的记录
+    """
+    since = stat_window.NO_TIMESTAMP_MAX if since is None else since
+    until = stat_window.NO_TIMESTAMP_MIN - 1 if until is None else until
+    summary = new_summary()
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        for record in iter_ledger(path):
+            value = stat_window.timestamp_value(record.timestamp)
+            if value is not None and since <= value <= until:
+                add_record(summary, record)
+    return summary
+
+
+# 不限、只有下界、只有上界、中间一段、一个时刻、早于所有记录、晚于所有记录
+WINDOWS = [
+    (None, None),
+    (20250301000000, None),
+    (None, 20250210235959),
+    (20250201000000, 20250315235959),
+    (20250220120000, 20250220120000),
+    (20200101000000, 20201231235959),
+    (20300101000000, None),
+]
+
+
+class SummarizeWindowTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.path = os.path.join(self.tmp_dir, RELEASED_CSV)
+        # 足够多的记录，使偏移索引分成多段
+        self.lines = ledger_lines(6000, seed=1)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(self.lines)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def assert_windows_match(self):
+        for since, until in WINDOWS:
+            expected = brute_force([self.path], since, until)
+            for cache_dir in (None, self.cache_dir):
+                with self.subTest(since=since, until=until, cache_dir=cache_dir):
+                    self.assertEqual(stat_window.summarize_window(self.path, since, until, cache_dir), expected)
+
+    def test_index_has_several_segments(self):
+        with open(self.path, 'rb') as f:
+            segments, _ = stat_window.update_window_index(f, os.fstat(f.fileno()), self.path, self.cache_dir)
+        self.assertGreater(len(segments), 3)
+
+    def test_windows_match_brute_force(self):
+        self.assert_windows_match()
+
+    def test_windows_match_after_append(self):
+        self.assert_windows_match()
+        # 追加更晚的记录和一条早于所有记录的乱序记录，末尾再加一行没写完的记录
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.writelines(ledger_lines(800, seed=2, start=datetime(2025, 4, 1)))
+            f.write("20250401/late.mp4,20250102030405\n")
+            f.write("20250401/partial.mp4,2025040")
+        self.assert_windows_match()
+
+    def test_windows_match_after_rewrite(self):
+        self.assert_windows_match()
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.writelines(ledger_lines(3000, seed=3, start=datetime(2025, 2, 15)))
+        self.assert_windows_match()
+
+
+class SummarizeWindowDirTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.tmp_dir, "cache")
+        segment_dir = os.path.join(self.tmp_dir, SEGMENT_DIR)
+        os.makedirs(segment_dir)
+        # 一个没有时间戳的分段、一个 1 月的分段，2 月之后的记录仍在 0-released.csv 中
+        legacy = [f"2024120{i}/old{i}.mp4\n" for i in range(1, 6)]
+        january = [line for line in ledger_lines(400, seed=4) if line.rstrip().rpartition(',')[2][:6] == "202501"
+                   and len(line.rstrip().rpartition(',')[2]) == 14]
+        stamps = [int(line.rstrip()[-14:]) for line in january]
+        segments = [("legacy.csv", legacy, None, None),
+                    ("2025-01.csv", january, min(stamps), max(stamps))]
+        manifest = {"version": SEGMENT_MANIFEST_VERSION, "segments": []}
+        for file_name, lines, min_ts, max_ts in segments:
+            with open(os.path.join(segment_dir, file_name), 'w', encoding='utf-8') as f:
+                f.writelines(lines)
+            manifest["segments"].append({"file": file_name, "rows": len(lines), "min_ts": min_ts, "max_ts": max_ts})
+        with open(os.path.join(segment_dir, SEGMENT_MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        with open(os.path.join(self.tmp_dir, RELEASED_CSV), 'w', encoding='utf-8') as f:
+            f.writelines(ledger_lines(2000, seed=5, start=datetime(2025, 2, 1)))
+        self.paths = [os.path.join(segment_dir, file_name) for file_name, _, _, _ in segments]
+        self.paths.append(os.path.join(self.tmp_dir, RELEASED_CSV))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_windows_match_brute_force(self):
+        for since, until in WINDOWS:
+            expected = brute_force(self.paths, since, until)
+            for cache_dir in (None, self.cache_dir):
+                with self.subTest(since=since, until=until, cache_dir=cache_dir):
+                    self.assertEqual(stat_window.summarize_window_dir(self.tmp_dir, since, until, cache_dir),
+                                     expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
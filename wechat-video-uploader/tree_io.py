@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# tree_io.py
+# 视频目录的并发元数据读取，供 publish-stat.py 和 skip-upload.py 共用
+# BASE_DIR 在 SMB/NFS 挂载上时，每次 scandir、stat、open 都是一次网络往返，串行执行时总耗时是所有往返延迟之和。
+# 这里按目录分批: 每个目录先 scandir 一次，从目录项中同时得到待发布 mp4、是否有 0-released.csv 和分段目录，
+# 不再逐个 exists/isdir；再并发读取该目录的各个记录文件。所有目录的批次由 asyncio 同时发起，
+# 阻塞调用在固定大小的线程池中执行，线程数即同时进行的网络请求数上限。
+# 总耗时约为 请求数 / 线程数 × 往返延迟 + 数据量 / 带宽，线程数足够时由带宽决定。
+
+import os
+import time
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from ledger_common import RELEASED_CSV, SEGMENT_DIR, load_segment_manifest, ledger_segments
+
+# 默认同时进行的元数据和小文件请求数，本地磁盘上多开的线程只是空等，网络盘上可以再调大
+DEFAULT_IO_JOBS = 16
+
+# 一个语言组合目录的列表结果: 待发布 mp4 文件名（已排序）, 分段清单（没有时为 None）, 存在的记录文件路径
+DirectoryListing = namedtuple("DirectoryListing", ["pending", "manifest", "ledgers"])
+
+
+def list_directory(fixed_dir):
+    """
+    用一次 scandir 列出目录，只在有分段目录时再读取分段清单
+    待发布 mp4 的取法与 list_pending_videos 相同；目录不存在时返回空结果
+    """
+    pending = []
+    has_csv = has_segments = False
+    try:
+        with os.scandir(fixed_dir) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith('.mp4') and not name.startswith('.'):
+                    pending.append(name)
+                elif name == RELEASED_CSV:
+                    has_csv = True
+                elif name == SEGMENT_DIR:
+                    has_segments = True
+    except (FileNotFoundError, NotADirectoryError):
+        return DirectoryListing([], None, [])
+
+    manifest = load_segment_manifest(fixed_dir) if has_segments else None
+    ledgers = ledger_segments(fixed_dir, manifest) if manifest is not None else []
+    if has_csv:
+        ledgers.append(os.path.join(fixed_dir, RELEASED_CSV))
+    return DirectoryListing(sorted(pending), manifest, ledgers)
+
+
+def ledger_paths(fixed_dir, listing, select=None):
+    """
+    需要读取的记录文件: 默认为目录中存在的所有记录文件，
+    select(fixed_dir, manifest) 可以按分段清单另行挑选（如只读取与时间范围相交的分段）
+    """
+    return select(fixed_dir, listing.manifest) if select else listing.ledgers
+
+
+def read_directory(fixed_dir, read_ledger, select=None):
+    """
+    串行读取一个目录，返回 (列表结果, [每个记录文件的 read_ledger 结果], 耗时秒数)
+    """
+    start = time.perf_counter()
+    listing = list_directory(fixed_dir)
+    results = [read_ledger(path) for path in ledger_paths(fixed_dir, listing, select)]
+    return listing, results, time.perf_counter() - start
+
+
+async def read_directory_async(loop, executor, fixed_dir, read_ledger, select=None):
+    """
+    一个目录的批次: 列出目录后在线程池中同时读取它的所有记录文件，返回值同 read_directory
+    """
+    start = time.perf_counter()
+    listing = await loop.run_in_executor(executor, list_directory, fixed_dir)
+    results = await asyncio.gather(*(loop.run_in_executor(executor, read_ledger, path)
+                                     for path in ledger_paths(fixed_dir, listing, select)))
+    return listing, list(results), time.perf_counter() - start
+
+
+def read_directories(fixed_dirs, read_ledger, jobs=DEFAULT_IO_JOBS, select=None):
+    """
+    读取多个目录，返回与 fixed_dirs 顺序一致的 [(列表结果, [记录文件读取结果], 耗时秒数)]
+    read_ledger(path) 读取单个记录文件，在线程池中调用，需要线程安全
+    jobs 为同时进行的请求数上限，不大于 1 时逐个目录串行读取
+    """
+    if jobs <= 1:
+        return [read_directory(fixed_dir, read_ledger, select) for fixed_dir in fixed_dirs]
+
+    async def read_all():
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="tree-io") as executor:
+            return await asyncio.gather(*(read_directory_async(loop, executor, fixed_dir, read_ledger, select)
+                                          for fixed_dir in fixed_dirs))
+
+    return asyncio.run(read_all())
+
+
+def list_directories(fixed_dirs, jobs=DEFAULT_IO_JOBS):
+    """
+    并发列出多个目录，返回与 fixed_dirs 顺序一致的 DirectoryListing 列表
+    """
+    if jobs <= 1:
+        return [list_directory(fixed_dir) for fixed_dir in fixed_dirs]
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="tree-io") as executor:
+        return list(executor.map(list_directory, fixed_dirs))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# video_hash.py
+# 视频文件内容摘要及其持久缓存，供 skip-upload.py 按内容识别重新渲染或改名的重复视频
+# 摘要按块读取整个文件计算；缓存以 (设备号, inode) 为键，并记录文件大小和修改时间，
+# 三者都没变时直接使用缓存的摘要，每个文件只计算一次。
+# hashlib 计算大块数据时会释放 GIL，多个线程可以同时读取和计算不同的文件。
+
+import os
+import stat
+import sqlite3
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+# 默认摘要缓存文件
+DEFAULT_HASH_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "skip-upload", "video-hashes.sqlite3")
+
+# 每次读取的字节数
+HASH_CHUNK_BYTES = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (dev, ino)
+);
+"""
+
+
+def hash_file(path):
+    """
+    按块计算文件内容的 SHA-256 摘要
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stat_file(path):
+    """
+    返回文件的 stat 结果，文件不存在时返回 None；其他错误（无权限、I/O 错误等）打印后同样返回 None
+    """
+    try:
+        return os.stat(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    except OSError as e:
+        print(f"读取文件信息时出错，跳过: {path} ({e})")
+        return None
+
+
+def hash_unchanged(path, st):
+    """
+    计算文件摘要，计算前后文件大小或修改时间变化（可能正在写入）时返回 None，不写入缓存
+    """
+    try:
+        digest = hash_file(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    except OSError as e:
+        # 单个文件读取失败不影响其他文件，视为没有摘要
+        print(f"计算摘要时出错，跳过: {path} ({e})")
+        return None
+    after = stat_file(path)
+    if after is None or (after.st_size, after.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+        return None
+    return digest
+
+
+class HashCache:
+    """
+    SQLite 摘要缓存，只在创建它的线程中访问
+    """
+
+    def __init__(self, path=DEFAULT_HASH_CACHE):
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def lookup(self, st):
+        """
+        文件大小和修改时间与缓存一致时返回缓存的摘要，否则返回 None
+        """
+        row = self.conn.execute("SELECT size, mtime_ns, digest FROM hashes WHERE dev = ? AND ino = ?",
+                                (st.st_dev, st.st_ino)).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        return None
+
+    def store(self, st, digest):
+        """
+        写入（覆盖同一个文件的旧记录）文件的摘要
+        """
+        self.conn.execute("INSERT OR REPLACE INTO hashes (dev, ino, size, mtime_ns, digest) VALUES (?, ?, ?, ?, ?)",
+                          (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns, digest))
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+
+def file_hashes(paths, cache, jobs=4):
+    """
+    计算多个文件的内容摘要，返回 {路径: 摘要}
+    不存在、无法读取、不是普通文件（如名为 xxx.mp4 的目录）和空文件不在结果中；
+    缓存中没有的文件用 jobs 个线程并发计算，算完写入缓存
+    """
+    paths = list(dict.fromkeys(paths))
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        stats = list(executor.map(stat_file, paths))
+
+        hashes = {}
+        missing = []
+        for path, st in zip(paths, stats):
+            if st is None or not stat.S_ISREG(st.st_mode) or st.st_size == 0:
+                continue
+            digest = cache.lookup(st)
+            if digest is None:
+                missing.append((path, st))
+            else:
+                hashes[path] = digest
+
+        # 大文件排在前面，避免最后只剩一个线程在算最大的文件
+        missing.sort(key=lambda item: -item[1].st_size)
+        results = executor.map(lambda item: hash_unchanged(*item), missing)
+        for (path, st), digest in zip(missing, results):
+            if digest is not None:
+                cache.store(st, digest)
+                hashes[path] = digest
+    return hashes
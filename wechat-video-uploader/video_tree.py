@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# video_tree.py
+# 视频目录结构的公共函数，供 publish-stat.py 和 skip-upload.py 共用
+# 目录结构: 基础目录/<平台>/fixed-<语言组合>/ 下存放待发布的 mp4 文件和 0-released.csv
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# 平台列表，以磁盘上实际存在的平台目录为准，这里只决定输出顺序
+PLATFORMS = ["weixin", "weixin_188", "douyin", "kuaishou", "rednote", "youtube"]
+
+# 语言组合，同样只决定输出顺序
+LANGUAGE_PAIRS = ["en-ja", "en-zh", "ko-en", "zh-zh", "hk-en", "hk-hk"]
+
+# 语言组合目录前缀
+FIXED_DIR_PREFIX = "fixed-"
+
+
+def order_names(names, preferred):
+    """
+    名称排序: 预设列表中的名称按预设顺序排在前面，其余按名称排序
+    """
+    rank = {name: i for i, name in enumerate(preferred)}
+    return sorted(names, key=lambda name: (rank.get(name, len(rank)), name))
+
+
+def scan_fixed_dirs(platform_dir):
+    """
+    用 os.scandir 列出平台目录下所有 fixed-<语言组合> 子目录
+    返回 [(语言组合, 目录路径)]
+    """
+    try:
+        with os.scandir(platform_dir) as entries:
+            fixed_dirs = {
+                entry.name[len(FIXED_DIR_PREFIX):]: entry.path
+                for entry in entries
+                if entry.name.startswith(FIXED_DIR_PREFIX) and entry.is_dir()
+            }
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+    return [(lang_pair, fixed_dirs[lang_pair]) for lang_pair in order_names(fixed_dirs, LANGUAGE_PAIRS)]
+
+
+def discover_directories(base_dir, jobs=1):
+    """
+    遍历一次基础目录，找出所有 <平台>/fixed-<语言组合> 目录
+    不依赖预设的平台和语言组合列表，磁盘上新增的平台和语言组合也会被找到
+    jobs 大于 1 时并发列出各平台目录，网络盘上不必逐个平台等待往返
+    返回 [(平台, 语言组合, 目录路径)]，预设的平台和语言组合按预设顺序排在前面
+    """
+    try:
+        with os.scandir(base_dir) as entries:
+            platform_dirs = {
+                entry.name: entry.path
+                for entry in entries
+                if not entry.name.startswith('.') and entry.is_dir()
+            }
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+    platforms = order_names(platform_dirs, PLATFORMS)
+    platform_paths = [platform_dirs[platform] for platform in platforms]
+    if jobs > 1 and len(platforms) > 1:
+        with ThreadPoolExecutor(max_workers=min(jobs, len(platforms))) as executor:
+            scanned = list(executor.map(scan_fixed_dirs, platform_paths))
+    else:
+        scanned = map(scan_fixed_dirs, platform_paths)
+
+    directories = []
+    for platform, fixed_dirs in zip(platforms, scanned):
+        for lang_pair, fixed_dir in fixed_dirs:
+            directories.append((platform, lang_pair, fixed_dir))
+    return directories
+
+
+def count_pending_videos(directory):
+    """
+    统计目录中待发布的mp4文件数量，不包含子目录下的视频
+    直接根据 os.scandir 返回的目录项名称计数，不构建文件路径列表，也不逐个 stat
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return sum(1 for entry in entries
+                       if entry.name.endswith('.mp4') and not entry.name.startswith('.'))
+    except (FileNotFoundError, NotADirectoryError):
+        return 0
+
+
+def list_pending_videos(directory):
+    """
+    列出目录中待发布的mp4文件名（不含子目录），按名称排序
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return sorted(entry.name for entry in entries
+                          if entry.name.endswith('.mp4') and not entry.name.startswith('.'))
+    except (FileNotFoundError, NotADirectoryError):
+        return []